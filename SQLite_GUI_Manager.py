@@ -4,18 +4,69 @@ import sqlite3
 import pandas as pd
 import os
 import json
-import subprocess
-from datetime import datetime
+import threading
+import queue
+import time
+from collections import deque
 from pathlib import Path
 
+from sqlite_fts import (build_fts_index, drop_fts_index, fts_predicate, get_fts_columns,
+                        get_text_columns, is_fts_available, is_fts_table, rebuild_all_fts,
+                        refresh_configured_fts)
+from sqlite_index_advisor import (PREDICATE_LABELS, QUERY_LOG_TABLE, QueryLogBuffer, clear_query_log, observe_query,
+                                  recommend_indexes, recommended_index_sql, search_observations)
+from sqlite_column_profiler import (DEFAULT_SAMPLE_SIZE, SAMPLE_THRESHOLD, TYPE_LABELS, ColumnProfileCache,
+                                    estimate_row_count, profile_table, string_samples, table_fingerprint)
+from sqlite_export import CSV_ENCODINGS, EXPORT_FORMATS, ExportCancelled, export_query
+from sqlite_profiler import (DEFAULT_SLOW_QUERY_MS, SLOW_QUERY_LOG_TABLE, clear_slow_queries, is_full_scan,
+                             is_index_scan, load_slow_queries, profile_query, slow_query_row)
+from sqlite_reconcile import SOURCE_FILETYPES, ReconcileCancelled, read_source_header, run_row_hash_check
+from sqlite_reconcile import run_missing_data_check as reconcile_missing_rows
+from sqlite_import_registry import (REGISTRY_TABLE, config_hash, find_unimported_files, import_status,
+                                    load_imports, lookup_import)
+from sqlite_connections import ConnectionManager
+from sqlite_functions import register_functions, search_key
+from sqlite_schema_cache import SchemaCache
+from sqlite_db_stats import collect_db_stats
+from sqlite_search_keys import find_search_key, is_search_key_column, normalized_search
+from sqlite_search_builder import (LIST_OPERATORS, NO_VALUE_OPERATORS, OPERATOR_LABELS, RANGE_OPERATORS,
+                                   compile_search, describe_conditions, describe_value)
+from sqlite_result_view import PAGE_SIZE, ResultView, describe_filter, filter_condition
+from sqlite_saved_queries import (SAVED_QUERIES_TABLE, cache_status, cache_table_name, delete_query, is_cache_table,
+                                  load_queries, refresh_cache, refresh_stale_caches, save_query, validate_select)
+from sqlite_maintenance import (MaintenanceCancelled, auto_vacuum_mode, discard_temp, estimate_reclaim,
+                                run_incremental_vacuum, swap_in_vacuumed, vacuum_into_temp)
+from sqlite_global_search import DEFAULT_TABLE_TIME_LIMIT_SEC, SEARCH_TYPES, plan_global_search, run_global_search
+from sqlite_type_migration import TARGET_TYPES, convert_column_type, preview_conversion, suggest_target_type
+from sqlite_import_jobs import CANCELLED, FAILED, ImportJob, ImportJobRunner
+from universal_csv_txt_to_sqlite import STAGING_SUFFIX, load_csv_txt_config
+from universal_excel_to_sqlite import load_excel_config
+
+# GUIのテーブル一覧に表示しない内部管理用テーブル
+INTERNAL_TABLES = {QUERY_LOG_TABLE, SLOW_QUERY_LOG_TABLE, REGISTRY_TABLE, SAVED_QUERIES_TABLE}
+
+IMPORT_STATUS_LABELS = {
+    "ok": "最新",
+    "stale": "要再インポート (元ファイル更新)",
+    "config_changed": "要再インポート (設定変更)",
+    "missing": "元ファイルなし",
+}
+
+CACHE_STATUS_LABELS = {
+    "none": "-",
+    "ok": "最新",
+    "stale": "要更新 (依存テーブル再インポート)",
+    "missing": "未作成",
+}
+
 class MissingDataCheckDialog(tk.Toplevel):
     """格納漏れチェック用の設定を入力するダイアログ"""
-    def __init__(self, parent, tables, default_table, conn):
+    def __init__(self, parent, tables, default_table, schema):
         super().__init__(parent)
         self.transient(parent)
         self.title("格納漏れチェック設定")
         self.parent = parent
-        self.conn = conn
+        self.schema = schema
         self.result = None
 
         # 変数
@@ -23,6 +74,7 @@ class MissingDataCheckDialog(tk.Toplevel):
         self.table_name = tk.StringVar(value=default_table)
         self.source_key_column = tk.StringVar()
         self.db_key_column = tk.StringVar()
+        self.key_pairs = []  # 複合キー: (元ファイルのキー列, DBのキー列) の組
 
         body = ttk.Frame(self, padding=20)
         self.initial_focus = self.body(body, tables)
@@ -57,6 +109,13 @@ class MissingDataCheckDialog(tk.Toplevel):
         ttk.Label(master, text="DBテーブルのキー列:").grid(row=3, column=0, sticky=tk.W, pady=2)
         self.db_col_combo = ttk.Combobox(master, textvariable=self.db_key_column, state='readonly', width=47)
         self.db_col_combo.grid(row=3, column=1, pady=2)
+        ttk.Button(master, text="キーを追加", command=self.add_key_pair).grid(row=3, column=2, padx=5)
+
+        # 5. 複合キー（未追加の場合は上で選択中の1組をキーとする）
+        ttk.Label(master, text="複合キー:").grid(row=4, column=0, sticky=tk.NW, pady=2)
+        self.key_listbox = tk.Listbox(master, height=4, width=50)
+        self.key_listbox.grid(row=4, column=1, pady=2, sticky=tk.W)
+        ttk.Button(master, text="削除", command=self.remove_key_pair).grid(row=4, column=2, padx=5, sticky=tk.N)
 
         self.update_db_columns() # 初期表示
         return self.source_col_combo
@@ -70,9 +129,7 @@ class MissingDataCheckDialog(tk.Toplevel):
         box.pack()
 
     def select_source_file(self):
-        path = filedialog.askopenfilename(filetypes=[
-            ("CSV/Excel files", "*.csv *.xlsx *.xls"),
-            ("All files", "*.*")])
+        path = filedialog.askopenfilename(filetypes=SOURCE_FILETYPES)
         if path:
             self.source_file_path.set(path)
             self.update_source_columns()
@@ -82,45 +139,60 @@ class MissingDataCheckDialog(tk.Toplevel):
         if not path:
             return
         try:
-            if path.endswith('.csv'):
-                df = pd.read_csv(path, nrows=0) # ヘッダーのみ読み込み
-            else:
-                df = pd.read_excel(path, nrows=0)
-            self.source_col_combo['values'] = list(df.columns)
-            if df.columns.any():
-                self.source_key_column.set(df.columns[0])
+            # インポーターのファイル設定（エンコーディング・区切り文字・ヘッダー行）でヘッダーのみ読み込み
+            columns = read_source_header(path)
+            self.source_col_combo['values'] = columns
+            if columns:
+                self.source_key_column.set(columns[0])
+            self.key_pairs.clear()
+            self.key_listbox.delete(0, tk.END)
         except Exception as e:
             messagebox.showerror("ファイル読み込みエラー", f"ファイルの列情報を読み込めませんでした。\n{e}", parent=self)
 
     def update_db_columns(self, event=None):
         table = self.table_name.get()
-        if not table or not self.conn:
+        if not table or not self.schema:
             return
         try:
-            cur = self.conn.cursor()
-            cur.execute(f'PRAGMA table_info("{table}")')
-            columns = [row[1] for row in cur.fetchall()]
+            generated = self.schema.generated_columns(table)
+            columns = [c for c in self.schema.columns(table) if c not in generated]
             self.db_col_combo['values'] = columns
             if columns:
                 self.db_key_column.set(columns[0])
         except Exception as e:
             messagebox.showerror("DBエラー", f"テーブルの列情報を読み込めませんでした。\n{e}", parent=self)
+        if event is not None:
+            self.key_pairs.clear()
+            self.key_listbox.delete(0, tk.END)
+
+    def add_key_pair(self):
+        pair = (self.source_key_column.get(), self.db_key_column.get())
+        if not all(pair):
+            messagebox.showwarning("入力エラー", "キー列を選択してください。", parent=self)
+            return
+        if pair in self.key_pairs:
+            return
+        self.key_pairs.append(pair)
+        self.key_listbox.insert(tk.END, f"{pair[0]} = {pair[1]}")
+
+    def remove_key_pair(self):
+        for index in reversed(self.key_listbox.curselection()):
+            self.key_listbox.delete(index)
+            del self.key_pairs[index]
 
     def apply(self, event=None):
         source_file = self.source_file_path.get()
         table = self.table_name.get()
-        source_key = self.source_key_column.get()
-        db_key = self.db_key_column.get()
+        key_pairs = list(self.key_pairs) or [(self.source_key_column.get(), self.db_key_column.get())]
 
-        if not all([source_file, table, source_key, db_key]):
+        if not all([source_file, table]) or not all(all(pair) for pair in key_pairs):
             messagebox.showwarning("入力エラー", "すべての項目を入力してください。", parent=self)
             return
 
         self.result = {
             'source_file': source_file,
             'table_name': table,
-            'source_key': source_key,
-            'db_key': db_key
+            'key_pairs': key_pairs
         }
         self.cancel()
 
@@ -128,6 +200,487 @@ class MissingDataCheckDialog(tk.Toplevel):
         self.parent.focus_set()
         self.destroy()
 
+class FtsSetupDialog(tk.Toplevel):
+    """全文検索(FTS5 trigram)インデックスの対象カラムを選択するダイアログ"""
+    def __init__(self, parent, table, columns, selected):
+        super().__init__(parent)
+        self.transient(parent)
+        self.title(f"全文検索インデックス設定 - {table}")
+        self.parent = parent
+        self.columns = columns
+        self.result = None
+
+        body = ttk.Frame(self, padding=20)
+        ttk.Label(body, text="部分一致/後方一致検索を高速化するカラムを選択してください:").pack(anchor=tk.W, pady=(0, 5))
+        self.listbox = tk.Listbox(body, selectmode=tk.MULTIPLE, height=15, width=40, exportselection=False)
+        for i, col in enumerate(columns):
+            self.listbox.insert(tk.END, col)
+            if col in selected:
+                self.listbox.selection_set(i)
+        self.listbox.pack(fill=tk.BOTH, expand=True)
+        body.pack(fill=tk.BOTH, expand=True)
+
+        box = ttk.Frame(self)
+        ttk.Button(box, text="作成", command=self.apply, default=tk.ACTIVE).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(box, text="キャンセル", command=self.cancel).pack(side=tk.LEFT, padx=5, pady=5)
+        self.bind("<Return>", self.apply)
+        self.bind("<Escape>", self.cancel)
+        box.pack()
+
+        self.grab_set()
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.geometry(f"+{ (parent.winfo_rootx() + 50)}+{(parent.winfo_rooty() + 50)}")
+        self.listbox.focus_set()
+        self.wait_window(self)
+
+    def apply(self, event=None):
+        selected = [self.columns[i] for i in self.listbox.curselection()]
+        if not selected:
+            messagebox.showwarning("入力エラー", "カラムを1つ以上選択してください。", parent=self)
+            return
+        self.result = selected
+        self.cancel()
+
+    def cancel(self, event=None):
+        self.parent.focus_set()
+        self.destroy()
+
+class ExportDialog(tk.Toplevel):
+    """エクスポート先・形式・文字コードを指定するダイアログ"""
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.transient(parent)
+        self.title("エクスポート設定")
+        self.parent = parent
+        self.result = None
+
+        self.file_path = tk.StringVar()
+        self.format_label = tk.StringVar(value=EXPORT_FORMATS['csv'])
+        self.encoding = tk.StringVar(value=CSV_ENCODINGS[0])
+
+        body = ttk.Frame(self, padding=20)
+        ttk.Label(body, text="形式:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        format_combo = ttk.Combobox(body, textvariable=self.format_label, values=list(EXPORT_FORMATS.values()),
+                                    state='readonly', width=47)
+        format_combo.grid(row=0, column=1, pady=2)
+        format_combo.bind('<<ComboboxSelected>>', self.on_format_selected)
+
+        ttk.Label(body, text="文字コード:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        self.encoding_combo = ttk.Combobox(body, textvariable=self.encoding, values=CSV_ENCODINGS,
+                                           state='readonly', width=47)
+        self.encoding_combo.grid(row=1, column=1, pady=2)
+
+        ttk.Label(body, text="出力先:").grid(row=2, column=0, sticky=tk.W, pady=2)
+        ttk.Entry(body, textvariable=self.file_path, width=50).grid(row=2, column=1, pady=2)
+        ttk.Button(body, text="参照...", command=self.select_file).grid(row=2, column=2, padx=5)
+        body.pack()
+
+        box = ttk.Frame(self)
+        ttk.Button(box, text="実行", command=self.apply, default=tk.ACTIVE).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(box, text="キャンセル", command=self.cancel).pack(side=tk.LEFT, padx=5, pady=5)
+        self.bind("<Return>", self.apply)
+        self.bind("<Escape>", self.cancel)
+        box.pack()
+
+        self.grab_set()
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.geometry(f"+{ (parent.winfo_rootx() + 50)}+{(parent.winfo_rooty() + 50)}")
+        format_combo.focus_set()
+        self.wait_window(self)
+
+    def selected_format(self):
+        return next(key for key, label in EXPORT_FORMATS.items() if label == self.format_label.get())
+
+    def on_format_selected(self, event=None):
+        fmt = self.selected_format()
+        self.encoding_combo['state'] = 'readonly' if fmt in ('csv', 'tsv') else 'disabled'
+        path = self.file_path.get()
+        if path:
+            self.file_path.set(str(Path(path).with_suffix(f".{fmt}")))
+
+    def select_file(self):
+        fmt = self.selected_format()
+        path = filedialog.asksaveasfilename(
+            title="全件エクスポート",
+            defaultextension=f".{fmt}",
+            filetypes=[(EXPORT_FORMATS[fmt], f"*.{fmt}"), ("All files", "*.*")],
+            parent=self)
+        if path:
+            self.file_path.set(path)
+
+    def apply(self, event=None):
+        if not self.file_path.get():
+            messagebox.showwarning("入力エラー", "出力先を指定してください。", parent=self)
+            return
+        self.result = (self.file_path.get(), self.selected_format(), self.encoding.get())
+        self.cancel()
+
+    def cancel(self, event=None):
+        self.parent.focus_set()
+        self.destroy()
+
+class AdvancedSearchDialog(tk.Toplevel):
+    """複数条件検索の条件を組み立てるダイアログ"""
+    def __init__(self, parent, table, columns, compile_func, conditions=None, combinator="AND"):
+        super().__init__(parent)
+        self.transient(parent)
+        self.title(f"詳細検索 - {table}")
+        self.parent = parent
+        self.compile_func = compile_func
+        self.conditions = list(conditions or [])
+        self.result = None
+
+        self.combinator = tk.StringVar(value=combinator)
+        self.column = tk.StringVar(value=columns[0] if columns else '')
+        self.op_label = tk.StringVar(value=OPERATOR_LABELS['eq'])
+        self.value = tk.StringVar()
+        self.value2 = tk.StringVar()
+
+        body = ttk.Frame(self, padding=10)
+        combine = ttk.Frame(body)
+        ttk.Label(combine, text="結合:").pack(side=tk.LEFT)
+        ttk.Radiobutton(combine, text="すべての条件を満たす (AND)", variable=self.combinator,
+                        value="AND").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(combine, text="いずれかの条件を満たす (OR)", variable=self.combinator,
+                        value="OR").pack(side=tk.LEFT, padx=5)
+        combine.pack(anchor=tk.W, pady=(0, 5))
+
+        editor = ttk.LabelFrame(body, text="条件の追加", padding=5)
+        ttk.Label(editor, text="カラム:").grid(row=0, column=0, sticky=tk.W)
+        ttk.Combobox(editor, textvariable=self.column, values=columns, state='readonly',
+                     width=20).grid(row=0, column=1, sticky=tk.W, pady=2)
+        ttk.Label(editor, text="条件:").grid(row=0, column=2, sticky=tk.W, padx=(10, 0))
+        op_combo = ttk.Combobox(editor, textvariable=self.op_label, values=list(OPERATOR_LABELS.values()),
+                                state='readonly', width=24)
+        op_combo.grid(row=0, column=3, sticky=tk.W, pady=2)
+        op_combo.bind('<<ComboboxSelected>>', self.on_op_selected)
+        ttk.Label(editor, text="値 / 下限:").grid(row=1, column=0, sticky=tk.W)
+        self.value_entry = ttk.Entry(editor, textvariable=self.value, width=23)
+        self.value_entry.grid(row=1, column=1, sticky=tk.W, pady=2)
+        ttk.Label(editor, text="上限:").grid(row=1, column=2, sticky=tk.W, padx=(10, 0))
+        self.value2_entry = ttk.Entry(editor, textvariable=self.value2, width=27)
+        self.value2_entry.grid(row=1, column=3, sticky=tk.W, pady=2)
+        ttk.Label(editor, text="リスト:\n(Excelから\n貼り付け)").grid(row=2, column=0, sticky=(tk.W, tk.N))
+        self.list_text = tk.Text(editor, height=4, width=60)
+        self.list_text.grid(row=2, column=1, columnspan=3, sticky=tk.W, pady=2)
+        ttk.Button(editor, text="追加", command=self.add_condition).grid(row=3, column=3, sticky=tk.E, pady=(5, 0))
+        editor.pack(fill=tk.X)
+
+        self.tree = ttk.Treeview(body, columns=("column", "op", "value"), show='headings', height=6)
+        for col, heading, width in (("column", "カラム", 150), ("op", "条件", 180), ("value", "値", 260)):
+            self.tree.heading(col, text=heading)
+            self.tree.column(col, width=width)
+        self.tree.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
+        ttk.Button(body, text="選択した条件を削除", command=self.remove_condition).pack(anchor=tk.E, pady=2)
+
+        self.preview = tk.Text(body, height=6, wrap=tk.WORD)
+        self.preview.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+        body.pack(fill=tk.BOTH, expand=True)
+
+        box = ttk.Frame(self)
+        ttk.Button(box, text="検索", command=self.apply, default=tk.ACTIVE).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(box, text="SQL確認", command=self.show_sql).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(box, text="キャンセル", command=self.cancel).pack(side=tk.LEFT, padx=5, pady=5)
+        self.bind("<Escape>", self.cancel)
+        box.pack()
+
+        self.refresh_conditions()
+        self.on_op_selected()
+        self.grab_set()
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.geometry(f"+{ (parent.winfo_rootx() + 50)}+{(parent.winfo_rooty() + 50)}")
+        self.value_entry.focus_set()
+        self.wait_window(self)
+
+    def selected_op(self):
+        return next(key for key, label in OPERATOR_LABELS.items() if label == self.op_label.get())
+
+    def on_op_selected(self, event=None):
+        op = self.selected_op()
+        self.value_entry['state'] = 'disabled' if op in NO_VALUE_OPERATORS + LIST_OPERATORS else 'normal'
+        self.value2_entry['state'] = 'normal' if op in RANGE_OPERATORS else 'disabled'
+        self.list_text['state'] = 'normal' if op in LIST_OPERATORS else 'disabled'
+
+    def add_condition(self):
+        op = self.selected_op()
+        condition = {"column": self.column.get(), "op": op}
+        if op in LIST_OPERATORS:
+            condition["values"] = self.list_text.get(1.0, tk.END)
+        elif op not in NO_VALUE_OPERATORS:
+            condition["value"] = self.value.get()
+            if op in RANGE_OPERATORS:
+                condition["value2"] = self.value2.get()
+        try:
+            self.compile_func([condition], "AND")
+        except ValueError as e:
+            messagebox.showwarning("入力エラー", str(e), parent=self)
+            return
+        self.conditions.append(condition)
+        self.value.set('')
+        self.value2.set('')
+        self.list_text.delete(1.0, tk.END)
+        self.refresh_conditions()
+
+    def remove_condition(self):
+        for item in sorted(self.tree.selection(), key=self.tree.index, reverse=True):
+            del self.conditions[self.tree.index(item)]
+        self.refresh_conditions()
+
+    def refresh_conditions(self):
+        self.tree.delete(*self.tree.get_children())
+        for condition in self.conditions:
+            self.tree.insert('', 'end', values=(condition["column"], OPERATOR_LABELS[condition["op"]],
+                                                describe_value(condition)))
+
+    def show_sql(self):
+        """組み立てたSQL（評価順に並べ替え済み）と注意事項を表示する"""
+        self.preview.delete(1.0, tk.END)
+        try:
+            compiled = self.compile_func(self.conditions, self.combinator.get())
+        except ValueError as e:
+            self.preview.insert(tk.END, str(e))
+            return
+        params = [p if len(str(p)) <= 50 else f"{str(p)[:50]}..." for p in compiled['params']]
+        self.preview.insert(tk.END, f"{compiled['sql']}\n\n-- パラメータ: {params}\n")
+        for note in compiled['notes']:
+            self.preview.insert(tk.END, f"※ {note}\n")
+
+    def apply(self, event=None):
+        try:
+            self.compile_func(self.conditions, self.combinator.get())
+        except ValueError as e:
+            messagebox.showwarning("入力エラー", str(e), parent=self)
+            return
+        self.result = (self.conditions, self.combinator.get())
+        self.cancel()
+
+    def cancel(self, event=None):
+        self.parent.focus_set()
+        self.destroy()
+
+class SaveQueryDialog(tk.Toplevel):
+    """定型クエリとして保存する名前・説明・結果のキャッシュ有無を入力するダイアログ"""
+    def __init__(self, parent, default_name=""):
+        super().__init__(parent)
+        self.transient(parent)
+        self.title("定型クエリとして保存")
+        self.parent = parent
+        self.result = None
+
+        self.name = tk.StringVar(value=default_name)
+        self.description = tk.StringVar()
+        self.materialize = tk.BooleanVar(value=True)
+
+        body = ttk.Frame(self, padding=20)
+        ttk.Label(body, text="名前:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        name_entry = ttk.Entry(body, textvariable=self.name, width=50)
+        name_entry.grid(row=0, column=1, pady=2)
+        ttk.Label(body, text="説明:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        ttk.Entry(body, textvariable=self.description, width=50).grid(row=1, column=1, pady=2)
+        ttk.Checkbutton(body, text="結果をキャッシュテーブルに保存する（依存テーブルの再インポート後に自動更新）",
+                        variable=self.materialize).grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(8, 0))
+        body.pack()
+
+        box = ttk.Frame(self)
+        ttk.Button(box, text="保存", command=self.apply, default=tk.ACTIVE).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(box, text="キャンセル", command=self.cancel).pack(side=tk.LEFT, padx=5, pady=5)
+        self.bind("<Return>", self.apply)
+        self.bind("<Escape>", self.cancel)
+        box.pack()
+
+        self.grab_set()
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.geometry(f"+{ (parent.winfo_rootx() + 50)}+{(parent.winfo_rooty() + 50)}")
+        name_entry.focus_set()
+        self.wait_window(self)
+
+    def apply(self, event=None):
+        if not self.name.get().strip():
+            messagebox.showwarning("入力エラー", "名前を入力してください。", parent=self)
+            return
+        self.result = (self.name.get().strip(), self.description.get().strip(), self.materialize.get())
+        self.cancel()
+
+    def cancel(self, event=None):
+        self.parent.focus_set()
+        self.destroy()
+
+class ColumnTypeDialog(tk.Toplevel):
+    """列の変換先の型を選ぶダイアログ"""
+    def __init__(self, parent, table_name, column_name, declared_type, suggested_type):
+        super().__init__(parent)
+        self.transient(parent)
+        self.title("列の型を変換")
+        self.parent = parent
+        self.result = None
+        self.target = tk.StringVar(value=suggested_type)
+
+        body = ttk.Frame(self, padding=20)
+        ttk.Label(body, text=f"テーブル: {table_name}\n列: {column_name} (現在の宣言型: {declared_type or 'なし'})").pack(anchor=tk.W)
+        types = ttk.Frame(body)
+        ttk.Label(types, text="変換先の型:").pack(side=tk.LEFT)
+        ttk.Combobox(types, textvariable=self.target, values=TARGET_TYPES, state="readonly", width=12).pack(side=tk.LEFT, padx=5)
+        types.pack(anchor=tk.W, pady=10)
+        ttk.Label(body, text="インポート時と同じ規則で値を変換してテーブルを作り直します（インデックス・トリガーは作り直されます）。\n"
+                             "変換できない値はNULLになります。実行前に件数とサンプルを確認できます。",
+                  foreground="gray").pack(anchor=tk.W)
+        body.pack()
+
+        box = ttk.Frame(self)
+        ttk.Button(box, text="次へ", command=self.apply, default=tk.ACTIVE).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(box, text="キャンセル", command=self.cancel).pack(side=tk.LEFT, padx=5, pady=5)
+        self.bind("<Return>", self.apply)
+        self.bind("<Escape>", self.cancel)
+        box.pack()
+
+        self.grab_set()
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.geometry(f"+{ (parent.winfo_rootx() + 50)}+{(parent.winfo_rooty() + 50)}")
+        self.wait_window(self)
+
+    def apply(self, event=None):
+        self.result = self.target.get()
+        self.cancel()
+
+    def cancel(self, event=None):
+        self.parent.focus_set()
+        self.destroy()
+
+class MaintenanceDialog(tk.Toplevel):
+    """DB最適化の方式（増分VACUUM / VACUUM INTOによる再構築）を選ぶダイアログ"""
+    def __init__(self, parent, estimate, auto_vacuum):
+        super().__init__(parent)
+        self.transient(parent)
+        self.title("DB最適化")
+        self.parent = parent
+        self.result = None
+        incremental_ready = auto_vacuum == "INCREMENTAL"
+        self.mode = tk.StringVar(value="incremental" if incremental_ready and estimate['incremental'] else "rebuild")
+        self.switch_incremental = tk.BooleanVar(value=not incremental_ready)
+
+        def mb(n):
+            return f"{n / 1024 / 1024:,.1f} MB"
+
+        body = ttk.Frame(self, padding=20)
+        ttk.Label(body, text=f"ファイルサイズ: {mb(estimate['file_bytes'])} / auto_vacuum: {auto_vacuum}").pack(anchor=tk.W, pady=(0, 10))
+        incremental = ttk.Radiobutton(
+            body, variable=self.mode, value="incremental",
+            text=f"増分VACUUM: 空きページを少しずつ解放 (見込み {mb(estimate['incremental'])})")
+        incremental.pack(anchor=tk.W)
+        if not incremental_ready:
+            incremental['state'] = 'disabled'
+            ttk.Label(body, text="  ※ auto_vacuum=INCREMENTAL のDBのみ。下の再構築で切り替えられます。",
+                      foreground="gray").pack(anchor=tk.W)
+        rebuild_estimate = mb(estimate['rebuild']) + ("" if estimate['unused_known'] else " + ページ内の未使用領域")
+        ttk.Radiobutton(
+            body, variable=self.mode, value="rebuild",
+            text=f"再構築: VACUUM INTOで詰め直したDBと入れ替え (見込み {rebuild_estimate})").pack(anchor=tk.W, pady=(5, 0))
+        if not estimate['unused_known']:
+            ttk.Label(body, text="  ※ ページ内の未使用領域は「DB統計情報」を集計すると見込みに含まれます。",
+                      foreground="gray").pack(anchor=tk.W)
+        if not incremental_ready:
+            ttk.Checkbutton(body, variable=self.switch_incremental,
+                            text="再構築と同時に auto_vacuum=INCREMENTAL に切り替える (次回から増分VACUUMを使える)"
+                            ).pack(anchor=tk.W, padx=(20, 0))
+        body.pack()
+
+        box = ttk.Frame(self)
+        ttk.Button(box, text="実行", command=self.apply, default=tk.ACTIVE).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(box, text="キャンセル", command=self.cancel).pack(side=tk.LEFT, padx=5, pady=5)
+        self.bind("<Return>", self.apply)
+        self.bind("<Escape>", self.cancel)
+        box.pack()
+
+        self.grab_set()
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.geometry(f"+{ (parent.winfo_rootx() + 50)}+{(parent.winfo_rooty() + 50)}")
+        self.wait_window(self)
+
+    def apply(self, event=None):
+        auto_vacuum = "INCREMENTAL" if self.mode.get() == "rebuild" and self.switch_incremental.get() else None
+        self.result = (self.mode.get(), auto_vacuum)
+        self.destroy()
+
+    def cancel(self, event=None):
+        self.parent.focus_set()
+        self.destroy()
+
+
+class ImportJobWindow(tk.Toplevel):
+    """インポートジョブのキュー・進捗・ログを表示するウィンドウ（非モーダル、閉じてもジョブは継続）"""
+    MAX_LOG_LINES = 5000
+
+    def __init__(self, parent, runner, log_lines):
+        super().__init__(parent)
+        self.title("インポートジョブ")
+        self.geometry("900x550")
+        self.runner = runner
+
+        columns = ("ジョブ", "状態", "ファイル", "エラー")
+        self.job_tree = ttk.Treeview(self, columns=columns, show='headings', height=5)
+        for col, width in zip(columns, (360, 100, 120, 80)):
+            self.job_tree.heading(col, text=col)
+            self.job_tree.column(col, width=width)
+        self.job_tree.pack(fill=tk.X, padx=10, pady=(10, 5))
+        self.job_items = {}
+
+        self.progress_label = ttk.Label(self, text="")
+        self.progress_label.pack(fill=tk.X, padx=10)
+        self.progress_bar = ttk.Progressbar(self, mode='determinate', maximum=100)
+        self.progress_bar.pack(fill=tk.X, padx=10, pady=5)
+
+        log_frame = ttk.Frame(self)
+        log_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.log_text = tk.Text(log_frame, wrap=tk.NONE, height=15, font=('Consolas', 9))
+        log_scroll = ttk.Scrollbar(log_frame, command=self.log_text.yview)
+        self.log_text['yscrollcommand'] = log_scroll.set
+        self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        log_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.log_text.insert(tk.END, "".join(line + "\n" for line in log_lines))
+        self.log_text.see(tk.END)
+        self.log_text.config(state=tk.DISABLED)
+
+        buttons = ttk.Frame(self)
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="キャンセル", command=runner.cancel).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="閉じる", command=self.destroy).pack(side=tk.LEFT, padx=5)
+
+        if runner.current is not None:
+            self.update_job(runner.current)
+        for job in runner.pending_jobs():
+            self.update_job(job)
+
+    def update_job(self, job):
+        """ジョブ一覧の行と、実行中ジョブの進捗表示を更新"""
+        files = f"{job.files_done}/{job.files_total}" if job.files_total else str(job.files_done)
+        values = (job.title, job.status, files, job.errors)
+        if id(job) in self.job_items:
+            self.job_tree.item(self.job_items[id(job)], values=values)
+        else:
+            self.job_items[id(job)] = self.job_tree.insert('', tk.END, values=values)
+
+        if job is self.runner.current:
+            current = f" : {job.current_file}" if job.current_file else ""
+            phase = f" ({job.current_phase})" if job.current_phase else ""
+            eta = job.eta_seconds()
+            eta_text = f"  残り約 {int(eta // 60)}分{int(eta % 60):02d}秒" if eta is not None else ""
+            self.progress_label['text'] = f"{job.title} - ファイル {files}{current}{phase}{eta_text}"
+            fraction = job.fraction_done()
+            self.progress_bar['value'] = fraction * 100 if fraction is not None else 0
+
+    def mark_idle(self):
+        self.progress_label['text'] = "すべてのジョブが終了しました"
+        self.progress_bar['value'] = 100
+
+    def append_log(self, line):
+        self.log_text.config(state=tk.NORMAL)
+        self.log_text.insert(tk.END, line + "\n")
+        overflow = int(self.log_text.index('end-1c').split('.')[0]) - self.MAX_LOG_LINES
+        if overflow > 0:
+            self.log_text.delete('1.0', f"{overflow + 1}.0")
+        self.log_text.see(tk.END)
+        self.log_text.config(state=tk.DISABLED)
+
 class SQLiteGUIManager:
     """SQLite GUI Manager メインクラス"""
     
@@ -144,37 +697,119 @@ class SQLiteGUIManager:
         
         # データベース接続設定
         self.config_path = os.path.join(os.path.dirname(__file__), '.sqlite_gui_manager_config.json')
+        self.gui_config = self.load_gui_config()
         self.db_path = self.load_last_db_path() or r"C:\Users\sem3171\sqlite-gui-manager\test.db"
-        self.conn = None
+        self.db = None  # ConnectionManager（書き込み接続1本と読み取り専用接続プール）
+        self.conn = None  # 書き込み用接続 (self.db.writer)
+        self.read_conn = None  # 一覧表示・検索用の読み取り専用接続 (self.db.reader)
+        self.schema = None  # テーブル・カラム・インデックス情報のキャッシュ (SchemaCache)
         self.tables = []
         self.current_results = pd.DataFrame()
-        self.predefined_queries = {}
         self.clicked_column_id = None
+        self.current_query = None  # 表示中データの元クエリ (SQL, パラメータ)。LIMITなし
+        self.result_view = None  # 表示中データの並べ替え・絞り込みと次ページの読み込み位置 (ResultView)
+        self.result_loading = False  # 表示データの読み込み中（並べ替え・次ページの操作を重ねない）
+        self.advanced_search_conditions = {}  # テーブル名 -> 前回の詳細検索の (条件, 結合方法)
+        self.query_log = QueryLogBuffer()  # インデックス推奨・スロークエリ用の記録（まとめてDBへ書き込む）
+        self.column_profile_cache = ColumnProfileCache()
+        self.db_stats_cache = None  # (変更検知キー, 統計) DB統計は集計が重いため、DBが変わるまで再利用する
+        self.active_background_tasks = 0  # 実行中のバックグラウンド処理の数（DBファイルの入れ替え可否の判定に使う）
+        self.import_runner = ImportJobRunner()
+        self.import_window = None
+        self.import_polling = False
+        self.import_log = deque(maxlen=ImportJobWindow.MAX_LOG_LINES)
+        self.finished_jobs = []  # キューが空になるまでに終了したジョブ（完了時にまとめて通知する）
         
         # UI構築
         self.setup_ui()
         self.connect_database()
     
-    def load_last_db_path(self):
-        """前回使用したDBパスを設定ファイルから取得"""
+    def load_gui_config(self):
+        """GUI設定ファイルを読み込み"""
         try:
-            import json
             if os.path.exists(self.config_path):
                 with open(self.config_path, 'r', encoding='utf-8') as f:
-                    conf = json.load(f)
-                return conf.get('last_db_path')
+                    return json.load(f)
         except Exception as e:
-            print(f"[ERROR] load_last_db_path: {e}")
-        return None
+            print(f"[ERROR] load_gui_config: {e}")
+        return {}
 
-    def save_last_db_path(self, db_path):
-        """DBパスを設定ファイルに保存"""
+    def save_gui_config(self):
+        """GUI設定ファイルに保存（既存のキーは保持）"""
         try:
-            import json
             with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump({'last_db_path': db_path}, f)
+                json.dump(self.gui_config, f, ensure_ascii=False, indent=2)
         except Exception as e:
-            print(f"[ERROR] save_last_db_path: {e}")
+            print(f"[ERROR] save_gui_config: {e}")
+
+    def load_last_db_path(self):
+        """前回使用したDBパスを設定ファイルから取得"""
+        return self.gui_config.get('last_db_path')
+
+    def save_last_db_path(self, db_path):
+        """DBパスを設定ファイルに保存"""
+        self.gui_config['last_db_path'] = db_path
+        self.save_gui_config()
+
+    def run_background_task(self, title, task, on_success=None, on_progress=None, on_error=None, read_only=False):
+        """
+        DB処理をワーカースレッドで実行し、完了後にメインスレッドでコールバックする
+        taskはワーカー専用のDB接続を引数に取る（sqlite3接続はスレッド間で共有できないため）
+        read_only=Trueの場合は読み取り専用接続プールから接続を借りる（一時テーブルも作れないので集計・参照のみ）
+        on_progressを指定した場合、taskは第2引数に進捗通知関数を受け取る
+        """
+        result_queue = queue.Queue()
+
+        def report(*args):
+            result_queue.put(('progress', args))
+
+        def run(conn):
+            return task(conn, report) if on_progress else task(conn)
+
+        db = self.db
+
+        def worker():
+            try:
+                if read_only:
+                    with db.acquire_reader() as conn:
+                        value = run(conn)
+                else:
+                    conn = sqlite3.connect(self.db_path)
+                    register_functions(conn)
+                    try:
+                        value = run(conn)
+                    finally:
+                        conn.close()
+                result_queue.put(('ok', value))
+            except Exception as e:
+                result_queue.put(('error', e))
+
+        def poll():
+            while True:
+                try:
+                    status, value = result_queue.get_nowait()
+                except queue.Empty:
+                    self.root.after(100, poll)
+                    return
+                if status == 'progress':
+                    on_progress(*value)
+                    continue
+                break
+            self.active_background_tasks -= 1
+            if status == 'ok':
+                self.status_var.set(f"[OK] {title} 完了")
+                if on_success:
+                    on_success(value)
+            elif on_error:
+                on_error(value)
+            else:
+                self.status_var.set(f"[ERROR] {title}: {value}")
+                messagebox.showerror("エラー", f"{title}中にエラーが発生しました。\n{value}")
+
+        self.status_var.set(f"[RUNNING] {title} 実行中...")
+        self.active_background_tasks += 1
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(100, poll)
     
     def setup_ui(self):
         """UI構築"""
@@ -256,14 +891,15 @@ class SQLiteGUIManager:
             return
 
         try:
+            drop_fts_index(self.conn, table_to_delete)
             cursor = self.conn.cursor()
             cursor.execute(f'DROP TABLE "{table_to_delete}"')
             self.conn.commit()
             
             messagebox.showinfo("成功", f"テーブル '{table_to_delete}' を削除しました。")
             
-            # テーブルリストを更新
-            self.connect_database()
+            # テーブルリストを更新（スキーマの変化を検知して一覧のみ読み直す）
+            self.refresh_schema()
             
         except sqlite3.Error as e:
             messagebox.showerror("エラー", f"テーブル '{table_to_delete}' の削除中にエラーが発生しました。\n{e}")
@@ -284,6 +920,7 @@ class SQLiteGUIManager:
             cursor = self.conn.cursor()
             cursor.execute(f'DELETE FROM "{table_to_truncate}"')
             self.conn.commit()
+            self.column_profile_cache.invalidate(table_to_truncate)
             
             # 削除後の件数を確認
             cursor.execute(f'SELECT COUNT(*) FROM "{table_to_truncate}"')
@@ -320,7 +957,7 @@ class SQLiteGUIManager:
 
         base_dir = os.path.dirname(__file__)
         script_name = f"universal_{config['type']}_to_sqlite.py"
-        source_file_path = os.path.join(base_dir, 'テキスト', config['source_file'])
+        source_file_path = config.get('source_path') or os.path.join(base_dir, 'テキスト', config['source_file'])
         command = ['python', os.path.join(base_dir, script_name), source_file_path, self.db_path]
         
         self.run_importer_process(command, f"'{config['source_file']}'の再インポート")
@@ -328,7 +965,17 @@ class SQLiteGUIManager:
     def find_import_config(self, table_name):
         """指定されたテーブル名に対応するインポート設定を検索する。なければデフォルト設定を返す"""
         base_dir = os.path.dirname(__file__)
-        
+
+        # 0. インポート台帳から検索（主キー参照のみ）
+        entry = lookup_import(self.conn, table_name)
+        if entry and os.path.exists(entry['source_path']):
+            return {
+                'source_file': entry['source_file'],
+                'source_path': entry['source_path'],
+                'type': entry['import_type']
+            }
+
+        # 台帳導入前に取り込まれたテーブルは、従来どおり設定ファイル・フォルダから探す
         # 1. 設定ファイルから検索
         # excel_config.json のチェック
         excel_config_path = os.path.join(base_dir, 'excel_config.json')
@@ -376,61 +1023,119 @@ class SQLiteGUIManager:
         return None
 
     def run_importer_process(self, command, process_title, show_completion_message=True):
-        """インポータースクリプトをサブプロセスで実行する共通メソッド"""
-        try:
-            progress_dialog = self.show_progress_dialog(f"{process_title} 実行中...")
-            
-            startupinfo = None
-            if os.name == 'nt':
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            
-            result = subprocess.run(command, capture_output=True, text=True, encoding='utf-8', check=True, startupinfo=startupinfo)
-            
-            progress_dialog.destroy()
-
-            if show_completion_message:
-                messagebox.showinfo(f"{process_title} 完了", f"{process_title}が正常に完了しました。")
-            
-            self.connect_database()
-
-        except FileNotFoundError:
-            if 'progress_dialog' in locals() and progress_dialog.winfo_exists():
-                progress_dialog.destroy()
-            messagebox.showerror("エラー", f"スクリプトが見つかりません: {command[1]}")
-        except subprocess.CalledProcessError as e:
-            if 'progress_dialog' in locals() and progress_dialog.winfo_exists():
-                progress_dialog.destroy()
-            error_message = e.stderr.strip()
-            messagebox.showerror(f"{process_title} エラー", f"処理が失敗しました (終了コード: {e.returncode})。\n\n{error_message}")
-        except Exception as e:
-            if 'progress_dialog' in locals() and progress_dialog.winfo_exists():
-                progress_dialog.destroy()
-            messagebox.showerror("予期せぬエラー", f"処理中に予期せぬエラーが発生しました。\n{e}")
+        """
+        インポータースクリプトをジョブキューに追加する共通メソッド
+        サブプロセスはワーカースレッドで実行され、出力はジョブウィンドウのログに逐次表示される
+        """
+        job = ImportJob(process_title, command, notify=show_completion_message)
+        self.import_log.append(f"===== {process_title} =====")
+        self.import_runner.submit(job)
+        self.show_import_jobs()
+        self.import_window.update_job(job)
+        self.status_var.set(f"[IMPORT] {process_title} をキューに追加しました")
+        if not self.import_polling:
+            self.import_polling = True
+            self.root.after(100, self.poll_import_events)
+        return job
+
+    def show_import_jobs(self):
+        """インポートジョブウィンドウを表示（閉じていれば作り直す）"""
+        if self.import_window is not None and self.import_window.winfo_exists():
+            self.import_window.lift()
+            return
+        self.import_window = ImportJobWindow(self.root, self.import_runner, self.import_log)
 
-    def show_progress_dialog(self, title):
-        """進捗ダイアログを表示する"""
-        dialog = tk.Toplevel(self.root)
-        dialog.title(title)
-        dialog.geometry("300x100")
-        dialog.transient(self.root) # 親ウィンドウの上に表示
-        dialog.grab_set() # モーダルにする
-        dialog.resizable(False, False)
-
-        ttk.Label(dialog, text="処理を実行しています。しばらくお待ちください...", padding=20).pack(expand=True)
-        progress = ttk.Progressbar(dialog, mode='indeterminate')
-        progress.pack(fill=tk.X, padx=20, pady=10)
-        progress.start(10)
-        
-        self.root.update_idletasks()
-        return dialog
+    def poll_import_events(self):
+        """ジョブのイベントを取り出して表示に反映する（メインスレッドで定期実行）"""
+        window = self.import_window if self.import_window is not None and self.import_window.winfo_exists() else None
+        for _ in range(500):  # 大量の出力でも画面が固まらないよう、1回の処理件数を制限する
+            try:
+                kind, job, payload = self.import_runner.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'line':
+                self.import_log.append(payload)
+                if window:
+                    window.append_log(payload)
+            elif kind in ('start', 'progress', 'end'):
+                if kind == 'progress' and payload and payload['event'] == 'file_end':
+                    line = self.format_file_metrics(payload)
+                    self.import_log.append(line)
+                    if window:
+                        window.append_log(line)
+                if window:
+                    window.update_job(job)
+                if kind == 'start':
+                    self.status_var.set(f"[RUNNING] {job.title} 実行中...")
+                elif kind == 'end':
+                    self.finished_jobs.append(job)
+            elif kind == 'idle' and not self.import_runner.is_busy():
+                self.import_polling = False
+                self.on_import_jobs_finished()
+                return
+        self.root.after(100, self.poll_import_events)
+
+    def format_file_metrics(self, record):
+        """インポーターのfile_endイベントをログ1行にする"""
+        status = "OK" if record['status'] == 'ok' else "NG"
+        rows = f"{record['rows']:,}行" if record.get('rows') is not None else "-行"
+        rate = f" ({record['rows_per_sec']:,.0f}行/秒)" if record.get('rows_per_sec') else ""
+        memory = (f" ピークメモリ {record['peak_mem_bytes'] / 1024 / 1024:,.0f}MB"
+                  if record.get('peak_mem_bytes') else "")
+        phases = " ".join(f"{name}={sec:.1f}s" for name, sec in record.get('phases', {}).items())
+        return f"[METRICS] {status} {record['file']}: {rows} {record['elapsed_sec']:.1f}秒{rate}{memory} [{phases}]"
+
+    def on_import_jobs_finished(self):
+        """キューが空になったらDBを再読込し、通知対象のジョブの結果をまとめて表示する"""
+        jobs, self.finished_jobs = self.finished_jobs, []
+        if self.import_window is not None and self.import_window.winfo_exists():
+            self.import_window.mark_idle()
+        if any(job.status == CANCELLED for job in jobs):
+            self.drop_staging_tables()
+        self.refresh_schema(refresh_fts=True)
+        self.refresh_saved_query_caches()
+
+        failed = [job for job in jobs if job.status == FAILED]
+        cancelled = [job for job in jobs if job.status == CANCELLED]
+        self.status_var.set(f"[IMPORT] インポートジョブ終了: 完了 {len(jobs) - len(failed) - len(cancelled)}件 "
+                            f"/ 失敗 {len(failed)}件 / キャンセル {len(cancelled)}件")
+        if failed:
+            details = "\n\n".join(f"■ {job.title} (終了コード: {job.returncode}, エラー {job.errors}件)\n"
+                                  + "\n".join(job.output_tail) for job in failed)
+            messagebox.showerror("インポートエラー", f"処理が失敗しました。\n\n{details}")
+        elif any(job.notify for job in jobs) and not cancelled:
+            messagebox.showinfo("インポート完了", "\n".join(
+                f"{job.title}が正常に完了しました。({job.files_done}ファイル / {job.rows:,}行"
+                + (f" / 警告 {job.warnings}件" if job.warnings else "") + ")" for job in jobs))
+
+    def drop_staging_tables(self):
+        """中断されたインポートが残した書き込み途中の一時テーブルを削除する"""
+        if not self.conn:
+            return
+        try:
+            rows = self.conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ?",
+                                     (f"%{STAGING_SUFFIX}",)).fetchall()
+            for (name,) in rows:
+                self.conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"[ERROR] drop_staging_tables: {e}")
 
-    def show_text_dialog(self, title, message):
-        """スクロール可能なテキストメッセージを持つダイアログを表示する"""
+    def show_text_dialog(self, title, message, actions=None):
+        """
+        スクロール可能なテキストメッセージを持つダイアログを表示する
+        actionsに (ボタンのラベル, 関数) のリストを渡すと下部にボタンを表示する（押すとダイアログを閉じてから呼ぶ）
+        """
         dialog = tk.Toplevel(self.root)
         dialog.title(title)
         dialog.geometry("600x400")
-        
+
+        if actions:
+            box = ttk.Frame(dialog)
+            for label, command in actions:
+                ttk.Button(box, text=label, command=lambda c=command: (dialog.destroy(), c())).pack(side=tk.LEFT, padx=5, pady=5)
+            box.pack(side=tk.BOTTOM)
+
         text_widget = tk.Text(dialog, wrap=tk.WORD, padx=10, pady=10)
         text_widget.insert(tk.END, message)
         text_widget.config(state=tk.DISABLED)
@@ -458,87 +1163,164 @@ class SQLiteGUIManager:
         self.tree_menu.post(event.x_root, event.y_root)
 
     def check_column_data_types(self):
-        """選択された列のデータ型をチェックして統計情報を表示する"""
+        """選択された列のデータ型をチェックして統計情報を表示する（集計はSQL側で全列まとめて行う）"""
         if self.clicked_column_id is None:
             return
 
         table_name = self.table_var.get()
         column_name = self.tree['columns'][self.clicked_column_id]
 
-        try:
-            # 列の全データを取得
-            cur = self.conn.cursor()
-            cur.execute(f'SELECT "{column_name}" FROM "{table_name}"')
-            all_data = [row[0] for row in cur.fetchall()]
-
-            # データ型を判定・集計
-            type_counts = {'整数': 0, '浮動小数点数': 0, '日付': 0, '文字列': 0, '空値': 0}
-            misc_samples = [] # 文字列と判定されたもののサンプル
-            for value in all_data:
-                if value is None or str(value).strip() == '':
-                    type_counts['空値'] += 1
-                elif self.is_integer(value):
-                    type_counts['整数'] += 1
-                elif self.is_float(value):
-                    type_counts['浮動小数点数'] += 1
-                elif self.is_date(value):
-                    type_counts['日付'] += 1
-                else:
-                    type_counts['文字列'] += 1
-                    if len(misc_samples) < 5: # 5件までサンプルを収集
-                        misc_samples.append(str(value))
-            
-            # 結果を表示
-            total = len(all_data)
-            result_message = f"テーブル: {table_name}\n列: {column_name}\n\nデータ型分布 (総件数: {total}):\n"
-            for data_type, count in type_counts.items():
+        def show_result(profile, samples):
+            column = profile['columns'].get(column_name)
+            if column is None:
+                messagebox.showwarning("データ型チェック", f"列 '{column_name}' はテーブル '{table_name}' にありません。")
+                return
+            total = profile['total']
+            sampled = " ※サンプリング" if profile['sampled'] else ""
+            result_message = f"テーブル: {table_name}\n列: {column_name} (宣言型: {column['declared_type'] or 'なし'})\n\n"
+            result_message += f"データ型分布 (総件数: {total}{sampled}):\n"
+            for data_type in TYPE_LABELS:
+                count = column['counts'][data_type]
                 if count > 0:
                     percentage = (count / total) * 100
                     result_message += f"- {data_type}: {count}件 ({percentage:.2f}%)\n"
-            
-            if misc_samples:
-                result_message += "\n[補足] 文字列と判定されたデータのサンプル：\n- " + "\n- ".join(misc_samples)
+            result_message += (f"\nNULL: {column['nulls']}件 / 空文字: {column['empty_strings']}件\n"
+                               f"文字列長: 最小 {column['min_length']} / 最大 {column['max_length']} "
+                               f"/ 平均 {column['avg_length']:.1f}\n"
+                               "格納型: " + ", ".join(f"{k}={v}" for k, v in column['storage'].items() if v) + "\n")
 
-            self.show_text_dialog(f"{column_name}列 データ型チェック結果", result_message)
+            if samples:
+                result_message += "\n[補足] 文字列と判定されたデータのサンプル：\n- " + "\n- ".join(samples)
 
-        except Exception as e:
-            messagebox.showerror("エラー", f"データ型チェック中にエラーが発生しました。\n{e}")
+            suggested = suggest_target_type(column['counts'])
+            self.show_text_dialog(f"{column_name}列 データ型チェック結果", result_message, actions=[
+                (f"[CONVERT] 列の型を変換 ({suggested})...",
+                 lambda: self.start_column_type_conversion(table_name, column_name, column['declared_type'], suggested))])
 
-    def is_integer(self, value):
-        try:
-            int(value)
-            return True
-        except (ValueError, TypeError):
-            return False
+        def task(conn):
+            return string_samples(conn, table_name, column_name)
 
-    def is_float(self, value):
-        try:
-            float(value)
-            return True
-        except (ValueError, TypeError):
-            return False
+        self.run_table_profile(table_name, lambda profile: self.run_background_task(
+            "サンプル取得", task, lambda samples: show_result(profile, samples), read_only=True))
 
-    def is_date(self, value):
-        # よく使われる日付フォーマットを試す
-        formats = ['%Y-%m-%d', '%Y/%m/%d', '%Y-%m-%d %H:%M:%S', '%Y/%m/%d %H:%M:%S']
-        if not isinstance(value, str):
-            return False
-        for fmt in formats:
-            try:
-                datetime.strptime(value, fmt)
-                return True
-            except ValueError:
-                continue
-        return False
+    def convert_clicked_column_type(self):
+        """右クリックした列の型を変換する"""
+        column_name = self.clicked_column_name()
+        table_name = self.table_var.get()
+        if not column_name or not table_name or not self.conn:
+            return
+        declared = self.schema.declared_types(table_name).get(column_name, "")
+        self.start_column_type_conversion(table_name, column_name, declared, declared.upper() if declared.upper() in TARGET_TYPES else "TEXT")
+
+    def start_column_type_conversion(self, table_name, column_name, declared_type, suggested_type):
+        """変換先の型を選び、変換できない値を確認してから列の型を変換する"""
+        if self.result_loading or self.import_runner.is_busy():
+            messagebox.showwarning("列の型を変換", "読み込み中・インポート中は実行できません。")
+            return
+        if column_name in self.schema.generated_columns(table_name):
+            messagebox.showwarning("列の型を変換", f"'{column_name}' は生成列のため型を変換できません。")
+            return
+        dialog = ColumnTypeDialog(self.root, table_name, column_name, declared_type, suggested_type)
+        if not dialog.result:
+            return
+        target = dialog.result
+
+        def confirm(preview):
+            message = f"テーブル '{table_name}' の列 '{column_name}' を {target} に変換します（{preview['total']:,}行）。\n"
+            if preview['failures']:
+                message += f"\n変換できない値が {preview['failures']:,}件あり、NULLになります。\n例 (値: 件数, 最初のrowid):\n"
+                message += "\n".join(f"- {value!r}: {count}件 (rowid {rowid})" for value, count, rowid in preview['samples'][:10])
+                message += "\n"
+            else:
+                message += "\nすべての値を変換できます。\n"
+            message += "\n実行しますか？"
+            if messagebox.askyesno("列の型を変換", message, icon='warning' if preview['failures'] else 'question'):
+                self.run_background_task(
+                    f"'{table_name}.{column_name}'の型変換",
+                    lambda conn: convert_column_type(conn, table_name, column_name, target), on_converted)
+
+        def on_converted(result):
+            self.column_profile_cache.invalidate(table_name)
+            self.refresh_schema()
+            self.status_var.set(f"[CONVERT] {table_name}.{column_name} を {target} に変換しました "
+                                f"({result['rows']:,}行, 変換できずNULL: {result['failures']:,}件, {result['elapsed_sec']:.1f}秒)")
+            if result['failures']:
+                self.show_text_dialog(
+                    f"{column_name}列 型変換の結果",
+                    f"変換できずNULLになった値: {result['failures']:,}件\n\n"
+                    + "\n".join(f"- {value!r}: {count}件 (rowid {rowid})" for value, count, rowid in result['samples'])
+                    + "\n\n※ 再インポートすると設定ファイルの型指定で作り直されます。必要に応じて設定ファイルも変更してください。")
+
+        self.run_background_task("型変換の事前チェック",
+                                 lambda conn: preview_conversion(conn, table_name, column_name, target), confirm,
+                                 read_only=True)
+
+    def show_table_profile(self):
+        """選択中テーブルの全列のデータ型分布を一覧表示する"""
+        table_name = self.table_var.get()
+        if not table_name or not self.conn:
+            messagebox.showwarning("データ型プロファイル", "テーブルが選択されていません。")
+            return
+
+        def show(profile):
+            window = tk.Toplevel(self.root)
+            sampled = " (サンプリング)" if profile['sampled'] else ""
+            window.title(f"データ型プロファイル - {table_name} ({profile['total']:,}件{sampled})")
+            window.geometry("1000x450")
+            window.transient(self.root)
+
+            columns = ("column", "declared_type") + tuple(TYPE_LABELS) + ("nulls", "empty", "min_len", "max_len", "avg_len")
+            headings = ("カラム", "宣言型") + tuple(TYPE_LABELS) + ("NULL", "空文字", "最小長", "最大長", "平均長")
+            tree = ttk.Treeview(window, columns=columns, show='headings')
+            for col, heading in zip(columns, headings):
+                tree.heading(col, text=heading)
+                tree.column(col, width=80, minwidth=40)
+            tree.column("column", width=160)
+            scroll = ttk.Scrollbar(window, orient=tk.VERTICAL, command=tree.yview)
+            tree.configure(yscrollcommand=scroll.set)
+            tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(10, 0), pady=10)
+            scroll.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
+
+            for name, col in profile['columns'].items():
+                tree.insert('', 'end', values=(
+                    name, col['declared_type'], *[col['counts'][label] for label in TYPE_LABELS],
+                    col['nulls'], col['empty_strings'], col['min_length'], col['max_length'],
+                    f"{col['avg_length']:.1f}"))
+
+        self.run_table_profile(table_name, show)
+
+    def run_table_profile(self, table_name, on_done):
+        """テーブルのプロファイルをキャッシュから返すか、バックグラウンドで集計する"""
+        sample_size = None
+        if estimate_row_count(self.conn, table_name) > SAMPLE_THRESHOLD:
+            if messagebox.askyesno("データ型プロファイル",
+                                   f"テーブル '{table_name}' は {SAMPLE_THRESHOLD:,}件を超えています。\n"
+                                   f"約{DEFAULT_SAMPLE_SIZE:,}件のサンプリングで集計しますか？\n(いいえ: 全件を集計)"):
+                sample_size = DEFAULT_SAMPLE_SIZE
+
+        fingerprint = table_fingerprint(self.conn, table_name)
+        cached = self.column_profile_cache.get(table_name, sample_size, fingerprint)
+        if cached:
+            self.status_var.set(f"[PROFILE] '{table_name}' のプロファイル (キャッシュ)")
+            on_done(cached)
+            return
+
+        def on_success(profile):
+            self.column_profile_cache.put(table_name, sample_size, fingerprint, profile)
+            on_done(profile)
+
+        self.run_background_task(f"'{table_name}'のデータ型プロファイル",
+                                 lambda conn: profile_table(conn, table_name, sample_size), on_success,
+                                 read_only=True)
 
     def check_for_missing_data(self):
         """格納漏れチェック(行データ)を実行する"""
-        dialog = MissingDataCheckDialog(self.root, self.tables, self.table_var.get(), self.conn)
+        dialog = MissingDataCheckDialog(self.root, self.tables, self.table_var.get(), self.schema)
         if dialog.result:
             self.run_missing_data_check(dialog.result)
 
     def check_for_unimported_files(self):
-        """テキストフォルダ内のファイルとDBのテーブルを比較し、インポートされていないファイルを検出する"""
+        """テキストフォルダ内のファイルとインポート台帳を比較し、未インポート・要再インポートのファイルを検出する"""
         base_dir = os.path.dirname(__file__)
         text_dir = os.path.join(base_dir, 'テキスト')
 
@@ -547,82 +1329,179 @@ class SQLiteGUIManager:
             return
 
         try:
-            supported_extensions = ['.csv', '.txt', '.tsv', '.xlsx', '.xls']
-            source_files = [f for f in os.listdir(text_dir) if Path(f).suffix.lower() in supported_extensions]
-            
-            expected_tables = {Path(f).stem.lower() for f in source_files}
-            existing_tables = set(self.tables)
-            unimported_tables = expected_tables - existing_tables
-            
-            if not unimported_tables:
-                messagebox.showinfo("チェック完了", "すべてのファイルがインポートされているようです。")
+            unimported_files = find_unimported_files(self.conn, os.listdir(text_dir), self.tables)
+            outdated = [(entry, status) for entry, status in self.load_import_statuses() if status != 'ok']
+
+            if not unimported_files and not outdated:
+                messagebox.showinfo("チェック完了", "すべてのファイルがインポートされており、最新の状態です。")
                 return
 
-            unimported_files = []
-            for table_name in sorted(list(unimported_tables)):
-                for f in source_files:
-                    if Path(f).stem.lower() == table_name:
-                        unimported_files.append(f)
-                        break
-            
-            result_message = f"以下の {len(unimported_files)} 件のファイルは、まだインポートされていないようです：\n\n" + "\n".join(sorted(unimported_files))
-            self.show_text_dialog("未インポートのファイル一覧", result_message)
+            result_message = ""
+            if unimported_files:
+                result_message += (f"以下の {len(unimported_files)} 件のファイルは、まだインポートされていないようです：\n\n"
+                                   + "\n".join(unimported_files) + "\n\n")
+            if outdated:
+                result_message += f"以下の {len(outdated)} 件のテーブルは、インポート後に元ファイルまたは設定が変わっています：\n\n"
+                result_message += "\n".join(f"{entry['table_name']} ({entry['source_file']}): {IMPORT_STATUS_LABELS[status]}"
+                                            for entry, status in outdated)
+            self.show_text_dialog("未インポート・要再インポートのファイル一覧", result_message.strip())
 
         except Exception as e:
             messagebox.showerror("エラー", f"未インポートのファイルのチェック中にエラーが発生しました。\n{e}")
 
-    def run_missing_data_check(self, config):
-        """ダイアログからの情報をもとに、格納漏れチェックを実行し、結果をCSVに出力する"""
-        source_file = config['source_file']
-        table_name = config['table_name']
-        source_key = config['source_key']
-        db_key = config['db_key']
+    def load_import_statuses(self):
+        """インポート台帳の各テーブルと鮮度 (ok/stale/config_changed/missing) の一覧"""
+        file_configs = {
+            'excel': load_excel_config().get('files', {}),
+            'csv_txt': load_csv_txt_config().get('files', {}),
+        }
+        return [
+            (entry, import_status(entry, config_hash(file_configs.get(entry['import_type'], {}).get(entry['source_file'], {}))))
+            for entry in load_imports(self.conn)
+        ]
+
+    def show_import_registry(self):
+        """インポート台帳（元ファイル・行数・処理時間・鮮度）を一覧表示する"""
+        if not self.conn:
+            return
+        statuses = self.load_import_statuses()
+        if not statuses:
+            messagebox.showinfo("インポート台帳", "インポート台帳に記録がありません。\n(インポーターで取り込むと記録されます)")
+            return
 
-        progress_dialog = self.show_progress_dialog("格納漏れチェック実行中...")
+        window = tk.Toplevel(self.root)
+        window.title(f"インポート台帳 ({len(statuses)}件)")
+        window.geometry("1000x400")
+
+        columns = ("テーブル", "元ファイル", "種別", "行数", "処理時間(秒)", "インポート日時", "状態")
+        tree = ttk.Treeview(window, columns=columns, show='headings')
+        for col, width in zip(columns, (160, 220, 70, 90, 90, 150, 200)):
+            tree.heading(col, text=col)
+            tree.column(col, width=width, anchor=tk.E if col in ("行数", "処理時間(秒)") else tk.W)
+        for entry, status in statuses:
+            tree.insert('', tk.END, values=(
+                entry['table_name'], entry['source_file'], entry['import_type'],
+                f"{entry['row_count']:,}" if entry['row_count'] is not None else "",
+                f"{entry['duration_sec']:.1f}" if entry['duration_sec'] is not None else "",
+                entry['imported_at'], IMPORT_STATUS_LABELS[status]))
+        scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        try:
-            # 1. 元ファイルを読み込み
-            if source_file.endswith('.csv'):
-                source_df = pd.read_csv(source_file, dtype={source_key: str})
-            else:
-                source_df = pd.read_excel(source_file, dtype={source_key: str})
-            
-            # 2. DBデータを読み込み
-            db_query = f'SELECT "{db_key}" FROM "{table_name}"'
-            db_df = pd.read_sql_query(db_query, self.conn, dtype={db_key: str})
-
-            # 3. マージして差分を検出
-            source_df[source_key] = source_df[source_key].astype(str)
-            db_df[db_key] = db_df[db_key].astype(str)
-            merged_df = pd.merge(source_df, db_df, left_on=source_key, right_on=db_key, how='left', indicator=True)
-            
-            missing_data = merged_df[merged_df['_merge'] == 'left_only']
-            missing_count = len(missing_data)
+    def run_missing_data_check(self, config):
+        """
+        ダイアログからの情報をもとに、格納漏れチェックをバックグラウンドで実行し、結果をCSVに出力する
+        元ファイル・DBキーを一時テーブルに格納してアンチジョインするため、大きなファイルでもメモリを消費しない
+        """
+        save_path = filedialog.asksaveasfilename(
+            title="格納漏れデータの保存先",
+            defaultextension=".csv",
+            initialfile=f"{Path(config['source_file']).stem}_格納漏れ.csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not save_path:
+            return
 
-            progress_dialog.destroy()
+        progress_window, on_progress, cancel_event = self.show_reconcile_progress("格納漏れチェック実行中...")
 
-            # 4. 結果をCSVに出力
-            if missing_count > 0:
-                save_path = filedialog.asksaveasfilename(
-                    title="格納漏れデータを保存",
-                    defaultextension=".csv",
-                    filetypes=[("CSV files", "*.csv"), ("All files", "*.*m")])
-                
-                if save_path:
-                    result_df = missing_data.drop(columns=['_merge', db_key])
-                    result_df.to_csv(save_path, index=False, encoding='utf-8-sig')
-                    messagebox.showinfo("チェック完了", 
-                                        f"{missing_count}件の格納漏れデータが見つかりました。\n\n結果を以下に保存しました:\n{save_path}")
-                else:
-                    messagebox.showinfo("チェック完了", f"{missing_count}件の格納漏れデータが見つかりましたが、保存はキャンセルされました。")
+        def on_done(result):
+            progress_window.destroy()
+            if result['missing']:
+                messagebox.showinfo("チェック完了",
+                                    f"元ファイル {result['source_rows']:,}件中、{result['missing']:,}件の格納漏れデータが見つかりました。"
+                                    f"\n\n結果を以下に保存しました:\n{result['path']}")
             else:
                 messagebox.showinfo("チェック完了", "格納漏れデータは見つかりませんでした。")
+            self.status_var.set(f"[VALIDATE] 格納漏れチェック完了: {result['missing']:,}件")
 
-        except Exception as e:
-            if 'progress_dialog' in locals() and progress_dialog.winfo_exists():
-                progress_dialog.destroy()
-            messagebox.showerror("エラー", f"格納漏れチェック中にエラーが発生しました。\n{e}")
+        def on_error(error):
+            progress_window.destroy()
+            if isinstance(error, ReconcileCancelled):
+                self.status_var.set("[VALIDATE] 格納漏れチェックをキャンセルしました")
+                return
+            self.status_var.set(f"[ERROR] 格納漏れチェックエラー: {error}")
+            messagebox.showerror("エラー", f"格納漏れチェック中にエラーが発生しました。\n{error}")
+
+        self.run_background_task(
+            "格納漏れチェック",
+            lambda conn, report: reconcile_missing_rows(conn, config['source_file'], config['table_name'],
+                                                        config['key_pairs'], save_path,
+                                                        progress=report, cancel_event=cancel_event),
+            on_done, on_progress, on_error)
     
+    def show_reconcile_progress(self, title):
+        """突合処理用のキャンセル可能な進捗ウィンドウ（ウィンドウ, 進捗コールバック, キャンセルEvent）"""
+        cancel_event = threading.Event()
+
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title(title)
+        progress_window.geometry("400x110")
+        progress_window.transient(self.root)
+        progress_window.resizable(False, False)
+        progress_label = ttk.Label(progress_window, text="元ファイルを読み込んでいます...", padding=(20, 15, 20, 5))
+        progress_label.pack(fill=tk.X)
+        ttk.Button(progress_window, text="キャンセル", command=cancel_event.set).pack(pady=5)
+        progress_window.protocol("WM_DELETE_WINDOW", cancel_event.set)
+
+        def on_progress(stage, count):
+            progress_label['text'] = f"{stage}: {count:,} 件"
+
+        return progress_window, on_progress, cancel_event
+
+    def check_row_hashes(self):
+        """
+        選択中テーブルと元ファイルの全列を行ハッシュで突合する
+        キーが一致していてもクリーニングで値が変わった行（日付の切り捨て・'.0'の欠落など）を検出する
+        """
+        table_name = self.table_var.get()
+        if not table_name or not self.conn:
+            messagebox.showwarning("行ハッシュ突合", "テーブルが選択されていません。")
+            return
+
+        source_file = filedialog.askopenfilename(title=f"'{table_name}' の元ファイルを選択", filetypes=SOURCE_FILETYPES)
+        if not source_file:
+            return
+        save_path = filedialog.asksaveasfilename(
+            title="差分行の保存先",
+            defaultextension=".csv",
+            initialfile=f"{table_name}_行差分.csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not save_path:
+            return
+
+        progress_window, on_progress, cancel_event = self.show_reconcile_progress("行ハッシュ突合実行中...")
+
+        def on_done(result):
+            progress_window.destroy()
+            message = (f"元ファイル: {result['source_rows']:,}件 / テーブル: {result['db_rows']:,}件\n"
+                       f"比較列: {len(result['columns'])}列 / 不一致パーティション: "
+                       f"{result['mismatched_partitions']:,} / {result['partitions']:,}\n")
+            if result['source_only_columns']:
+                message += f"元ファイルのみの列（比較対象外）: {', '.join(result['source_only_columns'])}\n"
+            if result['db_only_columns']:
+                message += f"テーブルのみの列（比較対象外）: {', '.join(result['db_only_columns'])}\n"
+            if result['path']:
+                message += (f"\n元ファイルのみの行: {result['source_only']:,}件 / テーブルのみの行: {result['db_only']:,}件\n"
+                            f"差分行を以下に保存しました:\n{result['path']}")
+            else:
+                message += "\n全ての行が一致しました。"
+            self.show_text_dialog(f"行ハッシュ突合結果 - {table_name}", message)
+            self.status_var.set(f"[VALIDATE] 行ハッシュ突合完了: 差分 {result['source_only'] + result['db_only']:,}件")
+
+        def on_error(error):
+            progress_window.destroy()
+            if isinstance(error, ReconcileCancelled):
+                self.status_var.set("[VALIDATE] 行ハッシュ突合をキャンセルしました")
+                return
+            self.status_var.set(f"[ERROR] 行ハッシュ突合エラー: {error}")
+            messagebox.showerror("エラー", f"行ハッシュ突合中にエラーが発生しました。\n{error}")
+
+        self.run_background_task(
+            "行ハッシュ突合",
+            lambda conn, report: run_row_hash_check(conn, source_file, table_name, save_path,
+                                                    progress=report, cancel_event=cancel_event),
+            on_done, on_progress, on_error)
+
     def setup_search_area(self, parent):
         """検索エリア構築"""
         search_frame = ttk.LabelFrame(parent, text="[SEARCH] 検索", padding="5")
@@ -649,7 +1528,11 @@ class SQLiteGUIManager:
         search_type_combo.grid(row=2, column=1, pady=2)
         
         ttk.Button(search_frame, text="[SEARCH] 検索", 
-                  command=self.search_data).grid(row=3, column=0, columnspan=2, pady=5)
+                  command=self.search_data).grid(row=3, column=0, pady=5)
+        ttk.Button(search_frame, text="[SEARCH] 詳細検索",
+                  command=self.advanced_search).grid(row=3, column=1, pady=5)
+        ttk.Button(search_frame, text="[SEARCH] 全テーブルから検索",
+                  command=self.show_global_search).grid(row=4, column=0, columnspan=2, pady=(0, 5))
 
     def setup_right_panel(self, parent):
         """右パネル構築"""
@@ -676,6 +1559,8 @@ class SQLiteGUIManager:
         
         ttk.Button(sql_button_frame, text="[EXEC] SQL実行", 
                   command=self.execute_sql).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(sql_button_frame, text="[PROFILE] 実行計画/計測", 
+                  command=self.profile_sql).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(sql_button_frame, text="[CLEAR] クリア", 
                   command=self.clear_sql_text).pack(side=tk.LEFT, padx=(0, 5))
         
@@ -694,10 +1579,20 @@ class SQLiteGUIManager:
         self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         tree_scroll_v.grid(row=0, column=1, sticky=(tk.N, tk.S))
         tree_scroll_h.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        self.next_page_button = ttk.Button(data_frame, text=f"[NEXT] 次の{PAGE_SIZE}件を表示",
+                                           command=self.load_next_page, state='disabled')
+        self.next_page_button.grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
 
         # 右クリックメニューの設定
         self.tree_menu = tk.Menu(self.tree, tearoff=0)
+        self.tree_menu.add_command(label="[SORT] 昇順で並べ替え", command=lambda: self.sort_clicked_column(False))
+        self.tree_menu.add_command(label="[SORT] 降順で並べ替え", command=lambda: self.sort_clicked_column(True))
+        self.tree_menu.add_command(label="[FILTER] この列で絞り込み...", command=self.filter_clicked_column)
+        self.tree_menu.add_command(label="[FILTER] 並べ替え・絞り込みを解除", command=self.clear_sort_and_filters)
+        self.tree_menu.add_separator()
         self.tree_menu.add_command(label="[VALIDATE] 選択列のデータ型チェック", command=self.check_column_data_types)
+        self.tree_menu.add_command(label="[PROFILE] 全列のデータ型プロファイル", command=self.show_table_profile)
+        self.tree_menu.add_command(label="[CONVERT] 選択列の型を変換...", command=self.convert_clicked_column_type)
         self.tree.bind("<Button-3>", self.show_tree_menu)
     
     def setup_status_bar(self):
@@ -727,7 +1622,7 @@ class SQLiteGUIManager:
         file_menu.add_command(label="[DB] データベース選択", command=self.select_database)
         file_menu.add_command(label="[DB] 新規データベース", command=self.create_new_database)
         file_menu.add_separator()
-        file_menu.add_command(label="[EXPORT] CSVエクスポート", command=self.export_sql_results)
+        file_menu.add_command(label="[EXPORT] 結果を全件エクスポート (CSV/TSV/Excel/Parquet)", command=self.export_sql_results)
         file_menu.add_separator()
         file_menu.add_command(label="[EXIT] 終了", command=self.root.quit)
         
@@ -738,20 +1633,34 @@ class SQLiteGUIManager:
         data_menu.add_command(label="[STATS] DB統計情報", command=self.show_db_stats)
         data_menu.add_separator()
         data_menu.add_command(label="[VALIDATE] 格納漏れチェック (行データ)", command=self.check_for_missing_data)
+        data_menu.add_command(label="[VALIDATE] 行ハッシュ突合 (全列, 選択テーブル)", command=self.check_row_hashes)
         data_menu.add_command(label="[VALIDATE] 未インポートのファイルを確認", command=self.check_for_unimported_files)
+        data_menu.add_command(label="[REGISTRY] インポート台帳", command=self.show_import_registry)
+        data_menu.add_command(label="[PROFILE] 全列のデータ型プロファイル (選択テーブル)", command=self.show_table_profile)
         data_menu.add_separator()
         data_menu.add_command(label="[IMPORT] 全Excelを一括インポート", command=self.batch_import_excel)
         data_menu.add_command(label="[IMPORT] 全CSV/TXTを一括インポート", command=self.batch_import_csv_txt)
         data_menu.add_command(label="[IMPORT] 全ファイル(Excel,CSV,TXT)を一括インポート", command=self.batch_import_all)
+        data_menu.add_command(label="[IMPORT] インポートジョブ (進捗・ログ)", command=self.show_import_jobs)
+        data_menu.add_separator()
+        data_menu.add_command(label="[FTS] 全文検索インデックス設定 (選択テーブル)", command=self.setup_fts_index)
+        data_menu.add_command(label="[FTS] 全文検索インデックス削除 (選択テーブル)", command=self.remove_fts_index)
+        data_menu.add_command(label="[INDEX] インデックス推奨", command=self.show_index_advisor)
+        data_menu.add_command(label="[SEARCH] 全テーブルから値を検索", command=self.show_global_search)
         data_menu.add_separator()
-        data_menu.add_command(label="[VACUUM] DB最適化", command=self.vacuum_database)
+        data_menu.add_command(label="[VACUUM] DB最適化 (増分VACUUM / 再構築)", command=self.vacuum_database)
         data_menu.add_command(label="[DELETE] 全テーブルを削除", command=self.delete_all_tables)
         
         # SQLメニュー
         sql_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="[SQL] SQL", menu=sql_menu)
         sql_menu.add_command(label="[SAMPLE] サンプルSQL", command=self.load_sample_sql)
+        sql_menu.add_command(label="[SAVED] 定型クエリ", command=self.show_predefined_queries)
+        sql_menu.add_command(label="[SAVED] 現在のSQLを定型クエリとして保存", command=self.save_current_query)
         sql_menu.add_command(label="[FORMAT] SQL整形", command=self.format_sql_text)
+        sql_menu.add_separator()
+        sql_menu.add_command(label="[PROFILE] 実行計画/計測", command=self.profile_sql)
+        sql_menu.add_command(label="[PROFILE] スロークエリログ", command=self.show_slow_query_log)
 
     def batch_import_excel(self, show_completion_message=True):
         """全Excelファイルの一括インポートを開始する"""
@@ -759,7 +1668,7 @@ class SQLiteGUIManager:
             return
         base_dir = os.path.dirname(__file__)
         command = ['python', os.path.join(base_dir, 'universal_excel_to_sqlite.py'), os.path.join(base_dir, 'テキスト'), self.db_path]
-        self.run_importer_process(command, "Excel一括インポート", show_completion_message)
+        return self.run_importer_process(command, "Excel一括インポート", show_completion_message)
 
     def batch_import_csv_txt(self, show_completion_message=True):
         """全CSV/TXTファイルの一括インポートを開始する"""
@@ -767,45 +1676,33 @@ class SQLiteGUIManager:
             return
         base_dir = os.path.dirname(__file__)
         command = ['python', os.path.join(base_dir, 'universal_csv_txt_to_sqlite.py'), os.path.join(base_dir, 'テキスト'), self.db_path]
-        self.run_importer_process(command, "CSV/TXT一括インポート", show_completion_message)
+        return self.run_importer_process(command, "CSV/TXT一括インポート", show_completion_message)
 
     def batch_import_all(self):
-        """すべてのファイルの一括インポートを開始する"""
-        if not messagebox.askyesno("確認", "テキストフォルダ内のすべてのファイルを一括インポートしますか？\n(Excel -> CSV/TXT の順で実行されます)"):
+        """すべてのファイルの一括インポートを開始する（Excel・CSV/TXTを1つのジョブで並列に準備し、書き込みは直列）"""
+        if not messagebox.askyesno("確認", "テキストフォルダ内のすべてのファイルを一括インポートしますか？\n(Excel・CSV/TXTを大きいファイルから並列に処理します)"):
             return
-        
-        self.batch_import_excel(show_completion_message=False)
-        self.batch_import_csv_txt(show_completion_message=False)
-        
-        messagebox.showinfo("一括インポート完了", "すべてのファイルの一括インポート処理が完了しました。")
-        self.connect_database()
+        base_dir = os.path.dirname(__file__)
+        command = ['python', os.path.join(base_dir, 'universal_batch_import.py'), os.path.join(base_dir, 'テキスト'), self.db_path]
+        return self.run_importer_process(command, "全ファイル一括インポート")
 
     def connect_database(self):
-        """データベース接続"""
+        """データベース接続（起動時・DB切替・再読込のみ。DB内の変更は refresh_schema で反映する）"""
         try:
-            if self.conn:
-                self.conn.close()
-            
-            self.conn = sqlite3.connect(self.db_path)
-            # パフォーマンス設定
-            self.conn.execute("PRAGMA journal_mode=WAL;")
-            self.conn.execute("PRAGMA cache_size=10000;")
-            self.conn.execute("PRAGMA synchronous=NORMAL;")
-            
-            # テーブル一覧取得
-            cur = self.conn.cursor()
-            cur.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
-            self.tables = [row[0] for row in cur.fetchall()]
-            
-            # コンボボックス更新
-            if hasattr(self, 'table_combo'):
-                self.table_combo['values'] = self.tables
-                if self.tables:
-                    self.table_combo.set(self.tables[0])
-                    self.on_table_selected()
-                else:
-                    self.table_combo.set('') # テーブルがない場合はクリア
-                    self.display_data([], []) # データ表示もクリア
+            if self.db:
+                self.flush_query_log()
+                if self.db.db_path != self.db_path:
+                    # 書き込めなかった記録は前のDBのものなので、切り替え先には持ち込まない
+                    self.query_log.clear()
+                self.db.close()
+            
+            self.db = ConnectionManager(self.db_path)
+            self.conn = self.db.writer
+            self.read_conn = self.db.reader
+            self.schema = SchemaCache(self.read_conn)
+            self.column_profile_cache.invalidate()
+            self.db_stats_cache = None
+            self.load_table_list(keep_selection=False)
             
             # ステータス更新
             if hasattr(self, 'db_info_var'):
@@ -814,6 +1711,7 @@ class SQLiteGUIManager:
             
             if hasattr(self, 'status_var'):
                 self.status_var.set(f"[STATUS] DB接続完了 - {len(self.tables)}テーブル")
+                self.refresh_fts_indexes()
             
             return True
         except Exception as e:
@@ -821,7 +1719,67 @@ class SQLiteGUIManager:
                 self.status_var.set(f"[ERROR] DB接続失敗: {e}")
             messagebox.showerror("DB接続エラー", f"データベースに接続できません:\n{e}")
             return False
-    
+
+    def load_table_list(self, keep_selection=True):
+        """テーブル一覧を読み込んでコンボボックスを更新する（keep_selection=Trueなら選択中のテーブルを維持）"""
+        self.tables = [name for name in self.schema.tables() if not self.is_hidden_table(name)]
+        
+        # コンボボックス更新
+        if hasattr(self, 'table_combo'):
+            current = self.table_var.get()
+            self.table_combo['values'] = self.tables
+            if keep_selection and current in self.tables:
+                self.on_table_selected()
+            elif self.tables:
+                self.table_combo.set(self.tables[0])
+                self.on_table_selected()
+            else:
+                self.table_combo.set('') # テーブルがない場合はクリア
+                self.set_result_view(None, [], []) # データ表示もクリア
+
+    def refresh_schema(self, refresh_fts=False):
+        """
+        インポート・DDL・VACUUMなどの後に呼ぶ。接続は張り直さず、PRAGMA schema_version が変わっていれば
+        テーブル一覧だけを読み直す（選択中のテーブルはそのまま）。他の接続による更新があればキャッシュを破棄する
+        """
+        if not self.db:
+            return
+        schema_changed = self.db.schema_changed()
+        if self.db.data_changed() or schema_changed:
+            self.column_profile_cache.invalidate()
+        self.db.resize_mmap()
+        if schema_changed:
+            self.load_table_list()
+            self.status_var.set(f"[STATUS] テーブル一覧を更新しました - {len(self.tables)}テーブル")
+            if refresh_fts:
+                self.refresh_fts_indexes()
+
+    def is_hidden_table(self, table_name):
+        """FTSテーブルや内部管理用テーブルなど、一覧に表示しないテーブルかどうか"""
+        return (is_fts_table(table_name) or is_cache_table(table_name) or table_name in INTERNAL_TABLES
+                or table_name.endswith(STAGING_SUFFIX))
+
+    def record_query_pattern(self, record):
+        """
+        インデックス推奨用に検索・クエリパターンを記録する（失敗しても本処理は止めない）
+        record は self.query_log に観測結果を溜める関数。DBへは溜まった件数が上限に達した時だけ書き込む
+        """
+        try:
+            record()
+            if self.query_log.is_full():
+                self.query_log.flush(self.conn)
+        except sqlite3.Error as e:
+            print(f"[WARNING] クエリパターン記録エラー: {e}")
+
+    def flush_query_log(self):
+        """メモリに溜めた検索・クエリパターンとスロークエリをDBへ書き込む"""
+        if not self.conn:
+            return
+        try:
+            self.query_log.flush(self.conn)
+        except sqlite3.Error as e:
+            print(f"[WARNING] クエリパターン記録エラー: {e}")
+
     def show_record_count(self):
         """選択中のテーブルのレコード数を表示"""
         try:
@@ -829,7 +1787,7 @@ class SQLiteGUIManager:
             if not table or not self.conn:
                 return
             
-            cur = self.conn.cursor()
+            cur = self.read_conn.cursor()
             cur.execute(f"SELECT COUNT(*) FROM [{table}];")
             count = cur.fetchone()[0]
             
@@ -844,30 +1802,12 @@ class SQLiteGUIManager:
             messagebox.showerror("エラー", f"レコード数取得エラー:\n{e}")
 
     def show_all_data(self):
-        """選択中のテーブルの全データを表示"""
-        try:
-            table = self.table_var.get()
-            if not table or not self.conn:
-                return
-
-            # データ取得
-            cur = self.conn.cursor()
-            cur.execute(f"SELECT * FROM [{table}] LIMIT 1000;")  # 最大1000件に制限
-            rows = cur.fetchall()
-
-            # カラム名取得
-            cur.execute(f"PRAGMA table_info([{table}]);")
-            columns = [row[1] for row in cur.fetchall()]
-
-            self.display_data(columns, rows)
-            
-            if hasattr(self, 'status_var'):
-                self.status_var.set(f"データ取得完了: {len(rows)}件")
-
-        except Exception as e:
-            if hasattr(self, 'status_var'):
-                self.status_var.set(f"[ERROR] データ取得: {e}")
-            messagebox.showerror("エラー", f"データ取得エラー:\n{e}")
+        """選択中のテーブルのデータを表示（1000件ずつ。列見出しのクリックでDB側で並べ替える）"""
+        table = self.table_var.get()
+        if not table or not self.conn:
+            return
+        self.load_result_view(ResultView.for_table(table),
+                              lambda rows: self.status_var.set(f"データ取得完了: {len(rows)}件"))
 
     def display_data(self, columns, rows):
         """データをTreeviewに表示"""
@@ -881,18 +1821,152 @@ class SQLiteGUIManager:
             self.tree['show'] = 'headings'
             
             for col in columns:
-                self.tree.heading(col, text=col)
+                self.tree.heading(col, text=col, command=lambda c=col: self.on_heading_click(c))
                 self.tree.column(col, width=100, minwidth=50)
             
-            # データ追加
-            for row in rows:
-                # None値を空文字に変換
-                display_row = [str(val) if val is not None else '' for val in row]
-                self.tree.insert('', 'end', values=display_row)
+            self.append_rows(rows)
             
         except Exception as e:
             messagebox.showerror("エラー", f"データ表示エラー:\n{e}")
 
+    def append_rows(self, rows):
+        """Treeviewの末尾に行を追加する"""
+        for row in rows:
+            # None値を空文字に変換
+            display_row = [str(val) if val is not None else '' for val in row]
+            self.tree.insert('', 'end', values=display_row)
+
+    def set_result_view(self, view, columns, rows):
+        """データを表示し、その元クエリ（並べ替え・絞り込み・次ページの読み込み位置）を記録する"""
+        self.result_view = view
+        self.current_query = view.query() if view else None
+        self.display_data(columns, rows)
+        if view:
+            for col in columns:
+                text = col
+                if view.sort and view.sort[0] == col:
+                    text += " ▼" if view.sort[1] else " ▲"
+                if col in view.filters:
+                    text += f" [{describe_filter(view.filters[col])}]"
+                self.tree.heading(col, text=text)
+        self.next_page_button['state'] = 'normal' if view and not view.exhausted else 'disabled'
+
+    def load_result_view(self, view, on_loaded=None):
+        """
+        表示データのクエリ（並べ替え・絞り込みを含む）の先頭ページをバックグラウンドで読んで表示する
+        行数の多いテーブルを、インデックスのない列で並べ替える場合は、先にその列のインデックスを作成する
+        """
+        if self.result_loading:
+            self.status_var.set("[RUNNING] データを読み込み中です。完了後に操作してください")
+            return
+        try:
+            view.prepare(self.read_conn, self.schema)
+            index_column = view.sort_needs_index(self.read_conn, self.schema)
+        except (ValueError, sqlite3.Error) as e:
+            messagebox.showwarning("データ表示", str(e))
+            return
+        view.reset()
+        self.result_loading = True
+
+        def on_done(result):
+            self.result_loading = False
+            columns, rows = result
+            if index_column:
+                self.refresh_schema()
+            self.set_result_view(view, columns, rows)
+            if on_loaded:
+                on_loaded(rows)
+
+        def on_error(error):
+            self.result_loading = False
+            self.status_var.set(f"[ERROR] データ取得: {error}")
+            messagebox.showerror("エラー", f"データ取得エラー:\n{error}")
+
+        if index_column:
+            index_name, index_sql = recommended_index_sql(view.table, index_column, "eq")
+
+            def task(conn):
+                conn.execute(index_sql)
+                conn.commit()
+                return view.fetch_page(conn)
+
+            self.run_background_task(f"並べ替え用インデックス作成 ({index_name})", task, on_done, on_error=on_error)
+        else:
+            self.run_background_task("データ取得", view.fetch_page, on_done, on_error=on_error, read_only=True)
+
+    def load_next_page(self):
+        """表示中データの次のページを読んで末尾に追加する（テーブルはキーセット、SQLの結果はOFFSETで読む）"""
+        view = self.result_view
+        if not view or view.exhausted or self.result_loading:
+            return
+        self.result_loading = True
+
+        def on_done(result):
+            self.result_loading = False
+            if view is not self.result_view:
+                return
+            self.append_rows(result[1])
+            self.next_page_button['state'] = 'disabled' if view.exhausted else 'normal'
+            self.status_var.set(f"[DATA] {view.loaded:,}件を表示中" + (" (全件)" if view.exhausted else ""))
+
+        def on_error(error):
+            self.result_loading = False
+            self.status_var.set(f"[ERROR] データ取得: {error}")
+
+        self.run_background_task("次のページの読み込み", view.fetch_page, on_done, on_error=on_error, read_only=True)
+
+    def on_heading_click(self, column):
+        """列見出しのクリック: DB側で 昇順 → 降順 → 並べ替えなし の順に並べ替えて先頭から読み直す"""
+        if not self.result_view or self.result_loading:
+            return
+        self.result_view.toggle_sort(column)
+        self.reload_result_view()
+
+    def clicked_column_name(self):
+        columns = self.tree['columns']
+        if self.clicked_column_id is None or self.clicked_column_id >= len(columns):
+            return None
+        return columns[self.clicked_column_id]
+
+    def sort_clicked_column(self, descending):
+        column = self.clicked_column_name()
+        if not column or not self.result_view or self.result_loading:
+            return
+        self.result_view.set_sort(column, descending)
+        self.reload_result_view()
+
+    def filter_clicked_column(self):
+        """右クリックした列の値で絞り込む（DB側のWHEREで全件を対象にする）"""
+        from tkinter import simpledialog
+        column = self.clicked_column_name()
+        if not column or not self.result_view or self.result_loading:
+            return
+        current = self.result_view.filters.get(column)
+        text = simpledialog.askstring(
+            "絞り込み", f"'{column}' の絞り込み条件（空欄で解除）\n"
+                        "値: 部分一致 / =値: 完全一致 / 値*: 前方一致 / (空): 空値",
+            initialvalue=describe_filter(current) if current else "", parent=self.root)
+        if text is None:
+            return
+        self.result_view.set_filter(column, filter_condition(column, text))
+        self.reload_result_view()
+
+    def clear_sort_and_filters(self):
+        if not self.result_view or self.result_loading:
+            return
+        self.result_view.clear()
+        self.reload_result_view()
+
+    def reload_result_view(self):
+        view = self.result_view
+
+        def on_loaded(rows):
+            sort = f"{view.sort[0]} {'降順' if view.sort[1] else '昇順'}" if view.sort else "なし"
+            filters = ", ".join(f"{col}: {describe_filter(cond)}" for col, cond in view.filters.items()) or "なし"
+            self.status_var.set(f"[SORT] {len(rows)}件表示 / 並べ替え: {sort} / 絞り込み: {filters}")
+
+        self.load_result_view(view, on_loaded)
+
     def on_table_selected(self, event=None):
         """テーブル選択時の処理"""
         try:
@@ -901,9 +1975,8 @@ class SQLiteGUIManager:
                 return
             
             # テーブルのカラム情報を取得
-            cur = self.conn.cursor()
-            cur.execute(f"PRAGMA table_info([{table}]);")
-            columns = [row[1] for row in cur.fetchall()]
+            # 正規化列は元の列の検索で自動的に使うため、検索対象の候補には出さない
+            columns = [c for c in self.schema.columns(table) if not is_search_key_column(c)]
             
             # 検索用コンボボックスを更新
             if hasattr(self, 'search_column_combo'):
@@ -923,9 +1996,8 @@ class SQLiteGUIManager:
                 messagebox.showwarning("構造表示", "テーブルが選択されていません。")
                 return
             
-            cur = self.conn.cursor()
-            cur.execute(f"PRAGMA table_info([{table}]);")
-            columns = cur.fetchall()
+            columns = self.schema.table_info(table)
+            generated = self.schema.generated_columns(table)
             
             # 構造情報を整形
             structure_info = []
@@ -939,8 +2011,18 @@ class SQLiteGUIManager:
                 null_str = "NO" if notnull else "YES"
                 default_str = str(default) if default is not None else ""
                 pk_str = " (PK)" if pk else ""
+                if name in generated:
+                    pk_str += " (生成列)"
                 structure_info.append(f"{cid:<4} {name:<20} {col_type:<15} {null_str:<5} {default_str}{pk_str}")
             
+            indexes = self.schema.indexes(table)
+            if indexes:
+                structure_info.append("-" * 50)
+                structure_info.append("インデックス:")
+                for index in indexes:
+                    unique_str = " (UNIQUE)" if index['unique'] else ""
+                    structure_info.append(f"  {index['name']}: {', '.join(c or '(式)' for c in index['columns'])}{unique_str}")
+            
             messagebox.showinfo("テーブル構造", "\n".join(structure_info))
             
         except Exception as e:
@@ -966,45 +2048,49 @@ class SQLiteGUIManager:
                 messagebox.showwarning("検索", "検索値を入力してください。")
                 return
             
-            # SQL文を構築
+            # 検索条件を構築（LIMITは表示時のみ付与し、エクスポートでは全件を対象にする）
             if search_type == "完全一致":
-                sql = f"SELECT * FROM [{table}] WHERE [{search_column}] = ? LIMIT 1000;"
-                params = (search_value,)
+                where, params = f"[{search_column}] = ?", (search_value,)
             elif search_type == "部分一致":
-                sql = f"SELECT * FROM [{table}] WHERE [{search_column}] LIKE ? LIMIT 1000;"
-                params = (f"%{search_value}%",)
+                where, params = f"[{search_column}] LIKE ?", (f"%{search_value}%",)
             elif search_type == "前方一致":
-                sql = f"SELECT * FROM [{table}] WHERE [{search_column}] LIKE ? LIMIT 1000;"
-                params = (f"{search_value}%",)
+                where, params = f"[{search_column}] LIKE ?", (f"{search_value}%",)
             elif search_type == "後方一致":
-                sql = f"SELECT * FROM [{table}] WHERE [{search_column}] LIKE ? LIMIT 1000;"
-                params = (f"%{search_value}",)
+                where, params = f"[{search_column}] LIKE ?", (f"%{search_value}",)
             else:  # 空値検索
-                sql = f"SELECT * FROM [{table}] WHERE [{search_column}] IS NULL OR [{search_column}] = '' LIMIT 1000;"
-                params = ()
-            
-            # クエリ実行
-            cur = self.conn.cursor()
-            cur.execute(sql, params)
-            rows = cur.fetchall()
-            
-            # カラム名取得
-            cur.execute(f"PRAGMA table_info([{table}]);")
-            columns = [row[1] for row in cur.fetchall()]
-            
-            # 結果を表示
-            self.display_data(columns, rows)
-            
-            # ステータス更新
-            if hasattr(self, 'status_var'):
+                where, params = f"[{search_column}] IS NULL OR [{search_column}] = ''", ()
+
+            # 正規化列 (search_key_fields) があれば、全角/半角・大文字/小文字を区別せずにその列で検索する
+            search_key_column = find_search_key(self.schema.columns(table), search_column)
+            if search_key_column and search_type in ("完全一致", "部分一致", "前方一致", "後方一致"):
+                fts_condition = fts_predicate(self.read_conn, table, search_key_column, search_key(search_value),
+                                              search_type)
+                if fts_condition:
+                    where, params = fts_condition
+                    search_type = f"{search_type}(正規化・FTS)"
+                else:
+                    where, params = normalized_search(search_key_column, search_value, search_type)
+                    search_type = f"{search_type}(正規化)"
+            else:
+                # FTSインデックスがあれば部分一致/後方一致をFTS経由に切り替え
+                fts_condition = fts_predicate(self.read_conn, table, search_column, search_value, search_type)
+                if fts_condition:
+                    where, params = fts_condition
+                    search_type = f"{search_type}(FTS)"
+
+            def on_loaded(rows):
+                self.record_query_pattern(lambda: self.query_log.add_predicates(
+                    "search", search_observations(self.conn, table, search_column, self.search_type_var.get())))
                 self.status_var.set(f"[SEARCH] 検索完了: {len(rows)}件 / 検索条件: {search_column} {search_type} '{search_value}'")
-            
-            # 検索結果がない場合の通知
-            if len(rows) == 0:
-                messagebox.showinfo("検索結果", 
-                    f"検索条件に一致するデータが見つかりませんでした。\n\n" 
-                    f"テーブル: {table}\n" 
-                    f"検索条件: {search_column} {search_type} '{search_value}'")
+                # 検索結果がない場合の通知
+                if len(rows) == 0:
+                    messagebox.showinfo("検索結果", 
+                        f"検索条件に一致するデータが見つかりませんでした。\n\n" 
+                        f"テーブル: {table}\n" 
+                        f"検索条件: {search_column} {search_type} '{search_value}'")
+
+            # クエリ実行（結果は1000件ずつ表示）
+            self.load_result_view(ResultView.for_table(table, where, params), on_loaded)
                 
         except Exception as e:
             error_msg = f"検索エラー: {e}"
@@ -1041,15 +2127,24 @@ class SQLiteGUIManager:
             
             if is_select and len(sql_statements) == 1:
                 # SELECT系の場合（単一文）
+                start = time.perf_counter()
                 cur.execute(sql_statements[0])
                 rows = cur.fetchall()
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if elapsed_ms >= self.gui_config.get('slow_query_ms', DEFAULT_SLOW_QUERY_MS):
+                    self.record_query_pattern(lambda: self.query_log.add_slow_query(
+                        slow_query_row(self.conn, sql_statements[0], elapsed_ms, len(rows))))
+                self.record_query_pattern(lambda: self.query_log.add_predicates(
+                    "sql", observe_query(self.conn, sql_statements[0])))
                 
                 # カラム名を取得
                 if cur.description:
                     columns = [desc[0] for desc in cur.description]
                     
-                    # SQL結果用のTreeviewに表示
-                    self.display_sql_results(columns, rows)
+                    # SQL結果用のTreeviewに表示（全件取得済み。列見出しのクリックで並べ替える）
+                    view = ResultView.for_sql(sql_statements[0])
+                    view.mark_loaded(len(rows), exhausted=True)
+                    self.set_result_view(view, columns, rows)
                     
                     result_msg = f"[SQL] SELECT実行完了: {len(rows)}件取得"
                     if hasattr(self, 'status_var'):
@@ -1076,6 +2171,7 @@ class SQLiteGUIManager:
                         raise stmt_error
                 
                 self.conn.commit()
+                self.column_profile_cache.invalidate()
                 
                 result_msg = f"[SQL] 実行完了: {len(sql_statements)}文実行, 総影響行数: {affected_total}"
                 if hasattr(self, 'status_var'):
@@ -1085,9 +2181,8 @@ class SQLiteGUIManager:
                 detail_msg = f"SQL実行が完了しました。\n\n実行文数: {len(sql_statements)}\n総影響行数: {affected_total}\n\n詳細:\n" + "\n".join(results)
                 messagebox.showinfo("SQL実行結果", detail_msg)
                 
-                # データが変更された場合、テーブル一覧を更新
-                if any(stmt.upper().strip().startswith(('CREATE', 'DROP', 'ALTER')) for stmt in sql_statements):
-                    self.connect_database()  # テーブル一覧を再読込
+                # スキーマが変更された場合、テーブル一覧を更新
+                self.refresh_schema()
                 
         except Exception as e:
             self.conn.rollback()  # エラー時はロールバック
@@ -1098,6 +2193,134 @@ class SQLiteGUIManager:
                 f"SQL実行中にエラーが発生しました:\n\n{e}\n\n" 
                 "※ トランザクションはロールバックされました。")
     
+    def profile_sql(self):
+        """SQLエディタのSELECT文を実行計画付きで計測し、結果とプロファイルを表示する"""
+        if not self.conn:
+            messagebox.showwarning("プロファイル", "データベースに接続されていません。")
+            return
+
+        sql_text = self.sql_text.get(1.0, tk.END).strip()
+        sql_statements = [stmt.strip() for stmt in sql_text.split(';') if stmt.strip()]
+        if len(sql_statements) != 1 or not sql_statements[0].upper().startswith(('SELECT', 'WITH')):
+            messagebox.showwarning("プロファイル", "プロファイルは単一のSELECT文のみ対象です。")
+            return
+        sql = sql_statements[0]
+        slow_query_ms = self.gui_config.get('slow_query_ms', DEFAULT_SLOW_QUERY_MS)
+
+        def task(conn):
+            result = profile_query(conn, sql)
+            # スロークエリは self.query_log に溜めてまとめて書き込む（ここではDBに書き込まない）
+            result['slow_query'] = (slow_query_row(conn, sql, result['elapsed_ms'], result['row_count'],
+                                                   result['vm_steps'], result['plan'])
+                                    if result['elapsed_ms'] >= slow_query_ms else None)
+            return result
+
+        def on_done(result):
+            if result['slow_query']:
+                self.record_query_pattern(lambda: self.query_log.add_slow_query(result['slow_query']))
+            view = ResultView.for_sql(sql)
+            view.mark_loaded(len(result['rows']), exhausted=len(result['rows']) >= result['row_count'])
+            self.set_result_view(view, result['columns'], result['rows'])
+            self.status_var.set(f"[PROFILE] {result['elapsed_ms']:.1f}ms / {result['row_count']:,}件 "
+                                f"/ 全件走査 {len(result['full_scans'])}箇所")
+            self.show_profile_window(result)
+
+        self.run_background_task("クエリ計測", task, on_done)
+
+    def show_profile_window(self, result):
+        """実行計画ツリーと計測値を表示する（全件走査のステップを強調表示）"""
+        window = tk.Toplevel(self.root)
+        window.title("実行計画/計測結果")
+        window.geometry("700x450")
+        window.transient(self.root)
+
+        metrics = ttk.LabelFrame(window, text="[STATS] 計測値", padding=10)
+        metrics.pack(fill=tk.X, padx=10, pady=(10, 5))
+        items = [
+            ("実行時間", f"{result['elapsed_ms']:.1f} ms"),
+            ("取得行数", f"{result['row_count']:,} 件 (表示: {len(result['rows']):,} 件)"),
+            ("VMステップ数(概算)", f"{result['vm_steps']:,}"),
+            ("全件走査", f"{len(result['full_scans'])} 箇所"),
+        ]
+        for i, (label, value) in enumerate(items):
+            ttk.Label(metrics, text=f"{label}:").grid(row=i, column=0, sticky=tk.W)
+            ttk.Label(metrics, text=value).grid(row=i, column=1, sticky=tk.W, padx=(10, 0))
+
+        plan_frame = ttk.LabelFrame(window, text="[PLAN] EXPLAIN QUERY PLAN", padding=5)
+        plan_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(5, 10))
+        tree = ttk.Treeview(plan_frame, show='tree')
+        tree.tag_configure('full_scan', background='#ffcccc')
+        tree.tag_configure('index_scan', background='#fff2cc')
+        tree.pack(fill=tk.BOTH, expand=True)
+
+        nodes = {0: ''}
+        for node_id, parent, detail in result['plan']:
+            tags = ('full_scan',) if is_full_scan(detail) else ('index_scan',) if is_index_scan(detail) else ()
+            nodes[node_id] = tree.insert(nodes.get(parent, ''), 'end', text=detail, open=True, tags=tags)
+
+    def show_slow_query_log(self):
+        """記録済みのスロークエリを実行計画付きで一覧表示する"""
+        if not self.conn:
+            messagebox.showwarning("スロークエリログ", "データベースに接続されていません。")
+            return
+        self.flush_query_log()
+
+        window = tk.Toplevel(self.root)
+        window.title("スロークエリログ")
+        window.geometry("900x500")
+        window.transient(self.root)
+
+        columns = ("logged_at", "elapsed_ms", "row_count", "vm_steps", "sql")
+        headings = ("記録日時", "実行時間(ms)", "取得行数", "VMステップ数", "SQL")
+        tree = ttk.Treeview(window, columns=columns, show='headings', height=10)
+        for col, heading in zip(columns, headings):
+            tree.heading(col, text=heading)
+            tree.column(col, width=120, minwidth=50)
+        tree.column("sql", width=400)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+
+        plan_text = tk.Text(window, height=10, wrap=tk.NONE)
+        plan_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        entries = {}
+
+        def reload():
+            tree.delete(*tree.get_children())
+            entries.clear()
+            for entry in load_slow_queries(self.conn):
+                logged_at, elapsed_ms, row_count, vm_steps, sql, plan = entry
+                item = tree.insert('', 'end', values=(
+                    logged_at, f"{elapsed_ms:.1f}", row_count if row_count is not None else '',
+                    vm_steps if vm_steps is not None else '', ' '.join(sql.split())))
+                entries[item] = entry
+
+        def on_select(event=None):
+            selection = tree.selection()
+            if not selection:
+                return
+            _, _, _, _, sql, plan = entries[selection[0]]
+            plan_text.delete(1.0, tk.END)
+            plan_text.insert(tk.END, f"{sql}\n\n-- 実行計画\n{plan or ''}")
+
+        def load_into_editor():
+            selection = tree.selection()
+            if selection:
+                self.sql_text.delete(1.0, tk.END)
+                self.sql_text.insert(tk.END, entries[selection[0]][4])
+
+        def clear_log():
+            if messagebox.askyesno("確認", "スロークエリログをすべて削除しますか？", parent=window):
+                clear_slow_queries(self.conn)
+                reload()
+
+        tree.bind('<<TreeviewSelect>>', on_select)
+        box = ttk.Frame(window)
+        ttk.Button(box, text="[SQL] エディタに読み込む", command=load_into_editor).pack(side=tk.LEFT, padx=5)
+        ttk.Button(box, text="[CLEAR] ログをクリア", command=clear_log).pack(side=tk.LEFT, padx=5)
+        box.pack(pady=(0, 10))
+
+        reload()
+
     def display_sql_results(self, columns, rows):
         """SQL実行結果をTreeviewに表示"""
         self.display_data(columns, rows)
@@ -1146,48 +2369,59 @@ class SQLiteGUIManager:
                 self.status_var.set(f"[INFO] サンプルSQL {choice} をロードしました")
     
     def export_sql_results(self):
-        """SQL実行結果をCSVエクスポート"""
-        try:
-            # 結果が存在するかチェック
-            if not self.tree.get_children():
-                messagebox.showwarning("エクスポート", "エクスポートするデータがありません。")
-                return
-            
-            # ファイル保存ダイアログ
-            file_path = filedialog.asksaveasfilename(
-                title="表示中データをエクスポート",
-                defaultextension=".csv",
-                filetypes=[("CSV files", "*.csv"), ("All files", "*.*m")]
-            )
-            
-            if not file_path:
+        """表示中データの元クエリを再実行し、全件をバックグラウンドでファイルへストリーミング出力する"""
+        if not self.current_query:
+            messagebox.showwarning("エクスポート", "エクスポートするデータがありません。")
+            return
+
+        dialog = ExportDialog(self.root)
+        if not dialog.result:
+            return
+        file_path, fmt, encoding = dialog.result
+        sql, params = self.current_query
+        cancel_event = threading.Event()
+
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title("エクスポート実行中...")
+        progress_window.geometry("400x130")
+        progress_window.transient(self.root)
+        progress_window.resizable(False, False)
+        progress_label = ttk.Label(progress_window, text="件数を確認しています...", padding=(20, 15, 20, 5))
+        progress_label.pack(fill=tk.X)
+        progress_bar = ttk.Progressbar(progress_window, mode='determinate', maximum=100)
+        progress_bar.pack(fill=tk.X, padx=20, pady=5)
+        cancel_button = ttk.Button(progress_window, text="キャンセル", command=cancel_event.set)
+        cancel_button.pack(pady=5)
+        progress_window.protocol("WM_DELETE_WINDOW", cancel_event.set)
+
+        def on_progress(written, total):
+            if total:
+                progress_bar['value'] = written * 100 / total
+                progress_label['text'] = f"{written:,} / {total:,} 件 出力済み"
+            else:
+                progress_label['text'] = f"{written:,} 件 出力済み"
+
+        def on_done(result):
+            progress_window.destroy()
+            message = f"{result['rows']:,}件を以下のファイルにエクスポートしました:\n{result['path']}"
+            if result['coerced_values']:
+                message += f"\n\n※ 列の型に合わない {result['coerced_values']:,} 個の値を空欄(NULL)で出力しました。"
+            messagebox.showinfo("エクスポート完了", message)
+            self.status_var.set(f"[EXPORT] エクスポート完了: {result['rows']:,}件")
+
+        def on_error(error):
+            progress_window.destroy()
+            if isinstance(error, ExportCancelled):
+                self.status_var.set("[EXPORT] エクスポートをキャンセルしました")
                 return
-            
-            # CSVファイルに書き出し
-            import csv
-            with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                
-                # ヘッダー行を書き出し
-                columns = self.tree['columns']
-                writer.writerow(columns)
-                
-                # データ行を書き出し
-                for item in self.tree.get_children():
-                    values = self.tree.item(item)['values']
-                    writer.writerow(values)
-            
-            messagebox.showinfo("エクスポート完了", 
-                f"表示中のデータを以下のファイルにエクスポートしました:\n{file_path}")
-            
-            if hasattr(self, 'status_var'):
-                self.status_var.set("[EXPORT] SQL結果エクスポート完了")
-                
-        except Exception as e:
-            error_msg = f"エクスポートエラー: {e}"
-            if hasattr(self, 'status_var'):
-                self.status_var.set(f"[ERROR] {error_msg}")
-            messagebox.showerror("エクスポートエラー", error_msg)
+            self.status_var.set(f"[ERROR] エクスポートエラー: {error}")
+            messagebox.showerror("エクスポートエラー", f"エクスポートエラー: {error}")
+
+        self.run_background_task(
+            "エクスポート",
+            lambda conn, report: export_query(conn, sql, params, file_path, fmt, encoding,
+                                              progress=report, cancel_event=cancel_event),
+            on_done, on_progress, on_error, read_only=True)
     
     def format_sql_text(self):
         """SQL文の簡易フォーマット"""
@@ -1233,6 +2467,7 @@ class SQLiteGUIManager:
             cursor = self.conn.cursor()
             cursor.execute("PRAGMA foreign_keys = OFF;")
             for table_name in self.tables:
+                drop_fts_index(self.conn, table_name)
                 cursor.execute(f'DROP TABLE IF EXISTS "{table_name}";')
                 print(f"[DELETE] テーブル '{table_name}' を削除しました。")
             
@@ -1241,7 +2476,7 @@ class SQLiteGUIManager:
             
             messagebox.showinfo("成功", "すべてのテーブルを削除しました。")
             
-            self.connect_database()
+            self.refresh_schema()
 
         except Exception as e:
             self.conn.rollback()
@@ -1261,26 +2496,471 @@ class SQLiteGUIManager:
             self.save_last_db_path(path)
             self.connect_database()
 
-    def show_db_stats(self):
-        # 実装は省略
-        messagebox.showinfo("DB Stats", "This feature is not fully implemented yet.")
+    def db_change_key(self):
+        """DBの変更検知用の値（他の接続のコミット・スキーマ変更・この接続での更新のいずれかで変わる）"""
+        return (self.db_path, self.db.data_version(), self.db.schema_version(), self.conn.total_changes)
+
+    def show_db_stats(self, force=False):
+        """テーブル・インデックスごとのサイズ・充填率と空きページ・WALサイズを表示する（集計はバックグラウンド）"""
+        if not self.db:
+            messagebox.showwarning("DB統計情報", "データベースに接続されていません。")
+            return
+        key = self.db_change_key()
+        if not force and self.db_stats_cache and self.db_stats_cache[0] == key:
+            self.status_var.set("[STATS] DB統計情報 (キャッシュ)")
+            self.show_db_stats_window(self.db_stats_cache[1])
+            return
+
+        def on_done(stats):
+            # 集計中の更新を取りこぼさないよう、集計開始時点のキーで保存する
+            self.db_stats_cache = (key, stats)
+            self.show_db_stats_window(stats)
+
+        def on_progress(stage, count):
+            self.status_var.set(f"[STATS] {stage}: {count:,} ページ")
+
+        db_path = self.db_path
+        self.run_background_task("DB統計情報の集計",
+                                 lambda conn, report: collect_db_stats(conn, db_path, report),
+                                 on_done, on_progress)
+
+    def show_db_stats_window(self, stats):
+        """DB統計情報のウィンドウ"""
+        summary = stats['summary']
+
+        def mb(n):
+            return f"{n / 1024 / 1024:,.1f}"
+
+        window = tk.Toplevel(self.root)
+        window.title(f"DB統計情報 - {os.path.basename(self.db_path)}")
+        window.geometry("1000x500")
+        window.transient(self.root)
+
+        free_ratio = summary['free_bytes'] / summary['file_bytes'] if summary['file_bytes'] else 0
+        unused_ratio = summary['unused_bytes'] / summary['file_bytes'] if summary['file_bytes'] else 0
+        lines = [
+            f"ファイルサイズ: {mb(summary['file_bytes'])} MB / WAL: {mb(summary['wal_bytes'])} MB "
+            f"/ ページサイズ: {summary['page_size']:,} / ページ数: {summary['page_count']:,} "
+            f"/ auto_vacuum: {summary['auto_vacuum']} / 集計方法: {stats['method']}",
+            f"空きページ: {summary['freelist_count']:,} ({mb(summary['free_bytes'])} MB, {free_ratio:.1%}) "
+            f"/ ページ内の未使用領域: {mb(summary['unused_bytes'])} MB ({unused_ratio:.1%})",
+        ]
+        if free_ratio + unused_ratio >= 0.2:
+            lines.append("[HINT] 空き・未使用領域がファイルの2割を超えています。VACUUMでサイズを縮められます。")
+        if stats['wal_pending']:
+            lines.append("[WARNING] 読み取り中の接続があり、WALの内容がすべては反映されていません。")
+        if stats['skipped_pages']:
+            lines.append(f"[WARNING] WALにしかない {stats['skipped_pages']:,}ページを読み飛ばしたため、集計は部分的です。")
+        ttk.Label(window, text="\n".join(lines), padding=(10, 10, 10, 5)).pack(fill=tk.X)
+
+        columns = ("名前", "種別", "テーブル", "ページ数", "サイズ(MB)", "充填率", "未使用(MB)", "データ(MB)", "セル数")
+        frame = ttk.Frame(window)
+        tree = ttk.Treeview(frame, columns=columns, show='headings')
+        for col, width in zip(columns, (200, 60, 160, 80, 80, 70, 80, 80, 90)):
+            tree.heading(col, text=col)
+            tree.column(col, width=width, anchor=tk.W if col in ("名前", "種別", "テーブル") else tk.E)
+        for obj in stats['objects']:
+            tree.insert('', tk.END, values=(
+                obj['name'], obj['type'], obj['table'], f"{obj['pages']:,}", mb(obj['bytes']),
+                f"{obj['fill']:.1%}" if obj['fill'] is not None else "", mb(obj['unused']), mb(obj['payload']),
+                f"{obj['cells']:,}"))
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        def reload():
+            window.destroy()
+            self.show_db_stats(force=True)
+
+        ttk.Button(window, text="[RELOAD] 再集計", command=reload).pack(pady=10)
+
+    def setup_fts_index(self):
+        """選択中のテーブルにFTS5 trigramインデックスを作成し、設定に保存する"""
+        table = self.table_var.get()
+        if not table or not self.conn:
+            messagebox.showwarning("全文検索インデックス", "テーブルが選択されていません。")
+            return
+        if not is_fts_available(self.conn):
+            messagebox.showerror("全文検索インデックス", "このSQLiteはFTS5 trigramに対応していません。(3.34以降が必要)")
+            return
+
+        generated = self.schema.generated_columns(table)
+        columns = [c for c in self.schema.columns(table) if c not in generated and not is_search_key_column(c)]
+        selected = get_fts_columns(self.conn, table, self.schema) or get_text_columns(self.conn, table, self.schema)
+
+        dialog = FtsSetupDialog(self.root, table, columns, selected)
+        if not dialog.result:
+            return
+
+        fts_columns = dialog.result
+        fts_config = self.gui_config.setdefault('fts', {'enabled': True, 'all_text_columns': False, 'tables': {}})
+        fts_config['enabled'] = True
+        fts_config.setdefault('tables', {})[table] = fts_columns
+        self.save_gui_config()
+
+        self.run_background_task(f"'{table}'の全文検索インデックス作成",
+                                 lambda conn: build_fts_index(conn, table, fts_columns))
+
+    def remove_fts_index(self):
+        """選択中のテーブルのFTSインデックスを削除し、設定からも外す"""
+        table = self.table_var.get()
+        if not table or not self.conn:
+            messagebox.showwarning("全文検索インデックス", "テーブルが選択されていません。")
+            return
+        if not get_fts_columns(self.conn, table, self.schema):
+            messagebox.showinfo("全文検索インデックス", f"テーブル '{table}' に全文検索インデックスはありません。")
+            return
+
+        drop_fts_index(self.conn, table)
+        self.gui_config.get('fts', {}).get('tables', {}).pop(table, None)
+        self.save_gui_config()
+        self.status_var.set(f"[FTS] '{table}'の全文検索インデックスを削除しました")
+
+    def refresh_fts_indexes(self):
+        """設定対象テーブルのFTSインデックスを、未作成・同期切れのものだけバックグラウンドで作り直す"""
+        fts_config = self.gui_config.get('fts', {})
+        if not fts_config.get('enabled', False) or not self.tables:
+            return
+        tables = list(self.tables)
+
+        def on_done(refreshed):
+            if refreshed:
+                self.status_var.set(f"[FTS] 全文検索インデックス更新: {', '.join(refreshed)}")
+
+        self.run_background_task("全文検索インデックス更新",
+                                 lambda conn: refresh_configured_fts(conn, tables, fts_config),
+                                 on_done)
+
+    def show_index_advisor(self):
+        """記録された検索・クエリパターンからインデックスを推奨し、選択したものを作成する"""
+        if not self.conn:
+            messagebox.showwarning("インデックス推奨", "データベースに接続されていません。")
+            return
+        self.flush_query_log()
+
+        window = tk.Toplevel(self.root)
+        window.title("インデックス推奨")
+        window.geometry("900x400")
+        window.transient(self.root)
+
+        columns = ("table", "column", "predicate", "hits", "rows", "benefit", "note")
+        headings = ("テーブル", "カラム", "条件", "観測回数", "行数(概算)", "推定効果(削減読取行数)", "推奨内容")
+        tree = ttk.Treeview(window, columns=columns, show='headings', selectmode='extended')
+        for col, heading in zip(columns, headings):
+            tree.heading(col, text=heading)
+            tree.column(col, width=110, minwidth=50)
+        tree.column("note", width=220)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 0))
+
+        recommendations = {}
+
+        def reload():
+            tree.delete(*tree.get_children())
+            recommendations.clear()
+            for rec in recommend_indexes(self.conn):
+                item = tree.insert('', 'end', values=(
+                    rec['table'], rec['column'], PREDICATE_LABELS.get(rec['predicate'], rec['predicate']),
+                    rec['hits'], f"{rec['rows']:,}", f"{rec['benefit']:,}", rec['note']))
+                recommendations[item] = rec
+
+        def build_selected():
+            targets = [recommendations[item] for item in tree.selection() if recommendations[item]['sql']]
+            if not targets:
+                messagebox.showwarning("インデックス推奨", "作成可能なインデックスが選択されていません。", parent=window)
+                return
+
+            def task(conn):
+                for rec in targets:
+                    conn.execute(rec['sql'])
+                conn.execute("ANALYZE")
+                conn.commit()
+                return [rec['index_name'] for rec in targets]
+
+            def on_done(created):
+                self.status_var.set(f"[INDEX] インデックス作成完了: {', '.join(created)}")
+                if window.winfo_exists():
+                    reload()
+
+            self.run_background_task("インデックス作成", task, on_done)
+
+        def clear_log():
+            if messagebox.askyesno("確認", "記録済みの検索・クエリパターンをすべて削除しますか？", parent=window):
+                clear_query_log(self.conn)
+                reload()
+
+        box = ttk.Frame(window)
+        ttk.Button(box, text="[INDEX] 選択したインデックスを作成", command=build_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(box, text="[RELOAD] 再集計", command=reload).pack(side=tk.LEFT, padx=5)
+        ttk.Button(box, text="[CLEAR] ログをクリア", command=clear_log).pack(side=tk.LEFT, padx=5)
+        box.pack(pady=10)
+
+        reload()
 
     def vacuum_database(self):
-        try:
-            if not messagebox.askyesno("確認", "データベースの最適化(VACUUM)を実行しますか？"):
+        """
+        DB最適化。解放できる容量の見込みを示して方式を選ばせ、バックグラウンドで実行する
+        増分VACUUMは少しずつコミットし、再構築はVACUUM INTOで作った一時ファイルと入れ替えるため、どちらも画面を止めない
+        """
+        if not self.db:
+            return
+        stats = self.db_stats_cache[1] if self.db_stats_cache and self.db_stats_cache[0] == self.db_change_key() else None
+        estimate = estimate_reclaim(self.conn, self.db_path, stats['summary']['unused_bytes'] if stats else None)
+        dialog = MaintenanceDialog(self.root, estimate, auto_vacuum_mode(self.conn))
+        if not dialog.result:
+            return
+        mode, auto_vacuum = dialog.result
+        if mode == "incremental":
+            self.run_incremental_vacuum(estimate)
+        else:
+            self.run_vacuum_rebuild(estimate, auto_vacuum)
+
+    def show_maintenance_progress(self, title):
+        """DB最適化の進捗ウィンドウ（ウィンドウ, 進捗コールバック, キャンセルEvent）"""
+        cancel_event = threading.Event()
+
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title(title)
+        progress_window.geometry("400x130")
+        progress_window.transient(self.root)
+        progress_window.resizable(False, False)
+        progress_label = ttk.Label(progress_window, text="準備中...", padding=(20, 15, 20, 5))
+        progress_label.pack(fill=tk.X)
+        progress_bar = ttk.Progressbar(progress_window, mode='determinate', maximum=1.0)
+        progress_bar.pack(fill=tk.X, padx=20)
+        ttk.Button(progress_window, text="キャンセル", command=cancel_event.set).pack(pady=5)
+        progress_window.protocol("WM_DELETE_WINDOW", cancel_event.set)
+
+        def on_progress(stage, done, total):
+            progress_bar['value'] = done / total if total else 0
+            if stage == "再構築":
+                progress_label['text'] = f"{stage}: {done / 1024 / 1024:,.0f} / 約{total / 1024 / 1024:,.0f} MB"
+            else:
+                progress_label['text'] = f"{stage}: {done:,} / {total:,} ページ"
+
+        return progress_window, on_progress, cancel_event
+
+    def run_incremental_vacuum(self, estimate):
+        """空きページをincremental_vacuumで少しずつ解放する"""
+        progress_window, on_progress, cancel_event = self.show_maintenance_progress("増分VACUUM実行中...")
+
+        def on_done(result):
+            progress_window.destroy()
+            self.refresh_schema()
+            messagebox.showinfo("成功", f"増分VACUUMが完了しました。\n解放: {result['freed_bytes'] / 1024 / 1024:,.1f} MB")
+
+        def on_error(error):
+            progress_window.destroy()
+            if isinstance(error, MaintenanceCancelled):
+                self.status_var.set("[VACUUM] 増分VACUUMを中断しました (解放済みの分は反映されています)")
+                return
+            messagebox.showerror("Vacuum エラー", str(error))
+
+        self.run_background_task(
+            "増分VACUUM",
+            lambda conn, report: run_incremental_vacuum(conn, report, cancel_event),
+            on_done, on_progress, on_error)
+
+    def run_vacuum_rebuild(self, estimate, auto_vacuum):
+        """VACUUM INTOで詰め直したDBを一時ファイルに作り、他の接続・処理がなければ元のファイルと入れ替える"""
+        progress_window, on_progress, cancel_event = self.show_maintenance_progress("DB再構築中...")
+        db_path = self.db_path
+        expected_bytes = max(estimate['file_bytes'] - estimate['rebuild'], 1)
+        change_key = self.db_change_key()
+
+        def on_done(temp_path):
+            progress_window.destroy()
+            if self.import_runner.is_busy() or self.active_background_tasks or self.db_change_key() != change_key:
+                discard_temp(db_path)
+                messagebox.showwarning("DB最適化", "再構築中にDBが更新されたか、他の処理が実行中のため入れ替えを中止しました。\n"
+                                                  "処理が終わってから再度実行してください。")
+                return
+            before = estimate['file_bytes']
+            # 開いている接続があるとファイルを置き換えられないため、いったんすべて閉じる
+            self.db.close()
+            try:
+                swap_in_vacuumed(db_path, temp_path)
+            except Exception as e:
+                discard_temp(db_path)
+                self.connect_database()
+                messagebox.showerror("Vacuum エラー", f"DBファイルの入れ替えに失敗しました。元のDBはそのままです。\n{e}")
                 return
-            self.conn.execute("VACUUM")
-            messagebox.showinfo("成功", "データベースの最適化が完了しました。")
             self.connect_database()
-        except Exception as e:
-            messagebox.showerror("Vacuum エラー", str(e))
+            after = os.path.getsize(db_path)
+            # 再構築で元テーブルのrowidが振り直されるため、FTSを再構築する
+            self.run_background_task("全文検索インデックス再構築", rebuild_all_fts)
+            messagebox.showinfo("成功", f"DBの再構築が完了しました。\n"
+                                      f"{before / 1024 / 1024:,.1f} MB → {after / 1024 / 1024:,.1f} MB")
+
+        def on_error(error):
+            progress_window.destroy()
+            discard_temp(db_path)
+            if isinstance(error, MaintenanceCancelled):
+                self.status_var.set("[VACUUM] DBの再構築をキャンセルしました")
+                return
+            messagebox.showerror("Vacuum エラー", str(error))
+
+        self.run_background_task(
+            "DB再構築",
+            lambda conn, report: vacuum_into_temp(conn, db_path, expected_bytes, report, cancel_event, auto_vacuum),
+            on_done, on_progress, on_error)
 
     def generate_sample_queries(self):
         self.load_sample_sql()
 
+    def save_current_query(self):
+        """SQLエディタのSELECT文を定型クエリとして保存する（キャッシュする場合はバックグラウンドで作成）"""
+        if not self.conn:
+            messagebox.showwarning("定型クエリ", "データベースに接続されていません。")
+            return
+        try:
+            sql = validate_select(self.sql_text.get(1.0, tk.END))
+        except ValueError as e:
+            messagebox.showwarning("定型クエリ", str(e))
+            return
+        dialog = SaveQueryDialog(self.root)
+        if not dialog.result:
+            return
+        name, description, materialize = dialog.result
+        if any(entry['name'] == name for entry in load_queries(self.conn)) and not messagebox.askyesno(
+                "確認", f"定型クエリ '{name}' は既にあります。上書きしますか？"):
+            return
+        try:
+            query_id = save_query(self.conn, name, sql, materialize, description)
+        except sqlite3.Error as e:
+            messagebox.showerror("定型クエリ", f"保存できませんでした。\n{e}")
+            return
+        self.status_var.set(f"[SAVED] 定型クエリ '{name}' を保存しました")
+        if materialize:
+            self.refresh_query_cache(query_id)
+
+    def refresh_query_cache(self, query_id, on_done=None):
+        """定型クエリのキャッシュテーブルをバックグラウンドで作り直す"""
+        def on_success(result):
+            self.refresh_schema()
+            self.status_var.set(f"[SAVED] '{result['name']}' のキャッシュを更新しました "
+                                f"({result['rows']:,}行 / {result['elapsed_sec']:.1f}秒)")
+            if on_done:
+                on_done(result)
+
+        self.run_background_task("定型クエリのキャッシュ更新", lambda conn: refresh_cache(conn, query_id), on_success)
+
+    def refresh_saved_query_caches(self):
+        """インポート後に、依存テーブルが再インポートされた定型クエリのキャッシュをバックグラウンドで作り直す"""
+        if not self.conn or not load_queries(self.conn):
+            return
+
+        def on_done(refreshed):
+            self.refresh_schema()
+            if refreshed:
+                self.status_var.set(f"[SAVED] 定型クエリのキャッシュを更新: {', '.join(r['name'] for r in refreshed)}")
+
+        self.run_background_task("定型クエリのキャッシュ更新", refresh_stale_caches, on_done)
+
+    def open_saved_query(self, entry):
+        """
+        定型クエリの結果を表示する。キャッシュがあればキャッシュテーブルを読むだけで表示し、
+        なければクエリをバックグラウンドで実行する
+        """
+        status = cache_status(self.read_conn, entry)
+        if status in ('ok', 'stale'):
+            note = " ※依存テーブルが再インポートされています（要更新）" if status == 'stale' else ""
+            self.load_result_view(ResultView.for_table(cache_table_name(entry['id'])), lambda rows: self.status_var.set(
+                f"[SAVED] '{entry['name']}' キャッシュ表示: {entry['row_count']:,}件 (更新 {entry['refreshed_at']}){note}"))
+            return
+        if status == 'missing':
+            self.refresh_query_cache(entry['id'], lambda result: self.open_saved_query(
+                next(e for e in load_queries(self.read_conn) if e['id'] == entry['id'])))
+            return
+        self.load_result_view(ResultView.for_sql(entry['sql']), lambda rows: self.status_var.set(
+            f"[SAVED] '{entry['name']}' 実行完了: {len(rows)}件表示"))
+
     def show_predefined_queries(self):
-        # 実装は省略
-        messagebox.showinfo("Predefined Queries", "This feature is not fully implemented yet.")
+        """定型クエリの一覧。結果のキャッシュの状態を表示し、開く・更新・削除を行う"""
+        if not self.conn:
+            messagebox.showwarning("定型クエリ", "データベースに接続されていません。")
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title("定型クエリ")
+        window.geometry("950x450")
+        window.transient(self.root)
+
+        columns = ("name", "materialize", "depends_on", "refreshed_at", "row_count", "refresh_sec", "status")
+        headings = ("名前", "キャッシュ", "依存テーブル", "キャッシュ更新日時", "行数", "作成時間(秒)", "状態")
+        tree = ttk.Treeview(window, columns=columns, show='headings', height=10)
+        for col, heading in zip(columns, headings):
+            tree.heading(col, text=heading)
+            tree.column(col, width=110, minwidth=50)
+        tree.column("name", width=180)
+        tree.column("depends_on", width=200)
+        tree.tag_configure('stale', background='#fff2cc')
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+
+        sql_view = tk.Text(window, height=8, wrap=tk.WORD)
+        sql_view.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        entries = {}
+
+        def reload():
+            tree.delete(*tree.get_children())
+            entries.clear()
+            for entry in load_queries(self.conn):
+                status = cache_status(self.conn, entry)
+                item = tree.insert('', 'end', tags=('stale',) if status in ('stale', 'missing') else (), values=(
+                    entry['name'], "あり" if entry['materialize'] else "なし", ', '.join(entry['depends_on']),
+                    entry['refreshed_at'] or '', f"{entry['row_count']:,}" if entry['row_count'] is not None else '',
+                    f"{entry['refresh_sec']:.1f}" if entry['refresh_sec'] is not None else '',
+                    CACHE_STATUS_LABELS[status]))
+                entries[item] = entry
+
+        def selected():
+            selection = tree.selection()
+            return entries[selection[0]] if selection else None
+
+        def on_select(event=None):
+            entry = selected()
+            if entry:
+                sql_view.delete(1.0, tk.END)
+                sql_view.insert(tk.END, (f"-- {entry['description']}\n" if entry['description'] else "") + entry['sql'])
+
+        def open_selected(event=None):
+            entry = selected()
+            if entry:
+                self.open_saved_query(entry)
+
+        def load_into_editor():
+            entry = selected()
+            if entry:
+                self.sql_text.delete(1.0, tk.END)
+                self.sql_text.insert(tk.END, entry['sql'])
+
+        def refresh_selected():
+            entry = selected()
+            if not entry or not entry['materialize']:
+                messagebox.showwarning("定型クエリ", "キャッシュする定型クエリを選択してください。", parent=window)
+                return
+            self.refresh_query_cache(entry['id'], lambda result: window.winfo_exists() and reload())
+
+        def delete_selected():
+            entry = selected()
+            if entry and messagebox.askyesno("確認", f"定型クエリ '{entry['name']}' を削除しますか？", parent=window):
+                delete_query(self.conn, entry['id'])
+                self.refresh_schema()
+                reload()
+
+        tree.bind('<<TreeviewSelect>>', on_select)
+        tree.bind('<Double-1>', open_selected)
+        box = ttk.Frame(window)
+        ttk.Button(box, text="[OPEN] 結果を表示", command=open_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(box, text="[SQL] エディタに読み込む", command=load_into_editor).pack(side=tk.LEFT, padx=5)
+        ttk.Button(box, text="[REFRESH] キャッシュを更新", command=refresh_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(box, text="[DELETE] 削除", command=delete_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(box, text="[RELOAD] 再読込", command=reload).pack(side=tk.LEFT, padx=5)
+        box.pack(pady=(0, 10))
+
+        reload()
 
     def show_import_dialog(self):
         # 実装は省略
@@ -1291,10 +2971,189 @@ class SQLiteGUIManager:
         messagebox.showinfo("Import", "This feature is not fully implemented yet.")
 
     def advanced_search(self):
-        # 実装は省略
-        messagebox.showinfo("Advanced Search", "This feature is not fully implemented yet.")
+        """
+        複数条件検索。条件はパラメータ付きのSQLに組み立て、インデックス・FTSで絞り込める条件から評価する
+        （前回の条件はテーブルごとに保持し、次回ダイアログを開いた時に復元する）
+        """
+        if not self.conn:
+            messagebox.showwarning("詳細検索", "データベースに接続されていません。")
+            return
+        table = self.table_var.get()
+        if not table:
+            messagebox.showwarning("詳細検索", "テーブルが選択されていません。")
+            return
+
+        def compile_func(conditions, combinator):
+            return compile_search(self.read_conn, self.schema, table, conditions, combinator)
+
+        conditions, combinator = self.advanced_search_conditions.get(table, ([], "AND"))
+        dialog = AdvancedSearchDialog(self.root, table, self.schema.columns(table), compile_func,
+                                      conditions, combinator)
+        if not dialog.result:
+            return
+        conditions, combinator = dialog.result
+        self.advanced_search_conditions[table] = dialog.result
+        compiled = compile_func(conditions, combinator)
+
+        def on_loaded(rows):
+            self.record_query_pattern(lambda: self.query_log.add_predicates("search", compiled['observations']))
+            notes = f" ※{compiled['notes'][0]}" if compiled['notes'] else ""
+            self.status_var.set(f"[SEARCH] 詳細検索完了: {len(rows)}件 / 検索条件: "
+                                f"{describe_conditions(conditions, combinator)}{notes}")
+            if not rows:
+                messagebox.showinfo("検索結果", "検索条件に一致するデータが見つかりませんでした。")
+
+        self.load_result_view(ResultView.for_table(table, compiled['where'], compiled['params']), on_loaded)
+
+    def show_global_search(self):
+        """
+        全テーブル横断の値検索。テーブルを読み取り接続プールの接続に振り分けて並列に検索し、
+        見つかった列をテーブルごとにまとめて表示する（ダブルクリックでその列の検索結果を表示）
+        """
+        if not self.conn:
+            messagebox.showwarning("全テーブル検索", "データベースに接続されていません。")
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title("全テーブルから検索")
+        window.geometry("900x500")
+        window.transient(self.root)
+
+        value_var = tk.StringVar(value=self.search_value_var.get())
+        type_var = tk.StringVar(value=self.search_type_var.get() if self.search_type_var.get() in SEARCH_TYPES else "完全一致")
+        limit_var = tk.DoubleVar(value=DEFAULT_TABLE_TIME_LIMIT_SEC)
+        status_var = tk.StringVar(value="値を入力して検索してください。")
+
+        top = ttk.Frame(window)
+        ttk.Label(top, text="値:").pack(side=tk.LEFT)
+        value_entry = ttk.Entry(top, textvariable=value_var, width=30)
+        value_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(top, textvariable=type_var, values=list(SEARCH_TYPES), state="readonly", width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Label(top, text="1テーブルの制限時間(秒):").pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Spinbox(top, textvariable=limit_var, from_=0.5, to=60, increment=0.5, width=6).pack(side=tk.LEFT, padx=5)
+        search_button = ttk.Button(top, text="[SEARCH] 検索")
+        search_button.pack(side=tk.LEFT, padx=5)
+        cancel_button = ttk.Button(top, text="中止", state="disabled")
+        cancel_button.pack(side=tk.LEFT)
+        top.pack(fill=tk.X, padx=10, pady=10)
+
+        columns = ("count", "method", "samples")
+        tree = ttk.Treeview(window, columns=columns, show='tree headings')
+        tree.heading('#0', text="テーブル / 列")
+        tree.heading("count", text="該当件数")
+        tree.heading("method", text="検索方法")
+        tree.heading("samples", text="値の例")
+        tree.column('#0', width=250)
+        tree.column("count", width=90, anchor=tk.E)
+        tree.column("method", width=90)
+        tree.column("samples", width=400)
+        tree.tag_configure('timeout', foreground='#b45f06')
+        tree.tag_configure('error', foreground='red')
+        scroll = ttk.Scrollbar(window, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scroll.set)
+        ttk.Label(window, textvariable=status_var).pack(side=tk.BOTTOM, anchor=tk.W, padx=10, pady=(0, 10))
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(10, 0))
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        hits = {}  # ツリーの列の行 -> 見つかった結果
+        table_items = {}
+        state = {"cancel_event": None}
+
+        def table_item(table):
+            if table not in table_items:
+                table_items[table] = tree.insert('', 'end', text=table, open=True)
+            return table_items[table]
+
+        def on_progress(kind, result):
+            if not window.winfo_exists():
+                return
+            if kind == 'hit':
+                count = f"{result['count']:,}" + ("+" if result['more'] else "")
+                item = tree.insert(table_item(result['table']), 'end', text=result['column'], values=(
+                    count, result['method'], " / ".join(str(v) for v in result['samples'])))
+                hits[item] = result
+            elif result['status'] in ('timeout', 'error'):
+                label = "制限時間で打ち切り" if result['status'] == 'timeout' else f"エラー: {result['message']}"
+                item = table_item(result['table'])
+                tree.item(item, tags=(result['status'],), values=("", label, ""))
+
+        def finish(summary):
+            if not window.winfo_exists():
+                return
+            search_button['state'] = 'normal'
+            cancel_button['state'] = 'disabled'
+            message = (f"{summary['tables']}テーブルを検索: {len(table_items)}テーブル・{summary['hit_columns']}列で見つかりました "
+                       f"({summary['elapsed_sec']:.1f}秒)")
+            if summary['timeout']:
+                message += f" / 制限時間で打ち切り: {len(summary['timeout'])}テーブル"
+            if summary['errors']:
+                message += f" / エラー: {len(summary['errors'])}件"
+            if state["cancel_event"].is_set():
+                message += " / 中止しました"
+            status_var.set(message)
+            self.status_var.set(f"[SEARCH] 全テーブル検索 '{value_var.get().strip()}': {message}")
+
+        def finish_error(error):
+            self.status_var.set(f"[ERROR] 全テーブル検索: {error}")
+            if window.winfo_exists():
+                search_button['state'] = 'normal'
+                cancel_button['state'] = 'disabled'
+                status_var.set(f"エラー: {error}")
+
+        def start(event=None):
+            if str(search_button['state']) == 'disabled':
+                return
+            try:
+                limit = float(limit_var.get())
+                plans = plan_global_search(self.read_conn, self.schema, self.tables, value_var.get(), type_var.get())
+            except (ValueError, tk.TclError) as e:
+                messagebox.showwarning("全テーブル検索", str(e) or "制限時間を数値で入力してください。", parent=window)
+                return
+            tree.delete(*tree.get_children())
+            hits.clear()
+            table_items.clear()
+            cancel_event = threading.Event()
+            state["cancel_event"] = cancel_event
+            search_button['state'] = 'disabled'
+            cancel_button['state'] = 'normal'
+            status_var.set(f"{len(plans)}テーブルを検索中...")
+            db = self.db
+            self.run_background_task(
+                "全テーブル検索",
+                lambda conn, report: run_global_search(conn, db.acquire_reader, plans, report, db.pool_size,
+                                                       cancel_event, limit),
+                finish, on_progress=on_progress,
+                on_error=finish_error, read_only=True)
+
+        def open_hit(event=None):
+            selection = tree.selection()
+            result = hits.get(selection[0]) if selection else None
+            if not result:
+                return
+            self.table_combo.set(result['table'])
+            self.on_table_selected()
+            self.search_column_combo.set(result['column'])
+            self.search_value_var.set(value_var.get().strip())
+            self.load_result_view(
+                ResultView.for_table(result['table'], result['sql'], result['params']),
+                lambda rows: self.status_var.set(
+                    f"[SEARCH] {result['table']}.{result['column']} {type_var.get()} '{value_var.get().strip()}': {len(rows)}件表示"))
+
+        def close():
+            if state["cancel_event"] is not None:
+                state["cancel_event"].set()
+            window.destroy()
+
+        search_button['command'] = start
+        cancel_button['command'] = lambda: state["cancel_event"] and state["cancel_event"].set()
+        value_entry.bind('<Return>', start)
+        tree.bind('<Double-1>', open_hit)
+        window.protocol("WM_DELETE_WINDOW", close)
+        value_entry.focus_set()
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = SQLiteGUIManager(root)
     root.mainloop()
+    # 終了時にメモリに溜めたクエリパターンを書き込む
+    app.flush_query_log()
@@ -0,0 +1,108 @@
+"""
+CSV/TXTインポートの読み込み方式の比較（pandasの経路 / ELTモード）
+テキストフォルダの各ファイルを両方の方式で別々の一時DBにインポートし、処理時間・フェーズ別時間と、
+2つのテーブルで値が異なる列（ELTモードでは欠損値が 'nan' にならない・数字だけの値の先頭の0を残すなど、
+sqlite_elt_import に書いた意図した違いを含む）を表示する
+例: python benchmark_csv_txt_load_modes.py テキスト --files zs45.txt zp02.txt
+"""
+
+import argparse
+import copy
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from sqlite_import_events import ImportEventStream
+from universal_csv_txt_to_sqlite import csv_txt_table_name, load_csv_txt_config, process_and_insert_data
+
+MODES = ("pandas", "elt")
+
+
+def config_for_mode(config, mode):
+    """すべてのファイルを指定の方式で読み込む設定（ファイルごとの load_mode は外す）"""
+    config = copy.deepcopy(config)
+    config['load_mode'] = mode
+    for file_config in config.get('files', {}).values():
+        file_config.pop('load_mode', None)
+    return config
+
+
+def run_import(file_path, db_path, config):
+    """1ファイルをインポートし、file_end イベント（処理時間・フェーズ別時間・行数）を返す"""
+    events = ImportEventStream()
+    records = []
+    events.subscribe(records.append)
+    conn = sqlite3.connect(db_path)
+    try:
+        process_and_insert_data(conn, file_path, config, events)
+    finally:
+        conn.close()
+    return next(r for r in records if r['event'] == 'file_end')
+
+
+def differing_columns(db_paths, table_name):
+    """2つのDBの同じテーブルで、値が異なる行がある列 -> 件数（rowid順に突き合わせる）"""
+    conn = sqlite3.connect(db_paths['pandas'])
+    try:
+        conn.execute("ATTACH DATABASE ? AS other", (db_paths['elt'],))
+        columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+        differences = {}
+        for column in columns:
+            count = conn.execute(
+                f'SELECT COUNT(*) FROM main."{table_name}" a JOIN other."{table_name}" b ON a.rowid = b.rowid '
+                f'WHERE a."{column}" IS NOT b."{column}"').fetchone()[0]
+            if count:
+                differences[column] = count
+        return differences
+    except sqlite3.Error as e:
+        return {f"(比較できません: {e})": 0}
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV/TXTインポートのpandasの経路とELTモードの処理時間を比較します。")
+    parser.add_argument("input", nargs="?", default=str(Path(__file__).parent / "テキスト"), help="入力ディレクトリ")
+    parser.add_argument("--files", nargs="*", help="対象ファイル名（省略時はフォルダ内のCSV/TXT/TSVすべて）")
+    args = parser.parse_args()
+
+    input_dir = Path(args.input)
+    files = sorted(p for p in input_dir.iterdir() if p.suffix.lower() in ('.csv', '.txt', '.tsv'))
+    if args.files:
+        files = [p for p in files if p.name in args.files]
+    base_config = load_csv_txt_config()
+    totals = {mode: 0.0 for mode in MODES}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        print(f"{'ファイル':<40} {'行数':>9} {'pandas(秒)':>11} {'ELT(秒)':>9} {'倍率':>6}  値が異なる列")
+        for file_path in files:
+            table_name = csv_txt_table_name(file_path, base_config)
+            db_paths, results = {}, {}
+            for mode in MODES:
+                db_paths[mode] = os.path.join(work_dir, f"{mode}.db")
+                if os.path.exists(db_paths[mode]):
+                    os.remove(db_paths[mode])
+                results[mode] = run_import(file_path, db_paths[mode], config_for_mode(base_config, mode))
+            if any(r['status'] != 'ok' for r in results.values()):
+                errors = ", ".join(f"{mode}: {r['error']}" for mode, r in results.items() if r['status'] != 'ok')
+                print(f"{file_path.name:<40} エラー ({errors})")
+                continue
+            for mode in MODES:
+                totals[mode] += results[mode]['elapsed_sec']
+            pandas_sec, elt_sec = results['pandas']['elapsed_sec'], results['elt']['elapsed_sec']
+            differences = differing_columns(db_paths, table_name)
+            diff_text = ", ".join(f"{col}({count})" for col, count in differences.items()) or "なし"
+            rows = f"{results['pandas']['rows']}" + ("" if results['pandas']['rows'] == results['elt']['rows']
+                                                     else f"/{results['elt']['rows']}")
+            print(f"{file_path.name:<40} {rows:>9} {pandas_sec:>11.2f} {elt_sec:>9.2f} "
+                  f"{pandas_sec / elt_sec if elt_sec else 0:>5.1f}x  {diff_text}")
+            for mode in MODES:
+                phases = " ".join(f"{name}={sec:.2f}" for name, sec in results[mode]['phases'].items())
+                print(f"{'':<4}{mode}: {phases}")
+
+    print(f"\n合計: pandas {totals['pandas']:.1f}秒 / ELT {totals['elt']:.1f}秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+GUI用のDB接続管理
+書き込み用の接続1本と、読み取り専用接続 (PRAGMA query_only) のプールを持つ。
+読み取り接続はDBサイズに合わせた mmap_size を設定し、一覧表示・検索やバックグラウンドの集計に使う。
+インポート・DDL・VACUUMの後も接続は張り直さず、PRAGMA schema_version / data_version の変化で
+変更を検知して、呼び出し側が必要な部分だけを更新する
+どの接続にも sqlite_functions のSQL関数（REGEXPなど）を登録する
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import List
+
+from sqlite_functions import register_functions
+
+DEFAULT_POOL_SIZE = 4
+MMAP_LIMIT = 1024 * 1024 * 1024  # mmap_sizeの上限（32bit環境でもアドレス空間を使い切らない大きさ）
+MMAP_HEADROOM = 64 * 1024 * 1024  # インポートで多少大きくなっても張り直さずに済む余裕
+CACHE_SIZE = 10000
+
+
+def mmap_size_for(db_path: str) -> int:
+    """DBファイルのサイズに合わせたmmap_size（上限MMAP_LIMIT）"""
+    try:
+        size = os.path.getsize(db_path)
+    except OSError:
+        size = 0
+    return min(size + MMAP_HEADROOM, MMAP_LIMIT)
+
+
+class ConnectionManager:
+    """
+    書き込み接続1本と読み取り接続プール
+    - writer: メインスレッド専用。更新系の処理とスキーマ変更の検知に使う
+    - reader: メインスレッドの一覧表示・検索用の読み取り接続
+    - acquire_reader(): ワーカースレッド用にプールから読み取り接続を借りる
+    """
+
+    def __init__(self, db_path: str, pool_size: int = DEFAULT_POOL_SIZE):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.writer = sqlite3.connect(db_path)
+        register_functions(self.writer)
+        self.writer.execute("PRAGMA journal_mode=WAL;")
+        self.writer.execute(f"PRAGMA cache_size={CACHE_SIZE};")
+        self.writer.execute("PRAGMA synchronous=NORMAL;")
+        self._mmap_size = mmap_size_for(db_path)
+        self._idle: List[sqlite3.Connection] = []
+        self._created = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self.reader = self._open_reader()
+        self._schema_version = self.schema_version()
+        self._data_version = self.data_version()
+
+    def _open_reader(self) -> sqlite3.Connection:
+        # プールの接続はスレッド間で受け渡すため check_same_thread=False（同時に使うのは1スレッドのみ）
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        register_functions(conn)
+        conn.execute("PRAGMA query_only=ON;")
+        conn.execute(f"PRAGMA cache_size={CACHE_SIZE};")
+        conn.execute(f"PRAGMA mmap_size={self._mmap_size};")
+        return conn
+
+    @contextmanager
+    def acquire_reader(self):
+        """プールから読み取り専用接続を借りる（空きがなければ返却を待つ）"""
+        with self._available:
+            while not self._closed and not self._idle and self._created >= self.pool_size:
+                self._available.wait()
+            if self._closed:
+                raise sqlite3.ProgrammingError("接続は閉じられています")
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                self._created += 1
+                conn = None
+        if conn is None:
+            try:
+                conn = self._open_reader()
+            except sqlite3.Error:
+                with self._available:
+                    self._created -= 1
+                    self._available.notify()
+                raise
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            with self._available:
+                if not self._closed:
+                    self._idle.append(conn)
+                    self._available.notify()
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def schema_version(self) -> int:
+        """スキーマ変更（テーブル作成・削除・列追加など）のたびに増える値"""
+        return self.writer.execute("PRAGMA schema_version").fetchone()[0]
+
+    def data_version(self) -> int:
+        """他の接続（インポーター・ワーカー）がコミットするたびに変わる値"""
+        return self.writer.execute("PRAGMA data_version").fetchone()[0]
+
+    def schema_changed(self) -> bool:
+        """前回の確認以降にスキーマが変わったか（この呼び出しで基準を更新する）"""
+        version = self.schema_version()
+        changed = version != self._schema_version
+        self._schema_version = version
+        return changed
+
+    def data_changed(self) -> bool:
+        """前回の確認以降に他の接続がデータを更新したか（この呼び出しで基準を更新する）"""
+        version = self.data_version()
+        changed = version != self._data_version
+        self._data_version = version
+        return changed
+
+    def resize_mmap(self):
+        """DBが大きくなった場合に、メインスレッドの読み取り接続と空いているプール接続のmmap_sizeを合わせ直す"""
+        size = mmap_size_for(self.db_path)
+        if size <= self._mmap_size:
+            return
+        self._mmap_size = size
+        self.reader.execute(f"PRAGMA mmap_size={size};")
+        with self._lock:
+            for conn in self._idle:
+                conn.execute(f"PRAGMA mmap_size={size};")
+
+    def close(self):
+        """すべての接続を閉じる（貸出中の接続は返却時に閉じる）"""
+        with self._available:
+            idle, self._idle = self._idle, []
+            self._closed = True
+            self._available.notify_all()
+        for conn in idle + [self.reader, self.writer]:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
@@ -0,0 +1,102 @@
+"""
+日付列の正規化キー（仮想生成列）とそのインデックス
+日付列はTEXTで格納され、'2025/01/02'・'20250102'・'2025-01-02 00:00:00'（ExcelのTimestampをstrにしたもの）
+のように形式が混在するため、そのままでは範囲検索にインデックスが使えない。
+設定ファイルのファイルごとの "date_keys" を指定すると、date_fields の各列に正規化した値の仮想生成列
+（VIRTUAL: 値はファイルに保存せず、インデックスにだけ格納される）とインデックスを追加する。
+- "iso":    <列>__date  'YYYY-MM-DD' の文字列（'2025/1/2' のように月日が1桁の値も0を補って揃える）
+- "julian": <列>__jd    ユリウス日（実数。日数の差をそのまま計算できる）
+式はSQLite組み込みの関数だけで書くため、sqlite_functions を登録していない接続・他のツールからも読める。
+詳細検索の日付範囲はこの列があれば自動的に使う（sqlite_search_builder）
+
+設定の書き方:
+    "date_fields": ["所要日", "完成期限"],
+    "date_keys": "iso"
+"""
+
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+# 正規化の種類 -> 生成列の接尾辞 / 宣言型
+DATE_KEY_SUFFIXES = {"iso": "__date", "julian": "__jd"}
+_KEY_TYPES = {"iso": "TEXT", "julian": "REAL"}
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def date_key_mode(file_config: Dict) -> Optional[str]:
+    """ファイル設定の date_keys（未指定ならNone、true は 'iso'）"""
+    mode = file_config.get("date_keys")
+    if not mode:
+        return None
+    if mode is True:
+        return "iso"
+    if mode not in DATE_KEY_SUFFIXES:
+        raise ValueError(f"date_keys は {' / '.join(DATE_KEY_SUFFIXES)} のいずれかを指定してください: {mode}")
+    return mode
+
+
+def date_key_column(column: str, mode: str) -> str:
+    return f"{column}{DATE_KEY_SUFFIXES[mode]}"
+
+
+def date_key_expr(column: str, mode: str) -> str:
+    """
+    日付の値を正規化する式（YYYYMMDD と YYYY-M-D / YYYY/M/D / YYYY.M.D に対応。月日は1桁でもよく、後ろに時刻があってもよい。
+    存在しない日付・それ以外の形式（'YYYY年M月D日' を含む）はNULLで、範囲検索に一致しない）
+    インポーターの日付列はNUMERICアフィニティのため、YYYYMMDD は整数で格納されていることがある
+    """
+    value = _quote(column)
+    # 時刻の前（空白・'T' の前）までを取り、区切りを '-' に揃えてから年・月・日に分ける
+    spaced = f"replace({value}, 'T', ' ')"
+    head = f"CASE WHEN instr({spaced}, ' ') > 0 THEN substr({spaced}, 1, instr({spaced}, ' ') - 1) ELSE {value} END"
+    text = f"replace(replace({head}, '/', '-'), '.', '-')"
+    rest = f"substr({text}, 6)"
+    month = f"substr({rest}, 1, instr({rest}, '-') - 1)"
+    day = f"substr({rest}, instr({rest}, '-') + 1)"
+    padded = (f"CASE WHEN length({month}) BETWEEN 1 AND 2 AND length({day}) BETWEEN 1 AND 2 "
+              f"THEN substr({text}, 1, 5) || substr('0' || {month}, -2) || '-' || substr('0' || {day}, -2) END")
+    text_date = (f"CASE WHEN {value} GLOB '[0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9]' "
+                 f"THEN substr({value}, 1, 4) || '-' || substr({value}, 5, 2) || '-' || substr({value}, 7, 2) "
+                 f"ELSE {padded} END")
+    # date() は修飾子を付けた時だけ 9/31 などの存在しない日付を繰り上げるため、繰り上がった値はNULLにする
+    iso = f"CASE date({text_date}) WHEN date({text_date}, '+0 days') THEN date({text_date}) END"
+    return iso if mode == "iso" else f"julianday({iso})"
+
+
+def add_date_key_columns(conn: sqlite3.Connection, table_name: str, file_config: Dict) -> Tuple[List[str], List[str]]:
+    """
+    date_fields の列に正規化キーの仮想生成列とインデックスを追加する（呼び出し側のトランザクション内で実行する）
+    戻り値: (作成したインデックス名, 警告メッセージ)
+    """
+    mode = date_key_mode(file_config)
+    if mode is None:
+        return [], []
+    existing = {row[1].lower() for row in conn.execute(f"PRAGMA table_xinfo({_quote(table_name)})")}
+    created, warnings = [], []
+    for column in file_config.get("date_fields", []):
+        if column.lower() not in existing:
+            warnings.append(f"date_keys の対象の列がテーブルにありません: {column}")
+            continue
+        key = date_key_column(column, mode)
+        if key.lower() not in existing:
+            conn.execute(f"ALTER TABLE {_quote(table_name)} ADD COLUMN {_quote(key)} {_KEY_TYPES[mode]} "
+                         f"GENERATED ALWAYS AS ({date_key_expr(column, mode)}) VIRTUAL")
+        name = f"idx_{table_name}_{key}"
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(name)} ON {_quote(table_name)} ({_quote(key)})")
+        created.append(name)
+    return created, warnings
+
+
+def find_date_key(indexed: Dict[str, set], column: str) -> Optional[Tuple[str, str]]:
+    """
+    日付列にインデックス付きの正規化キーがあれば (生成列名, 種類) を返す
+    indexed: sqlite_search_builder.indexed_columns の結果（インデックスの先頭列名は小文字）
+    """
+    for mode in DATE_KEY_SUFFIXES:
+        key = date_key_column(column, mode)
+        if "BINARY" in indexed.get(key.lower(), ()):
+            return key, mode
+    return None
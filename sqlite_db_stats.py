@@ -0,0 +1,250 @@
+"""
+DB統計情報
+テーブル・インデックスごとのページ数・サイズ・充填率・未使用領域と、空きページ・WALファイルのサイズを集計する。
+dbstat仮想テーブル（SQLITE_ENABLE_DBSTAT_VTAB付きでビルドされたSQLite）があればそれを使い、
+なければDBファイルのB-treeページを直接たどって同じ値を求める
+"""
+
+import math
+import os
+import sqlite3
+import struct
+from typing import Callable, Dict, List, Optional
+
+# ページ種別（B-treeページヘッダの先頭バイト）
+INTERIOR_INDEX = 2
+INTERIOR_TABLE = 5
+LEAF_INDEX = 10
+LEAF_TABLE = 13
+
+PROGRESS_INTERVAL = 5000  # ページ走査時に進捗を通知する間隔（ページ数）
+
+
+def wal_path(db_path: str) -> str:
+    return db_path + "-wal"
+
+
+def database_summary(conn: sqlite3.Connection, db_path: str) -> Dict:
+    """ファイル全体の集計（ページサイズ・ページ数・空きページ・WALサイズ・auto_vacuum）"""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    try:
+        wal_bytes = os.path.getsize(wal_path(db_path))
+    except OSError:
+        wal_bytes = 0
+    try:
+        file_bytes = os.path.getsize(db_path)
+    except OSError:
+        file_bytes = page_count * page_size
+    return {
+        "page_size": page_size,
+        "page_count": page_count,
+        "freelist_count": freelist_count,
+        "free_bytes": freelist_count * page_size,
+        "file_bytes": file_bytes,
+        "wal_bytes": wal_bytes,
+        "auto_vacuum": {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}.get(auto_vacuum, str(auto_vacuum)),
+    }
+
+
+def _schema_objects(conn: sqlite3.Connection) -> List[Dict]:
+    """B-treeを持つオブジェクト（テーブル・インデックス）の一覧。sqlite_schema自身を含む"""
+    objects = [{"name": "sqlite_schema", "type": "table", "table": "sqlite_schema", "rootpage": 1}]
+    for name, obj_type, table, rootpage in conn.execute(
+            "SELECT name, type, tbl_name, rootpage FROM sqlite_master WHERE rootpage > 0 ORDER BY name"):
+        objects.append({"name": name, "type": obj_type, "table": table, "rootpage": rootpage})
+    return objects
+
+
+def dbstat_available(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("SELECT 1 FROM dbstat LIMIT 1").fetchall()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def _object_row(obj: Dict, pages: int, page_bytes: int, unused: int, payload: int, cells: int) -> Dict:
+    return dict(obj, pages=pages, bytes=page_bytes, unused=unused, payload=payload, cells=cells,
+                fill=(1 - unused / page_bytes) if page_bytes else None)
+
+
+def object_stats_dbstat(conn: sqlite3.Connection) -> List[Dict]:
+    """dbstat仮想テーブルによるオブジェクト別の集計（aggregate=TRUEが使えれば1オブジェクト1行で求まる）"""
+    try:
+        rows = conn.execute(
+            "SELECT name, pageno, pgsize, unused, payload, ncell FROM dbstat WHERE aggregate = TRUE").fetchall()
+    except sqlite3.Error:  # aggregate列は3.31以降
+        rows = conn.execute(
+            "SELECT name, COUNT(*), SUM(pgsize), SUM(unused), SUM(payload), SUM(ncell) FROM dbstat GROUP BY name"
+        ).fetchall()
+    by_name = {row[0]: row[1:] for row in rows}
+    stats = []
+    for obj in _schema_objects(conn):
+        pages, page_bytes, unused, payload, cells = by_name.get(obj["name"], (0, 0, 0, 0, 0))
+        stats.append(_object_row(obj, pages or 0, page_bytes or 0, unused or 0, payload or 0, cells or 0))
+    return stats
+
+
+def _varint(data: bytes, offset: int):
+    """SQLiteの可変長整数を読む（値, 次の位置）"""
+    value = 0
+    for i in range(8):
+        byte = data[offset + i]
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, offset + i + 1
+    return (value << 8) | data[offset + 8], offset + 9
+
+
+def _overflow_pages(payload: int, usable: int, is_table_leaf: bool) -> int:
+    """ペイロードがページに収まらない場合のオーバーフローページ数（SQLiteのファイルフォーマット仕様の計算式）"""
+    max_local = usable - 35 if is_table_leaf else ((usable - 12) * 64 // 255) - 23
+    if payload <= max_local:
+        return 0
+    min_local = ((usable - 12) * 32 // 255) - 23
+    local = min_local + (payload - min_local) % (usable - 4)
+    if local > max_local:
+        local = min_local
+    return math.ceil((payload - local) / (usable - 4))
+
+
+class _PageReader:
+    """
+    DBファイルからページを読む（WALにしかないページは反映されないため、事前にチェックポイントする）
+    チェックポイントが完了していないと、ファイルの末尾より後のページは短い（空の）バイト列になる
+    """
+
+    def __init__(self, db_path: str):
+        self.file = open(db_path, "rb")
+        header = self.file.read(100)
+        page_size = struct.unpack(">H", header[16:18])[0]
+        self.page_size = 65536 if page_size == 1 else page_size
+        self.usable = self.page_size - header[20]
+
+    def read(self, pgno: int) -> bytes:
+        self.file.seek((pgno - 1) * self.page_size)
+        return self.file.read(self.page_size)
+
+    def close(self):
+        self.file.close()
+
+
+def _parse_page(page: bytes, pgno: int, usable: int) -> Optional[Dict]:
+    """B-treeページ1つの集計と子ページ番号（B-treeのページでなければNone）"""
+    base = 100 if pgno == 1 else 0
+    page_type = page[base]
+    if page_type not in (INTERIOR_INDEX, INTERIOR_TABLE, LEAF_INDEX, LEAF_TABLE):
+        return None
+    first_freeblock, ncells, content_start, fragmented = struct.unpack(">HHHB", page[base + 1:base + 8])
+    content_start = content_start or 65536
+    header_size = 12 if page_type in (INTERIOR_INDEX, INTERIOR_TABLE) else 8
+    pointers_end = base + header_size + 2 * ncells
+
+    freeblocks = 0
+    block = first_freeblock
+    while block and block < len(page) - 4:
+        next_block, size = struct.unpack(">HH", page[block:block + 4])
+        freeblocks += size
+        block = next_block if next_block > block else 0
+
+    result = {"cells": ncells, "unused": (content_start - pointers_end) + freeblocks + fragmented,
+              "payload": 0, "overflow": 0, "children": []}
+    if page_type in (INTERIOR_INDEX, INTERIOR_TABLE):
+        result["children"].append(struct.unpack(">I", page[base + 8:base + 12])[0])
+    for i in range(ncells):
+        cell = struct.unpack(">H", page[base + header_size + 2 * i:base + header_size + 2 * i + 2])[0]
+        if page_type in (INTERIOR_INDEX, INTERIOR_TABLE):
+            result["children"].append(struct.unpack(">I", page[cell:cell + 4])[0])
+            cell += 4
+        if page_type == INTERIOR_TABLE:
+            continue  # 子ページ番号とrowidのみ
+        payload, cell = _varint(page, cell)
+        result["payload"] += payload
+        result["overflow"] += _overflow_pages(payload, usable, page_type == LEAF_TABLE)
+    return result
+
+
+def _walk_btree(reader: _PageReader, rootpage: int, visited: set, progress: Optional[Callable]) -> Dict:
+    """
+    1つのB-treeをたどってページ数・未使用バイト数・ペイロード・セル数を数える
+    ファイルにない（WALにしかない）ページと、WALで更新済みのため内容が途中で切れているページは
+    読み飛ばして skipped に数える（その先の子ページは集計に含まれない）
+    """
+    totals = {"pages": 0, "unused": 0, "payload": 0, "cells": 0, "overflow": 0, "skipped": 0}
+    stack = [rootpage]
+    while stack:
+        pgno = stack.pop()
+        if pgno in visited or pgno < 1:
+            continue
+        visited.add(pgno)
+        page = reader.read(pgno)
+        if len(page) < reader.page_size:
+            totals["skipped"] += 1
+            continue
+        try:
+            parsed = _parse_page(page, pgno, reader.usable)
+        except (IndexError, struct.error):
+            totals["skipped"] += 1
+            continue
+        if parsed is None:
+            continue
+
+        totals["pages"] += 1
+        for key in ("cells", "unused", "payload", "overflow"):
+            totals[key] += parsed[key]
+        stack.extend(parsed["children"])
+
+        if progress and len(visited) % PROGRESS_INTERVAL == 0:
+            progress("ページ走査", len(visited))
+    return totals
+
+
+def object_stats_pagewalk(conn: sqlite3.Connection, db_path: str,
+                          progress: Optional[Callable] = None) -> List[Dict]:
+    """
+    DBファイルのB-treeを直接たどるオブジェクト別の集計（dbstatがない環境向け）
+    読めなかったページ数を skipped_pages に入れる（チェックポイントが完了していない場合の部分的な集計）
+    """
+    objects = _schema_objects(conn)
+    reader = _PageReader(db_path)
+    try:
+        visited = set()
+        stats = []
+        for obj in objects:
+            totals = _walk_btree(reader, obj["rootpage"], visited, progress)
+            # オーバーフローページはページ数・サイズにのみ加える（ページ内の未使用領域は数えない概算）
+            pages = totals["pages"] + totals["overflow"]
+            stats.append(dict(_object_row(obj, pages, pages * reader.page_size, totals["unused"],
+                                          totals["payload"], totals["cells"]), skipped_pages=totals["skipped"]))
+        return stats
+    finally:
+        reader.close()
+
+
+def collect_db_stats(conn: sqlite3.Connection, db_path: str, progress: Optional[Callable] = None) -> Dict:
+    """
+    DB全体とオブジェクト別の統計
+    ページ走査の場合は、WALにしかないページを反映させるため先にチェックポイントを試みる
+    （他の接続が読み取り中で完了しなかった場合は wal_pending=True。ファイルから読めなかったページは
+    skipped_pages に数え、それ以外のページだけの部分的な集計を返す）
+    """
+    summary = database_summary(conn, db_path)
+    wal_pending = False
+    if dbstat_available(conn):
+        method = "dbstat"
+        objects = object_stats_dbstat(conn)
+    else:
+        method = "ページ走査"
+        busy, log_frames, checkpointed = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        wal_pending = busy != 0 or (log_frames > 0 and checkpointed < log_frames)
+        objects = object_stats_pagewalk(conn, db_path, progress)
+    objects.sort(key=lambda o: o["bytes"], reverse=True)
+
+    summary["unused_bytes"] = sum(o["unused"] for o in objects)
+    skipped_pages = sum(o.get("skipped_pages", 0) for o in objects)
+    return {"summary": summary, "objects": objects, "method": method, "wal_pending": wal_pending,
+            "skipped_pages": skipped_pages}
+
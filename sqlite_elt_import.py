@@ -0,0 +1,331 @@
+"""
+CSV/TXTのELTモード（生データをそのまま取り込んでからSQLでクリーニングする）
+pandasの経路（DataFrameに読み込み → セルごとにPythonでクリーニング → 書き込み）の代わりに、
+1. load:  csvモジュールで読みながら、全列を文字列のまま一時テーブル (temp) にチャンクごとに executemany で流し込む。
+          同じチャンクで型推定用の件数も数える（列ごとに値の出現回数を数え、異なる値ごとに1回だけ判定する）
+2. infer: 数えた件数から宣言型を決める（設定ファイルで型を指定した列は数えない）
+3. clean: 設定ファイルの integer_fields / date_fields などから INSERT ... SELECT を1本組み立て、
+          登録済みのSQL関数 (sqlite_functions) で変換しながら書き込み中のテーブルに移す
+DataFrameを作らず、Pythonで処理するのは変換が必要な列の値だけになる。
+設定ファイルで "load_mode": "elt" を指定したファイル（最上位に書くと全ファイルの既定）に使う
+
+pandasの経路との違い:
+- 欠損値はどの列もNULLのまま（pandasの経路では force_text_fields などで文字列 'nan' になる）
+- 型を指定していない列は元の文字列を宣言型のアフィニティで変換する（整数列の欠損で '12.0' にならない）
+- integer_fields は桁区切りのカンマを除いて変換し、負の数の符号を保持する
+- 行末に区切り文字がある（ヘッダーより列が1つ多く、余分な列が空の）行は、余分な列を除いて取り込む
+  （pandasでは先頭列が行インデックスとして扱われ、テーブルから抜け落ちる）
+- 数字だけの値は元の表記のまま取り込む。pandasの経路では read_csv が列全体を数値として読むため、
+  force_text_fields・text_fields の列でも先頭の0が落ちる（'0000292419' が '292419' になる）
+- date_fields の '0000-00-00' など存在しない日付はNULL（pandasの経路では YYYY-MM-DD 形式の文字列が残る）
+
+処理時間（benchmark_csv_txt_load_modes.py、同梱のテキスト 27ファイル・約11万行）: pandas 7.7秒 / ELT 4.5秒
+差はほぼ型推定で、pandasの経路はセルごとに判定するが、ELTは読み込み中に異なる値ごとに1回だけ判定する
+"""
+
+import csv
+import sqlite3
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlite_functions import clean_integer, clean_real, register_functions, to_iso_date
+
+LOAD_MODES = ("pandas", "elt")
+RAW_TABLE = "temp.__elt_raw"
+# 一時テーブルへの書き込みと型推定の件数集計を行う行数の単位
+RAW_CHUNK_ROWS = 10000
+
+# pandas.read_csv が既定で欠損値とみなす文字列
+PANDAS_NA_VALUES = ('', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null')
+_NA_SET = frozenset(PANDAS_NA_VALUES)
+
+# 列の種類 -> 変換に使うSQL関数（pandasの経路のクリーニング関数に対応）
+_CONVERTERS = {"integer": "clean_integer", "date": "to_iso_date", "real": "clean_real"}
+_PY_CONVERTERS = {"integer": clean_integer, "date": to_iso_date, "real": clean_real}
+
+
+def load_mode(config: Dict, file_config: Dict) -> str:
+    """ファイルの読み込み方式（ファイル設定 → 設定ファイル最上位 → 'pandas' の順）"""
+    mode = file_config.get("load_mode", config.get("load_mode", "pandas"))
+    if mode not in LOAD_MODES:
+        raise ValueError(f"load_mode は {' / '.join(LOAD_MODES)} のいずれかを指定してください: {mode}")
+    return mode
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def column_names(header: List[str]) -> List[str]:
+    """ヘッダーの列名（pandasと同じく空欄は 'Unnamed: n'、重複は '名前.1' のように番号を付ける）"""
+    names = []
+    counts: Dict[str, int] = {}
+    for i, name in enumerate(header):
+        name = name if name != "" else f"Unnamed: {i}"
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        counts[name] = count + 1
+        names.append(name)
+    return names
+
+
+def _reader_params(file_path: Path, file_config: Dict) -> Dict:
+    """build_read_csv_params と同じ設定項目から csv.reader の引数を作る"""
+    default_delimiter = ',' if file_path.suffix.lower() == '.csv' else '\t'
+    params = {"delimiter": file_config.get("delimiter", default_delimiter)}
+    if "quoting" in file_config:
+        params["quoting"] = file_config["quoting"]
+    if "escapechar" in file_config:
+        params["escapechar"] = file_config["escapechar"]
+    return params
+
+
+def _load_raw(conn: sqlite3.Connection, file_path: Path, file_config: Dict, encoding: str,
+              metrics) -> Tuple[List[str], "_TypeCounts"]:
+    """ファイルを読みながら全列を文字列のまま一時テーブルに書き込み、(列名の一覧, 型推定用の件数) を返す"""
+    if encoding.lower().replace("_", "-") in ("utf-8", "utf8"):
+        encoding = "utf-8-sig"  # pandasと同じく先頭のBOMを列名に含めない
+    header_row = file_config.get("header_row", 0)
+    with open(file_path, "r", encoding=encoding, newline="") as f:
+        # pandasと同じく空行は読み飛ばす
+        rows = (row for row in csv.reader(f, **_reader_params(file_path, file_config)) if row)
+        for _ in range(header_row or 0):
+            next(rows, None)
+        header = next(rows, None)
+        if header is None:
+            raise ValueError("ヘッダー行がありません。")
+        columns = column_names(header) if header_row is not None else [str(i) for i in range(len(header))]
+        width = len(columns)
+        skipped = 0
+
+        def padded() -> Iterator[List[str]]:
+            nonlocal skipped
+            if header_row is None:
+                yield header
+            for row in rows:
+                if len(row) > width:
+                    if any(row[width:]):
+                        skipped += 1  # pandasの on_bad_lines='warn' と同じく列数が多すぎる行は読み飛ばす
+                        continue
+                    row = row[:width]  # 行末の区切り文字による空の列は除く
+                yield row + [None] * (width - len(row)) if len(row) < width else row
+
+        plan = column_plan(columns, file_config)
+        type_counts = _TypeCounts(width, [i for i, col in enumerate(columns) if not plan[col][0]])
+        conn.execute(f"DROP TABLE IF EXISTS {RAW_TABLE}")
+        conn.execute(f"CREATE TABLE {RAW_TABLE} ({', '.join(f'c{i}' for i in range(width))})")
+        insert = f"INSERT INTO {RAW_TABLE} VALUES ({', '.join('?' for _ in range(width))})"
+        source = padded()
+        while True:
+            chunk = list(islice(source, RAW_CHUNK_ROWS))
+            if not chunk:
+                break
+            conn.executemany(insert, chunk)
+            type_counts.add(chunk)
+    if skipped:
+        metrics.warning(f"列数がヘッダーより多い {skipped}行を読み飛ばしました。")
+    return columns, type_counts
+
+
+def load_raw(conn: sqlite3.Connection, file_path: Path, file_config: Dict, metrics) -> Tuple[List[str], "_TypeCounts"]:
+    """生データを一時テーブルに読み込む（指定のエンコーディングで読めなければcp932で再試行する）"""
+    encoding = file_config.get("encoding", "utf-8")
+    try:
+        return _load_raw(conn, file_path, file_config, encoding, metrics)
+    except UnicodeDecodeError:
+        conn.rollback()
+        metrics.warning(f"{encoding}での読み込みに失敗。cp932で再試行します。")
+        return _load_raw(conn, file_path, file_config, "cp932", metrics)
+
+
+def _na_expr(column: str) -> str:
+    """欠損値の文字列をNULLにする式"""
+    values = ", ".join("'" + v.replace("'", "''") + "'" for v in PANDAS_NA_VALUES)
+    return f"CASE WHEN {column} IN ({values}) THEN NULL ELSE {column} END"
+
+
+def column_plan(columns: List[str], file_config: Dict) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """
+    列ごとの (宣言型, 変換の種類) を設定ファイルから決める（型推定が必要な列は宣言型がNone）
+    優先順位はpandasの経路と同じ（型: detect_data_types / 変換: clean_dataframe_with_config）
+    """
+    integer_fields = file_config.get("integer_fields", [])
+    real_fields = file_config.get("real_to_text_fields", [])
+    date_fields = file_config.get("date_fields", [])
+    comma_fields = file_config.get("comma_cleanup_fields", [])
+    text_fields = file_config.get("force_text_fields", []) + file_config.get("text_fields", []) + comma_fields
+    plan = {}
+    for col in columns:
+        if col in integer_fields:
+            declared = "INTEGER"
+        elif col in real_fields:
+            declared = "REAL"
+        elif col in date_fields:
+            declared = "TIMESTAMP"
+        elif col in text_fields:
+            declared = "TEXT"
+        else:
+            declared = None
+        if col in integer_fields:
+            kind = "integer"
+        elif col in date_fields:
+            kind = "date"
+        elif col in real_fields:
+            kind = "real"
+        elif col in comma_fields:
+            kind = "comma"
+        else:
+            kind = "text"
+        plan[col] = (declared, kind)
+    return plan
+
+
+def _number_kind(value: str) -> int:
+    """detect_data_types と同じ判定（'.' を含む値は小数、含まない値は整数として数値になるか）。1: 整数 / 2: 小数 / 0: それ以外"""
+    try:
+        if "." in value:
+            float(value)
+            return 2
+        int(float(value))
+        return 1
+    except (ValueError, OverflowError):
+        return 0
+
+
+class _TypeCounts:
+    """
+    型推定用の件数: 列ごとの [欠損値以外の件数, 整数の件数, 小数の件数]
+    チャンクごとに値の出現回数を数え、異なる値ごとに1回だけ判定する
+    （コード・日付・数量の値が繰り返すため、全セルをSQLの集計関数で判定するより大幅に速い）
+    """
+
+    def __init__(self, width: int, targets: List[int]):
+        self.targets = targets
+        self.counts = [[0, 0, 0] for _ in range(width)]
+
+    def add(self, rows: List[List[Optional[str]]]):
+        if not self.targets:
+            return
+        columns = list(zip(*rows))
+        for i in self.targets:
+            counts = self.counts[i]
+            for value, n in Counter(columns[i]).items():
+                if value is None or value in _NA_SET:
+                    continue
+                counts[0] += n
+                kind = _number_kind(value)
+                if kind:
+                    counts[kind] += n
+
+
+def infer_types(columns: List[str], plan: Dict, type_counts: _TypeCounts) -> Dict[str, str]:
+    """
+    宣言型を決める。設定で型を指定していない列は、detect_data_types と同じ基準
+    （整数が8割超ならINTEGER、数値が8割超ならREAL、それ以外はTEXT）で読み込み時に数えた件数から推定する
+    """
+    sqlite_types = {}
+    for i, col in enumerate(columns):
+        if plan[col][0]:
+            sqlite_types[col] = plan[col][0]
+            continue
+        total, int_count, float_count = type_counts.counts[i]
+        if not total:
+            sqlite_types[col] = "TEXT"
+        elif int_count / total > 0.8:
+            sqlite_types[col] = "INTEGER"
+        elif (int_count + float_count) / total > 0.8:
+            sqlite_types[col] = "REAL"
+        else:
+            sqlite_types[col] = "TEXT"
+    return sqlite_types
+
+
+def _valid_date_expr(raw: str, iso: str) -> str:
+    """'YYYY-MM-DD' にした値が存在する日付ならその値、そうでなければNULL（to_iso_date と同じく0年・2月30日などはNULL）"""
+    # date() は修飾子を付けた時だけ存在しない日付を繰り上げるため、'+0 days' を付けて比べる
+    return f"CASE WHEN date({iso}, '+0 days') = {iso} AND {raw} NOT GLOB '0000*' THEN {iso} END"
+
+
+def _fast_convert_expr(raw: str, kind: str) -> str:
+    """
+    よくある形式の値をSQLだけで変換する CASE の WHEN 句（変換関数と同じ結果になる形式に限る）
+    変換関数の呼び出しはセルごとにPythonを経由するため、空欄・数字だけの値・YYYYMMDD などはここで変換する
+    """
+    clauses = f"WHEN {raw} = '' THEN NULL "
+    if kind == "date":
+        compact = f"substr({raw}, 1, 4) || '-' || substr({raw}, 5, 2) || '-' || substr({raw}, 7, 2)"
+        separated = f"substr({raw}, 1, 4) || '-' || substr({raw}, 6, 2) || '-' || substr({raw}, 9, 2)"
+        clauses += (f"WHEN {raw} GLOB '{'[0-9]' * 8}' THEN {_valid_date_expr(raw, compact)} "
+                    f"WHEN {raw} GLOB '[0-9][0-9][0-9][0-9][-/.][0-9][0-9][-/.][0-9][0-9]' "
+                    f"THEN {_valid_date_expr(raw, separated)} ")
+    elif kind == "integer":
+        clauses += f"WHEN {raw} NOT GLOB '*[^0-9]*' AND length({raw}) <= 18 THEN CAST({raw} AS INTEGER) "
+    elif kind == "real":
+        # 小数はSQLiteとPythonで丸めが異なることがあるため、実数で正確に表せる15桁までの整数だけ
+        clauses += f"WHEN {raw} NOT GLOB '*[^0-9]*' AND length({raw}) <= 15 THEN CAST({raw} AS REAL) "
+    return clauses
+
+
+def _clean_expr(i: int, kind: str) -> str:
+    """生データの列を変換する式"""
+    raw = f"c{i}"
+    if kind in _CONVERTERS:
+        # 変換関数は空値・変換できない値をNULLにする
+        return f"CASE {_fast_convert_expr(raw, kind)}ELSE {_CONVERTERS[kind]}({raw}) END"
+    value = _na_expr(raw)
+    if kind == "comma":
+        # 桁区切りのカンマを除き、末尾の '.0' を取る
+        value = f"replace({value}, ',', '')"
+        return f"CASE WHEN {value} LIKE '%.0' THEN substr({value}, 1, length({value}) - 2) ELSE {value} END"
+    return value
+
+
+def clean_value(value, kind: str):
+    """_clean_expr と同じ変換をPythonで行う（元ファイルとの突合で、ELTモードで取り込んだ値と比べるため）"""
+    if kind in _CONVERTERS:
+        return _PY_CONVERTERS[kind](value)
+    if value is None or value in _NA_SET:
+        return None
+    if kind == "comma":
+        value = value.replace(",", "")
+        return value[:-2] if value.endswith(".0") else value
+    return value
+
+
+def build_clean_sql(target_table: str, columns: List[str], plan: Dict) -> str:
+    """一時テーブルから変換しながら書き込むINSERT ... SELECT文"""
+    column_list = ", ".join(_quote(col) for col in columns)
+    select = ", ".join(_clean_expr(i, plan[col][1]) for i, col in enumerate(columns))
+    return f"INSERT INTO {_quote(target_table)} ({column_list}) SELECT {select} FROM {RAW_TABLE}"
+
+
+def elt_load(conn: sqlite3.Connection, file_path, target_table: str, file_config: Dict, metrics) -> int:
+    """
+    ELTモードでファイルを target_table（書き込み中の一時名）に書き込んでコミットし、行数を返す
+    （本来のテーブルとの入れ替えは呼び出し側で行う）
+    フェーズ: read（生データの読み込みと型推定用の集計）/ infer（型の決定）/ clean（SQLでの変換と書き込み）
+    """
+    file_path = Path(file_path)
+    register_functions(conn)
+    try:
+        with metrics.phase("read"):
+            columns, type_counts = load_raw(conn, file_path, file_config, metrics)
+            metrics.rows = conn.execute(f"SELECT COUNT(*) FROM {RAW_TABLE}").fetchone()[0]
+        plan = column_plan(columns, file_config)
+        with metrics.phase("infer"):
+            sqlite_types = infer_types(columns, plan, type_counts)
+        with metrics.phase("clean"):
+            conn.execute(f"DROP TABLE IF EXISTS {_quote(target_table)}")
+            column_defs = ", ".join(f"{_quote(col)} {sqlite_types[col]}" for col in columns)
+            conn.execute(f"CREATE TABLE {_quote(target_table)} ({column_defs})")
+            conn.execute(build_clean_sql(target_table, columns, plan))
+            conn.commit()
+    finally:
+        conn.execute(f"DROP TABLE IF EXISTS {RAW_TABLE}")
+    return metrics.rows
@@ -0,0 +1,250 @@
+"""
+クエリ結果のストリーミングエクスポート
+画面表示とは別にクエリを再実行し、fetchmanyでチャンクごとにファイルへ書き出す
+（全件をメモリに載せないため、数百万行でも一定のメモリで出力できる）
+"""
+
+import csv
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+EXPORT_FORMATS = {
+    "csv": "CSV (カンマ区切り)",
+    "tsv": "TSV (タブ区切り)",
+    "xlsx": "Excel (.xlsx)",
+    "parquet": "Parquet",
+}
+CSV_ENCODINGS = ["utf-8-sig", "cp932"]
+DEFAULT_CHUNK_SIZE = 10000
+XLSX_MAX_ROWS = 1048576  # Excelの1シートの最大行数（ヘッダー行を含む）
+
+
+class ExportCancelled(Exception):
+    """エクスポートがキャンセルされた"""
+
+
+class _CsvWriter:
+    def __init__(self, path: str, delimiter: str, encoding: str):
+        # cp932で表現できない文字は'?'に置換して出力を止めない
+        self.file = open(path, "w", newline="", encoding=encoding, errors="replace")
+        self.writer = csv.writer(self.file, delimiter=delimiter)
+
+    def write_header(self, columns: List[str]):
+        self.writer.writerow(columns)
+
+    def write_rows(self, rows: Sequence[tuple]):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _XlsxWriter:
+    """openpyxlの書き込み専用モード（行を保持しないため一定メモリ）"""
+    def __init__(self, path: str):
+        from openpyxl import Workbook
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.columns: List[str] = []
+        self.sheet = None
+        self.sheet_rows = 0
+        self.sheet_count = 0
+
+    def _new_sheet(self):
+        self.sheet_count += 1
+        self.sheet = self.workbook.create_sheet(title=f"Sheet{self.sheet_count}")
+        self.sheet.append(self.columns)
+        self.sheet_rows = 1
+
+    def write_header(self, columns: List[str]):
+        self.columns = list(columns)
+        self._new_sheet()
+
+    def write_rows(self, rows: Sequence[tuple]):
+        for row in rows:
+            # 1シートの上限を超えたら次のシートに続ける
+            if self.sheet_rows >= XLSX_MAX_ROWS:
+                self._new_sheet()
+            self.sheet.append(row)
+            self.sheet_rows += 1
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+class _ParquetWriter:
+    """
+    pyarrowによるParquet出力（チャンクごとにrow groupとして追記）
+    列の型は結果全体の格納クラス (set_storage_classes) から決める（整数と実数が混在する列は実数、
+    それ以外の混在は文字列）。格納クラスが分からない場合は最初のチャンクから推定する。
+    値を型に合わせて切り捨てたり作り変えたりはせず、型に合わない値はNULLにして coerced_values に数える
+    """
+    def __init__(self, path: str):
+        import pyarrow
+        import pyarrow.parquet
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.columns: List[str] = []
+        self.storage_classes: Optional[List[set]] = None
+        self.schema = None
+        self.writer = None
+        self.coerced_values = 0
+
+    def write_header(self, columns: List[str]):
+        self.columns = list(columns)
+
+    def set_storage_classes(self, storage_classes: List[set]):
+        """列ごとの格納クラス（typeof() の値の集合）"""
+        self.storage_classes = storage_classes
+
+    def _type_for_classes(self, classes: set):
+        classes = set(classes) - {"null"}
+        if classes and classes <= {"integer"}:
+            return self.pa.int64()
+        if classes and classes <= {"integer", "real"}:
+            return self.pa.float64()
+        if classes == {"blob"}:
+            return self.pa.binary()
+        return self.pa.string()
+
+    def _infer_type(self, values: list):
+        classes = set()
+        for v in values:
+            if v is None:
+                continue
+            if isinstance(v, int):
+                classes.add("integer")
+            elif isinstance(v, float):
+                classes.add("real")
+            elif isinstance(v, bytes):
+                classes.add("blob")
+            else:
+                classes.add("text")
+        return self._type_for_classes(classes)
+
+    def _coerce(self, value, arrow_type):
+        if value is None:
+            return None
+        if arrow_type == self.pa.int64():
+            ok = isinstance(value, int)
+        elif arrow_type == self.pa.float64():
+            ok = isinstance(value, (int, float))
+        elif arrow_type == self.pa.binary():
+            ok = isinstance(value, bytes)
+        else:
+            if isinstance(value, bytes):
+                return value.hex()
+            return value if isinstance(value, str) else str(value)
+        if not ok:
+            # 型を決めた後にデータが変わった場合など（値を作り変えず、件数を報告する）
+            self.coerced_values += 1
+            return None
+        return float(value) if arrow_type == self.pa.float64() else value
+
+    def write_rows(self, rows: Sequence[tuple]):
+        columns_data = list(zip(*rows)) if rows else [[] for _ in self.columns]
+        if self.schema is None:
+            if self.storage_classes is not None:
+                types = [self._type_for_classes(classes) for classes in self.storage_classes]
+            else:
+                types = [self._infer_type(list(values)) for values in columns_data]
+            self.schema = self.pa.schema(list(zip(self.columns, types)))
+            self.writer = self.pq.ParquetWriter(self.path, self.schema)
+        arrays = [
+            self.pa.array([self._coerce(v, field.type) for v in values], type=field.type)
+            for field, values in zip(self.schema, columns_data)
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        if self.writer is None:
+            # 0件の場合も列だけのファイルを作る
+            self.schema = self.pa.schema([(name, self.pa.string()) for name in self.columns])
+            self.writer = self.pq.ParquetWriter(self.path, self.schema)
+        self.writer.close()
+
+
+def _create_writer(path: str, fmt: str, encoding: str):
+    if fmt == "csv":
+        return _CsvWriter(path, ",", encoding)
+    if fmt == "tsv":
+        return _CsvWriter(path, "\t", encoding)
+    if fmt == "xlsx":
+        try:
+            return _XlsxWriter(path)
+        except ImportError:
+            raise RuntimeError("Excel出力には openpyxl が必要です。(pip install openpyxl)")
+    if fmt == "parquet":
+        try:
+            return _ParquetWriter(path)
+        except ImportError:
+            raise RuntimeError("Parquet出力には pyarrow が必要です。(pip install pyarrow)")
+    raise ValueError(f"未対応のエクスポート形式です: {fmt}")
+
+
+def count_query_rows(conn: sqlite3.Connection, sql: str, params: Sequence = ()) -> Optional[int]:
+    """進捗表示用の総件数（取得できない場合はNone）"""
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM ({sql.rstrip().rstrip(';')})", params).fetchone()[0]
+    except sqlite3.Error:
+        return None
+
+
+def column_storage_classes(conn: sqlite3.Connection, sql: str, params: Sequence, column_count: int) -> List[set]:
+    """クエリ結果の列ごとの格納クラス（typeof() の値の集合）を1回の集計で求める"""
+    names = [f"c{i}" for i in range(column_count)]
+    if not names:
+        return []
+    select = ", ".join(f"group_concat(DISTINCT typeof({name}))" for name in names)
+    row = conn.execute(f"WITH q({', '.join(names)}) AS ({sql.rstrip().rstrip(';')}) SELECT {select} FROM q",
+                       params).fetchone()
+    return [set(value.split(",")) if value else set() for value in row]
+
+
+def export_query(conn: sqlite3.Connection, sql: str, params: Sequence, path: str, fmt: str,
+                 encoding: str = "utf-8-sig", chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                 cancel_event: Optional[threading.Event] = None) -> Dict:
+    """
+    クエリ結果をファイルへストリーミング出力する
+    一時ファイル(.part)に書き出し、完了後に置き換えるため、キャンセル・失敗時に中途半端なファイルは残らない
+    """
+    total = count_query_rows(conn, sql, params)
+    temp_path = f"{path}.part"
+    writer = _create_writer(temp_path, fmt, encoding)
+    written = 0
+    try:
+        cur = conn.execute(sql, params)
+        writer.write_header([desc[0] for desc in cur.description] if cur.description else [])
+        if isinstance(writer, _ParquetWriter):
+            # 列の型は結果全体から決める（最初のチャンクだけで決めると後の値が型に合わなくなる）
+            writer.set_storage_classes(column_storage_classes(conn, sql, params, len(writer.columns)))
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            writer.write_rows(rows)
+            written += len(rows)
+            if progress:
+                progress(written, total)
+        writer.close()
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            writer.close()
+        except Exception:
+            pass
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return {
+        "path": path,
+        "rows": written,
+        "coerced_values": getattr(writer, "coerced_values", 0),
+    }
@@ -0,0 +1,203 @@
+"""
+FTS5 trigram による部分一致/後方一致検索の高速化
+元テーブルを外部コンテンツとするFTS5シャドウテーブルを作成・維持する
+"""
+
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+from sqlite_search_keys import is_search_key_column
+
+FTS_SUFFIX = "__fts"
+TRIGRAM_MIN_LENGTH = 3  # trigramは3文字未満の検索語に使えない
+FTS_SEARCH_TYPES = ("部分一致", "後方一致")
+FTS5_SHADOW_SUFFIXES = ("_data", "_idx", "_docsize", "_config", "_content")  # FTS5が作成する内部テーブル
+
+
+def fts_table_name(table_name: str) -> str:
+    """元テーブルに対応するFTSテーブル名"""
+    return f"{table_name}{FTS_SUFFIX}"
+
+
+def is_fts_table(table_name: str) -> bool:
+    """FTSテーブル本体またはFTS5の内部テーブルかどうか（名前の末尾で判定する）"""
+    return table_name.endswith(FTS_SUFFIX) or any(
+        table_name.endswith(FTS_SUFFIX + suffix) for suffix in FTS5_SHADOW_SUFFIXES)
+
+
+def is_fts_available(conn: sqlite3.Connection) -> bool:
+    """FTS5 trigramトークナイザが使えるSQLiteかどうか"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.__fts_probe USING fts5(x, tokenize='trigram')")
+        conn.execute("DROP TABLE temp.__fts_probe")
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def get_text_columns(conn: sqlite3.Connection, table_name: str, schema=None) -> List[str]:
+    """TEXT系アフィニティのカラム一覧を取得（schema: SchemaCacheを渡すとPRAGMAを実行せずにキャッシュから読む）"""
+    rows = schema.table_info(table_name) if schema is not None else conn.execute(f'PRAGMA table_info("{table_name}")')
+    generated = schema.generated_columns(table_name) if schema is not None else set()
+    columns = []
+    for row in rows:
+        if row[1] in generated or is_search_key_column(row[1]):
+            continue
+        col_type = (row[2] or "").upper()
+        if col_type == "" or any(t in col_type for t in ("CHAR", "CLOB", "TEXT")):
+            columns.append(row[1])
+    return columns
+
+
+def _trigger_names(table_name: str) -> Tuple[str, str, str]:
+    fts_name = fts_table_name(table_name)
+    return f"{fts_name}_ai", f"{fts_name}_ad", f"{fts_name}_au"
+
+
+def get_fts_columns(conn: sqlite3.Connection, table_name: str, schema=None) -> List[str]:
+    """作成済みFTSテーブルの対象カラム（未作成なら空リスト。schemaはget_text_columnsと同じ）"""
+    fts_name = fts_table_name(table_name)
+    if schema is not None:
+        return schema.columns(fts_name) if schema.has_table(fts_name) else []
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (fts_name,)
+    ).fetchone()
+    if not row:
+        return []
+    return [r[1] for r in conn.execute(f'PRAGMA table_info("{fts_name}")')]
+
+
+def is_fts_stale(conn: sqlite3.Connection, table_name: str) -> bool:
+    """
+    FTSテーブルが元テーブルと同期していないかどうか
+    インポーターは元テーブルをDROP/CREATEするため、その際にトリガーが消える
+    """
+    placeholders = ", ".join("?" for _ in range(3))
+    count = conn.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type='trigger' AND tbl_name=? AND name IN ({placeholders})",
+        (table_name, *_trigger_names(table_name))
+    ).fetchone()[0]
+    return count < 3
+
+
+def drop_fts_index(conn: sqlite3.Connection, table_name: str):
+    """FTSテーブルと同期用トリガーを削除"""
+    for trigger in _trigger_names(table_name):
+        conn.execute(f'DROP TRIGGER IF EXISTS "{trigger}"')
+    conn.execute(f'DROP TABLE IF EXISTS "{fts_table_name(table_name)}"')
+    conn.commit()
+
+
+def build_fts_index(conn: sqlite3.Connection, table_name: str, columns: List[str]):
+    """
+    FTS5 trigramインデックスを（再）作成する
+    元テーブルを外部コンテンツとして参照し、トリガーでINSERT/UPDATE/DELETEに追従する
+    """
+    if not columns:
+        raise ValueError(f"テーブル '{table_name}' にFTS対象のカラムがありません。")
+
+    fts_name = fts_table_name(table_name)
+    ai, ad, au = _trigger_names(table_name)
+    col_list = ", ".join(f'"{c}"' for c in columns)
+    new_values = ", ".join(f'new."{c}"' for c in columns)
+    old_values = ", ".join(f'old."{c}"' for c in columns)
+
+    drop_fts_index(conn, table_name)
+    conn.execute(
+        f'CREATE VIRTUAL TABLE "{fts_name}" USING fts5({col_list}, '
+        f"content='{table_name.replace(chr(39), chr(39) * 2)}', content_rowid='rowid', tokenize='trigram')"
+    )
+    conn.execute(f'''CREATE TRIGGER "{ai}" AFTER INSERT ON "{table_name}" BEGIN
+        INSERT INTO "{fts_name}"(rowid, {col_list}) VALUES (new.rowid, {new_values});
+    END''')
+    conn.execute(f'''CREATE TRIGGER "{ad}" AFTER DELETE ON "{table_name}" BEGIN
+        INSERT INTO "{fts_name}"("{fts_name}", rowid, {col_list}) VALUES ('delete', old.rowid, {old_values});
+    END''')
+    conn.execute(f'''CREATE TRIGGER "{au}" AFTER UPDATE ON "{table_name}" BEGIN
+        INSERT INTO "{fts_name}"("{fts_name}", rowid, {col_list}) VALUES ('delete', old.rowid, {old_values});
+        INSERT INTO "{fts_name}"(rowid, {col_list}) VALUES (new.rowid, {new_values});
+    END''')
+    conn.execute(f'INSERT INTO "{fts_name}"("{fts_name}") VALUES (\'rebuild\')')
+    conn.commit()
+
+
+def rebuild_all_fts(conn: sqlite3.Connection) -> List[str]:
+    """
+    既存のFTSテーブルを全て再構築する
+    VACUUMで元テーブルのrowidが振り直された後などに使用
+    """
+    rebuilt = []
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ? ESCAPE '\\'",
+        ("%" + FTS_SUFFIX.replace("_", "\\_"),)
+    ).fetchall()
+    for (fts_name,) in rows:
+        table_name = fts_name[:-len(FTS_SUFFIX)]
+        columns = get_fts_columns(conn, table_name)
+        if columns:
+            build_fts_index(conn, table_name, columns)
+            rebuilt.append(table_name)
+    return rebuilt
+
+
+def resolve_fts_columns(conn: sqlite3.Connection, table_name: str, fts_config: Dict) -> List[str]:
+    """設定からテーブルのFTS対象カラムを決定する（対象外なら空リスト）"""
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')}
+    configured = fts_config.get("tables", {}).get(table_name)
+    if configured:
+        return [c for c in configured if c in existing]
+    if fts_config.get("all_text_columns", False):
+        return get_text_columns(conn, table_name)
+    return []
+
+
+def refresh_configured_fts(conn: sqlite3.Connection, tables: List[str], fts_config: Dict) -> List[str]:
+    """設定対象のうち、未作成・同期切れ・カラム変更のあるFTSインデックスを作り直す"""
+    if not fts_config.get("enabled", False):
+        return []
+    refreshed = []
+    for table_name in tables:
+        if is_fts_table(table_name):
+            continue
+        columns = resolve_fts_columns(conn, table_name, fts_config)
+        if not columns:
+            continue
+        if get_fts_columns(conn, table_name) != columns or is_fts_stale(conn, table_name):
+            build_fts_index(conn, table_name, columns)
+            refreshed.append(table_name)
+    return refreshed
+
+
+def fts_predicate(conn: sqlite3.Connection, table_name: str, column: str,
+                  value: str, search_type: str) -> Optional[Tuple[str, tuple]]:
+    """
+    FTSで高速化できる検索ならWHERE句の条件とパラメータを返す（できない場合はNone）
+    MATCHで候補行を絞り込み、元のLIKE条件で結果を確定させるため、結果はLIKE検索と同一になる
+    """
+    if search_type not in FTS_SEARCH_TYPES or len(value) < TRIGRAM_MIN_LENGTH:
+        return None
+    if column not in get_fts_columns(conn, table_name) or is_fts_stale(conn, table_name):
+        return None
+
+    fts_name = fts_table_name(table_name)
+    phrase = '"' + value.replace('"', '""') + '"'
+    like_value = f"%{value}%" if search_type == "部分一致" else f"%{value}"
+    condition = (f'rowid IN (SELECT rowid FROM "{fts_name}" WHERE "{column}" MATCH ?) '
+                 f'AND [{column}] LIKE ?')
+    return condition, (phrase, like_value)
+
+
+def build_fts_search_sql(conn: sqlite3.Connection, table_name: str, column: str,
+                         value: str, search_type: str, limit: Optional[int] = 1000) -> Optional[Tuple[str, tuple]]:
+    """
+    FTSで高速化できる検索ならSQLとパラメータを返す（できない場合はNone）
+    limitにNoneを指定するとLIMIT句を付けない（エクスポート用）
+    """
+    predicate = fts_predicate(conn, table_name, column, value, search_type)
+    if predicate is None:
+        return None
+    condition, params = predicate
+    sql = f'SELECT * FROM [{table_name}] WHERE {condition}'
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    return sql, params
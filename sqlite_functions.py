@@ -0,0 +1,152 @@
+"""
+SQL関数として登録するPython関数（接続ごとに register_functions で登録する）
+インポーターの正規化ルール（universal_csv_txt_to_sqlite.clean_dataframe_with_config）と同じ判定を
+SQLの中で行えるようにし、列の型変換などをDB内の1回のSQLで済ませる。
+SQLエディタでも使える（例: WHERE NOT 品目コード REGEXP '^[0-9]+$' / WHERE to_iso_date(所要日) IS NULL）。
+すべて引数だけで結果が決まるため deterministic=True で登録する（インデックス・生成列の式にも使える）
+"""
+
+import re
+import sqlite3
+import unicodedata
+from datetime import date
+from functools import lru_cache
+
+# インポーターが空値として扱う値
+BLANK_TOKENS = {'', '-', '--', '―', '－', '–', '—', '−', 'null', 'none', 'nan'}
+
+_NUMBER_STRIP = str.maketrans('', '', ', 　%％')
+_DATE_YMD = re.compile(r'^(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?:[ T]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?$')
+_DATE_KANJI = re.compile(r'^(\d{4})年(\d{1,2})月(\d{1,2})日$')
+_DATE_COMPACT = re.compile(r'^(\d{4})(\d{2})(\d{2})$')
+# 全角英数字・記号（！〜～）と全角スペース -> 半角
+_ZEN2HAN = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+_ZEN2HAN[0x3000] = 0x20
+REGEXP_CACHE_SIZE = 256
+
+
+def is_blank(value) -> bool:
+    """NULL・空文字・ハイフン類・'null' などの空値かどうか"""
+    return value is None or (isinstance(value, str) and value.strip().lower() in BLANK_TOKENS)
+
+
+def clean_number(value):
+    """カンマ・空白・%を除いて数値にする（整数なら整数、それ以外は実数。変換できなければNULL）"""
+    if isinstance(value, (int, float)) or value is None:
+        return value
+    if is_blank(value):
+        return None
+    text = str(value).translate(_NUMBER_STRIP)
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        number = float(text)
+    except ValueError:
+        return None
+    return None if number != number else number  # NaNはNULL
+
+
+def clean_real(value):
+    """clean_number の結果を実数にする"""
+    number = clean_number(value)
+    return float(number) if number is not None else None
+
+
+def clean_integer(value):
+    """
+    clean_number の結果が整数値なら整数にする（'1,200' や '3.0' は変換でき、'3.5' はNULL）
+    インポーターと違い、負の数の符号は保持する
+    """
+    number = clean_number(value)
+    if isinstance(number, float):
+        if not number.is_integer():
+            return None
+        return int(number)
+    return number
+
+
+def to_iso_date(value):
+    """
+    日付を 'YYYY-MM-DD' にする（YYYYMMDD・YYYY/MM/DD・YYYY-M-D・時刻付き・YYYY年M月D日に対応。
+    存在しない日付や変換できない値はNULL）
+    """
+    if is_blank(value):
+        return None
+    text = str(value).strip()
+    if isinstance(value, float) and value.is_integer():
+        text = str(int(value))  # 20240131.0 のように実数で格納された日付
+    match = _DATE_COMPACT.match(text) or _DATE_YMD.match(text) or _DATE_KANJI.match(text)
+    if not match:
+        return None
+    try:
+        return date(*(int(part) for part in match.groups())).isoformat()
+    except ValueError:
+        return None
+
+
+def clean_text(value):
+    """文字列にする（空値はNULL。実数で格納された整数値は '12.0' ではなく '12' にする）"""
+    if is_blank(value):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+@lru_cache(maxsize=REGEXP_CACHE_SIZE)
+def _compile_pattern(pattern: str):
+    return re.compile(pattern)
+
+
+def regexp(pattern, value):
+    """
+    X REGEXP Y 演算子の実体（SQLiteは regexp(Y, X) の順で呼ぶ）。Pythonの正規表現で値の一部に一致すれば1
+    行ごとに呼ばれるため、コンパイル済みのパターンを再利用する。どちらかがNULLならNULL
+    """
+    if pattern is None or value is None:
+        return None
+    return int(_compile_pattern(pattern).search(str(value)) is not None)
+
+
+def nfkc(value):
+    """Unicode正規化 (NFKC)。全角英数字・半角カナなどの表記ゆれを揃える（文字列以外はそのまま）"""
+    if not isinstance(value, str):
+        return value
+    return unicodedata.normalize("NFKC", value)
+
+
+def zen2han(value):
+    """全角の英数字・記号・スペースを半角にする（カナはそのまま。文字列以外はそのまま）"""
+    if not isinstance(value, str):
+        return value
+    return value.translate(_ZEN2HAN)
+
+
+def search_key(value):
+    """検索用の正規化 (NFKC + 小文字化)。'ＡＢＣ'・'abc'・'ABC' や全角/半角カナを同じ値にする"""
+    if value is None:
+        return None
+    return unicodedata.normalize("NFKC", str(value)).lower()
+
+
+# SQL関数名 -> (関数, 引数の数)
+FUNCTIONS = {
+    "is_blank": (lambda value: int(is_blank(value)), 1),
+    "clean_number": (clean_number, 1),
+    "clean_real": (clean_real, 1),
+    "clean_integer": (clean_integer, 1),
+    "to_iso_date": (to_iso_date, 1),
+    "clean_text": (clean_text, 1),
+    "regexp": (regexp, 2),
+    "nfkc": (nfkc, 1),
+    "zen2han": (zen2han, 1),
+    "search_key": (search_key, 1),
+}
+
+
+def register_functions(conn: sqlite3.Connection):
+    """接続にSQL関数を登録する"""
+    for name, (func, num_args) in FUNCTIONS.items():
+        conn.create_function(name, num_args, func, deterministic=True)
@@ -0,0 +1,225 @@
+"""
+全テーブル横断の値検索（「この指図番号はどこに出てくるか」）
+テーブルごとに各列の検索条件を詳細検索と同じ規則（sqlite_search_builder.compile_search）で組み立て、
+FTS・インデックスで絞り込める列はそれを使う。テーブル単位で読み取り専用接続プールの複数の接続に振り分けて並列に検索し、
+列ごとの該当件数とサンプルを見つかった順に通知する。
+インデックス・FTSで絞り込めない列は、列ごとにテーブルを走査せず、1回の走査で全列の条件をまとめて評価する。
+全件走査になる大きなテーブルで全体が止まらないよう、テーブルごとに制限時間を設ける（超えたら打ち切って次へ）
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlite_schema_cache import SchemaCache
+from sqlite_search_builder import column_kind, compile_search, parse_number
+from sqlite_search_keys import is_search_key_column
+
+# 検索タイプ -> 詳細検索の条件種別
+SEARCH_TYPES = {"完全一致": "eq", "部分一致": "contains", "前方一致": "prefix", "後方一致": "suffix"}
+DEFAULT_TABLE_TIME_LIMIT_SEC = 2.0
+HIT_LIMIT = 1000  # 列ごとに数える該当件数の上限（超えた場合は「HIT_LIMIT件以上」）
+SAMPLE_LIMIT = 5
+PROGRESS_OPCODES = 1000  # 制限時間・キャンセルを確認する間隔（VM命令数）
+
+
+def _column_value(kind: str, op: str, value: str) -> Optional[str]:
+    """列の種類ごとの検索値（その列を検索しない場合はNone）"""
+    if kind == "text":
+        return value
+    if kind == "number":
+        # 数値列は完全一致のみ（'1,200' のような入力も数値として比較する）
+        if op != "eq":
+            return None
+        try:
+            return str(parse_number(value))
+        except ValueError:
+            return None
+    # 日付列は 'YYYY-MM-DD' の文字列で格納されるため、完全一致と前方一致（'2024-01' など）のみ
+    return value if op in ("eq", "prefix") else None
+
+
+def _method(term: Dict) -> str:
+    if not term["indexed"]:
+        return "全件走査"
+    return "FTS" if " MATCH " in term["sql"] else "インデックス"
+
+
+def plan_global_search(conn: sqlite3.Connection, schema: SchemaCache, tables: List[str],
+                       value: str, search_type: str) -> List[Dict]:
+    """
+    テーブルごとの検索計画 ({table, terms: [{column, sql, params, indexed, method}]}) を作る（メインスレッドで呼ぶ）
+    インデックス・FTSだけで検索できるテーブルを先に並べ、短時間で終わる結果から表示されるようにする
+    """
+    op = SEARCH_TYPES[search_type]
+    value = value.strip()
+    if not value:
+        raise ValueError("検索値を入力してください。")
+    plans = []
+    for table in tables:
+        conditions = []
+        # 生成列（日付の正規化キー）・検索用の正規化列は元の列と同じ行で一致するため検索しない
+        generated = schema.generated_columns(table)
+        for column, declared_type in schema.declared_types(table).items():
+            if column in generated or is_search_key_column(column):
+                continue
+            column_value = _column_value(column_kind(declared_type), op, value)
+            if column_value is not None:
+                conditions.append({"column": column, "op": op, "value": column_value})
+        if not conditions:
+            continue
+        compiled = compile_search(conn, schema, table, conditions, "OR")
+        terms = [{"column": term["column"], "sql": term["sql"], "params": tuple(term["params"]),
+                  "indexed": term["indexed"], "method": _method(term)} for term in compiled["terms"]]
+        plans.append({"table": table, "terms": terms})
+    plans.sort(key=lambda plan: not all(term["indexed"] for term in plan["terms"]))
+    return plans
+
+
+def _scan_columns(conn: sqlite3.Connection, table: str, terms: List[Dict], report_hit: Callable):
+    """
+    インデックスで絞り込めない列をまとめて1回の走査で検索する
+    各列の条件を CASE WHEN で評価して一致した列の値だけを返し、全列の該当件数が上限を超えたら打ち切る
+    （中断された場合は見つかった分を通知してから例外を送出する）
+    """
+    started = time.perf_counter()
+    select = ", ".join(f"CASE WHEN {term['sql']} THEN [{term['column']}] END" for term in terms)
+    where = " OR ".join(f"({term['sql']})" for term in terms)
+    params = tuple(p for term in terms for p in term["params"]) * 2
+    found: List[List] = [[] for _ in terms]
+    # CASEの結果がNULLになる一致はないため（条件に一致した値はNULLではない）、NULL以外を一致として数える
+    completed = False
+    try:
+        cur = conn.execute(f"SELECT {select} FROM [{table}] WHERE {where}", params)
+        while True:
+            rows = cur.fetchmany(HIT_LIMIT)
+            if not rows:
+                break
+            for row in rows:
+                for i, value in enumerate(row):
+                    if value is not None and len(found[i]) <= HIT_LIMIT:
+                        found[i].append(value)
+            if all(len(values) > HIT_LIMIT for values in found):
+                break
+        completed = True
+    finally:
+        # 時間切れ・キャンセルで中断した場合も、それまでに見つかった値は（件数が途中までであることを付けて）通知する
+        elapsed = time.perf_counter() - started
+        for term, values in zip(terms, found):
+            if values:
+                report_hit(term, values, elapsed, partial=not completed)
+
+
+def _search_table(conn: sqlite3.Connection, plan: Dict, time_limit: float, cancel_event,
+                  report: Callable) -> Dict:
+    """1テーブルの全列を検索する。列ごとの結果を見つかり次第 report('hit', ...) で通知する"""
+    table = plan["table"]
+    started = time.perf_counter()
+    deadline = started + time_limit
+
+    def handler():
+        if cancel_event is not None and cancel_event.is_set():
+            return 1
+        return 1 if time.perf_counter() > deadline else 0
+
+    hits = 0
+
+    def report_hit(term: Dict, found_values: List, elapsed_sec: float, partial: bool = False):
+        nonlocal hits
+        samples = []
+        for found in found_values:
+            if found not in samples:
+                samples.append(found)
+                if len(samples) >= SAMPLE_LIMIT:
+                    break
+        hits += 1
+        report("hit", {
+            "table": table, "column": term["column"], "count": min(len(found_values), HIT_LIMIT),
+            "more": partial or len(found_values) > HIT_LIMIT, "samples": samples, "method": term["method"],
+            "sql": term["sql"], "params": term["params"], "elapsed_sec": elapsed_sec,
+        })
+
+    status, message = "done", ""
+    conn.set_progress_handler(handler, PROGRESS_OPCODES)
+    try:
+        # インデックス・FTSで絞り込める列は列ごとに検索する（すぐ終わるため先に結果を出す）
+        for term in (t for t in plan["terms"] if t["indexed"]):
+            column_started = time.perf_counter()
+            rows = conn.execute(f"SELECT [{term['column']}] FROM [{table}] WHERE {term['sql']} LIMIT ?",
+                                term["params"] + (HIT_LIMIT + 1,)).fetchall()
+            if rows:
+                report_hit(term, [found for (found,) in rows], time.perf_counter() - column_started)
+        scan_terms = [t for t in plan["terms"] if not t["indexed"]]
+        if scan_terms:
+            _scan_columns(conn, table, scan_terms, report_hit)
+    except sqlite3.OperationalError as e:
+        if cancel_event is not None and cancel_event.is_set():
+            status = "cancelled"
+        elif "interrupt" in str(e).lower():
+            status = "timeout"
+        else:
+            status, message = "error", str(e)
+    except sqlite3.Error as e:
+        status, message = "error", str(e)
+    finally:
+        conn.set_progress_handler(None, 0)
+    result = {"table": table, "status": status, "message": message, "hit_columns": hits,
+              "elapsed_sec": time.perf_counter() - started}
+    report("table", result)
+    return result
+
+
+def run_global_search(conn: sqlite3.Connection, acquire_reader: Callable, plans: List[Dict], report: Callable,
+                      workers: int, cancel_event=None,
+                      time_limit: float = DEFAULT_TABLE_TIME_LIMIT_SEC) -> Dict:
+    """
+    検索計画を並列に実行する
+    connに加えて acquire_reader()（ConnectionManager.acquire_reader）で借りた workers-1 本の接続で
+    テーブルを1つずつ取り出して検索する。reportはワーカースレッドから呼ばれる
+    戻り値: {tables, hit_columns, timeout(テーブル名の一覧), errors([(テーブル, メッセージ)]), elapsed_sec}
+    """
+    started = time.perf_counter()
+    tasks: "queue.Queue[Dict]" = queue.Queue()
+    for plan in plans:
+        tasks.put(plan)
+    results: List[Dict] = []
+    lock = threading.Lock()
+    failures: List[BaseException] = []
+
+    def work(worker_conn):
+        while not (cancel_event is not None and cancel_event.is_set()):
+            try:
+                plan = tasks.get_nowait()
+            except queue.Empty:
+                return
+            result = _search_table(worker_conn, plan, time_limit, cancel_event, report)
+            with lock:
+                results.append(result)
+
+    def extra_worker():
+        try:
+            if tasks.empty():
+                return
+            with acquire_reader() as worker_conn:
+                work(worker_conn)
+        except Exception as e:  # 接続を借りられなくても残りは他のワーカーが処理する
+            with lock:
+                failures.append(e)
+
+    threads = [threading.Thread(target=extra_worker, daemon=True) for _ in range(max(workers - 1, 0))]
+    for thread in threads:
+        thread.start()
+    work(conn)
+    for thread in threads:
+        thread.join()
+
+    return {
+        "tables": len(results),
+        "hit_columns": sum(r["hit_columns"] for r in results),
+        "timeout": [r["table"] for r in results if r["status"] == "timeout"],
+        "errors": [(r["table"], r["message"]) for r in results if r["status"] == "error"]
+                  + [("", str(e)) for e in failures],
+        "elapsed_sec": time.perf_counter() - started,
+    }
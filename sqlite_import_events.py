@@ -0,0 +1,288 @@
+"""
+インポーターの進捗・計測イベント
+ファイルごとのフェーズ (read / clean / infer / write) の開始・終了、行数、読み込みバイト数、rows/sec、
+ピークメモリ、警告を構造化イベントとして通知する。
+- 同一プロセスからは subscribe() でコールバックを登録して受け取る
+- コマンドラインからは --events でJSON Lines（1行1イベント）の出力先を指定する
+  (stderr / stdout / fd:N / ファイルパス。ファイルは追記なので、定期実行の実績蓄積にも使える)
+- 別プロセスで準備したファイルの計測は snapshot() / resume_file() で引き継ぎ、書き込み後に finish_file() で締める
+"""
+
+import json
+import os
+import sys
+import time
+import warnings
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+PHASES = ("read", "clean", "infer", "write", "index")
+
+
+def peak_memory_bytes() -> Optional[int]:
+    """プロセスのピークメモリ使用量（取得できない環境ではNone）"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # LinuxはKB単位
+    except ImportError:
+        pass
+    if os.name == "nt":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            get_current_process = ctypes.windll.kernel32.GetCurrentProcess
+            get_current_process.restype = wintypes.HANDLE
+            get_memory_info = ctypes.windll.psapi.GetProcessMemoryInfo
+            get_memory_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+            if get_memory_info(get_current_process(), ctypes.byref(counters), counters.cb):
+                return counters.PeakWorkingSetSize
+        except (AttributeError, OSError):
+            pass
+    return None
+
+
+def _rate(rows: Optional[int], elapsed: float) -> Optional[float]:
+    if rows is None or elapsed <= 0:
+        return None
+    return round(rows / elapsed, 1)
+
+
+class FileMetrics:
+    """1ファイル分の計測（ImportEventStream.file() から使う）"""
+
+    def __init__(self, stream: "ImportEventStream", file_path: str, table_name: Optional[str]):
+        self.stream = stream
+        self.file = os.path.basename(str(file_path))
+        self.table = table_name
+        try:
+            self.bytes = os.path.getsize(file_path)
+        except OSError:
+            self.bytes = None
+        self.rows: Optional[int] = None
+        self.phases: Dict[str, float] = {}
+        self.warnings: List[str] = []
+        self.error: Optional[str] = None
+        self.path = str(file_path)
+        self.peak_mem_bytes: Optional[int] = None
+        self.started = time.perf_counter()
+        self._phase: Optional[str] = None
+        self._phase_started = 0.0
+
+    def begin(self, name: str):
+        """フェーズを開始する（実行中のフェーズがあれば終了させる）"""
+        self.end()
+        self._phase = name
+        self._phase_started = time.perf_counter()
+        self.stream.emit("phase_start", file=self.file, phase=name)
+
+    def end(self):
+        """実行中のフェーズを終了する（同じフェーズを複数回通る場合は時間を合算）"""
+        if self._phase is None:
+            return
+        name, self._phase = self._phase, None
+        elapsed = time.perf_counter() - self._phase_started
+        self.phases[name] = round(self.phases.get(name, 0.0) + elapsed, 3)
+        self.stream.emit("phase_end", file=self.file, phase=name, elapsed_sec=round(elapsed, 3),
+                         rows=self.rows, bytes=self.bytes if name == "read" else None,
+                         rows_per_sec=_rate(self.rows, elapsed), peak_mem_bytes=peak_memory_bytes())
+
+    @contextmanager
+    def phase(self, name: str):
+        """with文の範囲をフェーズとして計測する"""
+        self.begin(name)
+        try:
+            yield self
+        finally:
+            self.end()
+
+    def warning(self, message: str):
+        """警告を記録・通知する（従来どおり標準出力にも表示する）"""
+        self.warnings.append(message)
+        print(f"[WARNING] {self.file}: {message}")
+        self.stream.emit("warning", file=self.file, message=message)
+
+    def fail(self, message: str):
+        """ファイルの処理失敗を記録する（file_endのstatusがerrorになる）"""
+        self.error = message
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def snapshot(self) -> Dict:
+        """計測途中の状態（pickle可能。別プロセスで resume_file() に渡して引き継ぐ）"""
+        self.end()
+        return {"path": self.path, "table": self.table, "rows": self.rows, "phases": dict(self.phases),
+                "warnings": list(self.warnings), "error": self.error, "elapsed": self.elapsed,
+                "peak_mem_bytes": peak_memory_bytes()}
+
+
+@contextmanager
+def capture_warnings(metrics: FileMetrics):
+    """with文の範囲でpandasなどが出す警告 (warnings) を記録・通知する"""
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        try:
+            yield metrics
+        finally:
+            for w in caught:
+                metrics.warning(f"{w.category.__name__}: {w.message}")
+
+
+class ImportEventStream:
+    """イベントの発行元。購読者（コールバック）に辞書形式のイベントを渡す"""
+
+    def __init__(self):
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._batch_started: Optional[float] = None
+        self._batch_totals = {"files": 0, "succeeded": 0, "failed": 0, "rows": 0, "bytes": 0}
+
+    def subscribe(self, callback: Callable[[Dict], None]):
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict], None]):
+        self._listeners.remove(callback)
+
+    def emit(self, event: str, **fields):
+        if not self._listeners:
+            return
+        record = {"event": event, "time": datetime.now().isoformat(timespec="milliseconds"), **fields}
+        for listener in list(self._listeners):
+            listener(record)
+
+    def batch_start(self, importer: str, files: List[str]):
+        """一括処理の開始（対象ファイル数と総バイト数。ETAの算出に使う）"""
+        self._batch_started = time.perf_counter()
+        self._batch_totals = {"files": 0, "succeeded": 0, "failed": 0, "rows": 0, "bytes": 0}
+        total_bytes = 0
+        for path in files:
+            try:
+                total_bytes += os.path.getsize(path)
+            except OSError:
+                pass
+        self.emit("batch_start", importer=importer, files=len(files), bytes=total_bytes,
+                  file_names=[os.path.basename(str(p)) for p in files])
+
+    def batch_end(self):
+        elapsed = time.perf_counter() - (self._batch_started or time.perf_counter())
+        totals = self._batch_totals
+        self.emit("batch_end", elapsed_sec=round(elapsed, 3), rows_per_sec=_rate(totals["rows"], elapsed),
+                  peak_mem_bytes=peak_memory_bytes(), **totals)
+
+    def forward(self, record: Dict):
+        """他のストリーム（別プロセス）で発行されたイベントをそのまま購読者に渡す"""
+        for listener in list(self._listeners):
+            listener(record)
+
+    def start_file(self, file_path, table_name: Optional[str] = None) -> FileMetrics:
+        """1ファイル分の計測を開始する（file_start を通知）"""
+        metrics = FileMetrics(self, file_path, table_name)
+        self.emit("file_start", file=metrics.file, table=table_name, bytes=metrics.bytes)
+        return metrics
+
+    def resume_file(self, snapshot: Dict) -> FileMetrics:
+        """別プロセスで計測途中のファイルを引き継ぐ（経過時間・フェーズ・警告はそのまま続きから数える）"""
+        metrics = FileMetrics(self, snapshot["path"], snapshot["table"])
+        metrics.rows = snapshot["rows"]
+        metrics.phases = dict(snapshot["phases"])
+        metrics.warnings = list(snapshot["warnings"])
+        metrics.error = snapshot["error"]
+        metrics.peak_mem_bytes = snapshot["peak_mem_bytes"]
+        metrics.started = time.perf_counter() - snapshot["elapsed"]
+        return metrics
+
+    def finish_file(self, metrics: FileMetrics):
+        """1ファイル分の計測を終える（status=ok/error の file_end を通知し、一括処理の集計に加える）"""
+        metrics.end()
+        elapsed = metrics.elapsed
+        status = "error" if metrics.error else "ok"
+        totals = self._batch_totals
+        totals["files"] += 1
+        totals["succeeded" if status == "ok" else "failed"] += 1
+        totals["rows"] += metrics.rows or 0
+        totals["bytes"] += metrics.bytes or 0
+        peaks = [m for m in (metrics.peak_mem_bytes, peak_memory_bytes()) if m is not None]
+        self.emit("file_end", file=metrics.file, table=metrics.table, status=status, error=metrics.error,
+                  rows=metrics.rows, bytes=metrics.bytes, elapsed_sec=round(elapsed, 3),
+                  rows_per_sec=_rate(metrics.rows, elapsed), peak_mem_bytes=max(peaks) if peaks else None,
+                  phases=metrics.phases, warnings=len(metrics.warnings))
+
+    @contextmanager
+    def file(self, file_path, table_name: Optional[str] = None):
+        """
+        1ファイル分の処理を計測する
+        ブロック内の例外・fail()の呼び出しで status=error、それ以外は status=ok の file_end を通知する。
+        pandasなどが出す警告 (warnings) もイベントとして通知する
+        """
+        metrics = self.start_file(file_path, table_name)
+        try:
+            with capture_warnings(metrics):
+                yield metrics
+        except Exception as e:
+            metrics.fail(str(e))
+            raise
+        finally:
+            self.finish_file(metrics)
+
+
+class JsonLinesSink:
+    """イベントを1行1JSONで書き出す購読者"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __call__(self, record: Dict):
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+# インポーターが既定で使うイベントストリーム
+default_stream = ImportEventStream()
+
+
+def add_events_argument(parser):
+    """インポーターのコマンドライン引数に --events を追加"""
+    parser.add_argument("--events", default=None,
+                        help="進捗・計測イベント(JSON Lines)の出力先: stderr / stdout / fd:N / ファイルパス(追記)")
+
+
+def open_events_output(target: Optional[str], stream: ImportEventStream = default_stream):
+    """--events の指定に従ってJSON Linesの出力先を購読させる（戻り値は後で閉じるファイル。不要ならNone）"""
+    if not target:
+        return None
+    if target == "stderr":
+        stream.subscribe(JsonLinesSink(sys.stderr))
+        return None
+    if target == "stdout":
+        stream.subscribe(JsonLinesSink(sys.stdout))
+        return None
+    if target.startswith("fd:"):
+        output = os.fdopen(int(target[3:]), "w", encoding="utf-8")
+    else:
+        output = open(target, "a", encoding="utf-8")
+    stream.subscribe(JsonLinesSink(output))
+    return output
+
+
+def parse_event_line(line: str) -> Optional[Dict]:
+    """JSON Linesの1行をイベントとして解釈する（イベントでない行はNone）"""
+    if not line.startswith("{"):
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) and "event" in record else None
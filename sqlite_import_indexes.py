@@ -0,0 +1,81 @@
+"""
+インポート後のインデックス作成と統計情報の更新
+設定ファイルのファイルごとの index_fields / unique_fields に書いた列にインデックスを作成する。
+1件ずつ挿入しながらインデックスを更新するより、全行を書き込んだ後にまとめて作成するほうが速いため、
+インポーターはデータの書き込みが終わってからこれを呼ぶ。
+作成後に ANALYZE で sqlite_stat1 を更新し、クエリプランナーが行数・値の偏りに応じたインデックスを選べるようにする
+
+設定の書き方（列名1つ、または複合インデックスは列名のリスト）:
+    "index_fields": ["指図番号", ["品目コード", "所要日"]],
+    "unique_fields": ["伝票番号"]
+"date_keys" を指定した場合は、date_fields の正規化キー（sqlite_date_keys）も同時に作成する
+"search_key_fields" に書いた列には、検索用の正規化列（sqlite_search_keys）も同時に作成する
+"""
+
+import sqlite3
+from typing import Dict, List, Tuple
+
+from sqlite_date_keys import add_date_key_columns
+from sqlite_search_keys import add_search_key_columns
+
+ANALYSIS_LIMIT = 1000  # ANALYZEで各インデックスから読む行数の上限（大きなテーブルでも短時間で終わる近似統計）
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def configured_indexes(file_config: Dict) -> List[Tuple[Tuple[str, ...], bool]]:
+    """設定ファイルのインデックス指定 -> [(列名のタプル, UNIQUEか)]（重複は除く）"""
+    indexes = []
+    seen = set()
+    for key, unique in (("unique_fields", True), ("index_fields", False)):
+        for entry in file_config.get(key, []):
+            columns = (entry,) if isinstance(entry, str) else tuple(entry)
+            if columns and columns not in seen:
+                seen.add(columns)
+                indexes.append((columns, unique))
+    return indexes
+
+
+def index_name(table_name: str, columns: Tuple[str, ...], unique: bool) -> str:
+    """インポーターが作成するインデックスの名前（再インポートのたびに同じ名前で作り直す）"""
+    return f"{'uq' if unique else 'idx'}_{table_name}_{'_'.join(columns)}"
+
+
+def create_configured_indexes(conn: sqlite3.Connection, table_name: str, file_config: Dict) -> Tuple[List[str], List[str]]:
+    """
+    設定されたインデックスを作成する（呼び出し側のトランザクション内で実行し、コミットはしない）
+    戻り値: (作成したインデックス名, 警告メッセージ)
+    テーブルにない列を指定したインデックスは作成せず警告にする。
+    unique_fields の列に重複がある場合は sqlite3.IntegrityError（重複している値を含むメッセージ）
+    """
+    created, warnings = add_date_key_columns(conn, table_name, file_config)
+    search_created, search_warnings = add_search_key_columns(conn, table_name, file_config)
+    created += search_created
+    warnings += search_warnings
+    existing = {row[1].lower() for row in conn.execute(f"PRAGMA table_xinfo({_quote(table_name)})")}
+    for columns, unique in configured_indexes(file_config):
+        missing = [c for c in columns if c.lower() not in existing]
+        if missing:
+            warnings.append(f"インデックス対象の列がテーブルにありません: {', '.join(missing)}")
+            continue
+        name = index_name(table_name, columns, unique)
+        column_list = ", ".join(_quote(c) for c in columns)
+        try:
+            conn.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {_quote(name)} "
+                         f"ON {_quote(table_name)} ({column_list})")
+        except sqlite3.IntegrityError:
+            duplicate = conn.execute(
+                f"SELECT {column_list}, COUNT(*) FROM {_quote(table_name)} GROUP BY {column_list} "
+                f"HAVING COUNT(*) > 1 LIMIT 1").fetchone()
+            raise sqlite3.IntegrityError(
+                f"unique_fields {list(columns)} に重複があります: {duplicate[:-1]} が{duplicate[-1]}件") from None
+        created.append(name)
+    return created, warnings
+
+
+def analyze_table(conn: sqlite3.Connection, table_name: str):
+    """テーブルの統計情報 (sqlite_stat1) を更新する"""
+    conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+    conn.execute(f"ANALYZE {_quote(table_name)}")
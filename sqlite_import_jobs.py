@@ -0,0 +1,220 @@
+"""
+インポータースクリプトのジョブ実行
+ジョブをキューに積み、ワーカースレッドで1件ずつサブプロセスとして実行する。
+標準出力は1行ずつイベントキューに流し、GUIはroot.afterでポーリングして表示する（メインスレッドを止めない）
+進捗は、インポーターが標準エラーに出力する構造化イベント (--events stderr) から求める
+"""
+
+import os
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from sqlite_import_events import parse_event_line
+
+PENDING = "待機中"
+RUNNING = "実行中"
+DONE = "完了"
+FAILED = "失敗"
+CANCELLED = "キャンセル"
+
+OUTPUT_TAIL_LINES = 20
+
+
+class ImportJob:
+    """インポーター1回分の実行（コマンドと進捗・結果）"""
+
+    def __init__(self, title: str, command: List[str], notify: bool = True):
+        self.title = title
+        self.command = list(command) + ["--events", "stderr"]
+        self.notify = notify
+        self.status = PENDING
+        self.returncode: Optional[int] = None
+        self.files_total: Optional[int] = None
+        self.bytes_total: Optional[int] = None
+        self.files_started = 0
+        self.files_finished = 0
+        self.bytes_done = 0
+        self.rows = 0
+        self.current_file: Optional[str] = None
+        self.current_phase: Optional[str] = None
+        self.errors = 0
+        self.warnings = 0
+        self.file_results: List[Dict] = []
+        self.started_at: Optional[float] = None
+        self.cancel_requested = False
+        self.output_tail = deque(maxlen=OUTPUT_TAIL_LINES)
+
+    def add_output(self, line: str):
+        """標準出力の1行を記録する"""
+        self.output_tail.append(line)
+        if line.startswith("[FATAL]"):
+            self.errors += 1
+
+    def handle_event(self, record: Dict):
+        """インポーターの構造化イベントで進捗を更新する"""
+        event = record["event"]
+        if event == "batch_start":
+            self.files_total = record.get("files")
+            self.bytes_total = record.get("bytes")
+        elif event == "file_start":
+            self.files_started += 1
+            self.current_file = record.get("file")
+            self.current_phase = None
+        elif event == "phase_start":
+            self.current_phase = record.get("phase")
+        elif event == "warning":
+            self.warnings += 1
+        elif event == "file_end":
+            self.files_finished += 1
+            self.bytes_done += record.get("bytes") or 0
+            self.rows += record.get("rows") or 0
+            self.current_phase = None
+            if record.get("status") != "ok":
+                self.errors += 1
+            self.file_results.append(record)
+
+    @property
+    def files_done(self) -> int:
+        """完了したファイル数（実行中のファイルは含まない）"""
+        return self.files_finished
+
+    def fraction_done(self) -> Optional[float]:
+        """進捗率（読み込みバイト数基準、不明ならファイル数基準）"""
+        if self.bytes_total:
+            return min(self.bytes_done / self.bytes_total, 1.0)
+        if self.files_total:
+            return min(self.files_finished / self.files_total, 1.0)
+        return None
+
+    def eta_seconds(self) -> Optional[float]:
+        """残り時間の見積もり（完了済みファイルの処理速度から算出）"""
+        fraction = self.fraction_done()
+        if not fraction or self.started_at is None or fraction >= 1.0:
+            return None
+        elapsed = time.monotonic() - self.started_at
+        return elapsed * (1 - fraction) / fraction
+
+
+class ImportJobRunner:
+    """
+    インポートジョブのキューとワーカースレッド
+    イベントは events キューに (種別, ジョブ, 内容) で積まれる
+      'start' / 'line'(出力1行) / 'progress' / 'end' / 'idle'(キューが空になった)
+    """
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._process: Optional[subprocess.Popen] = None
+        self.current: Optional[ImportJob] = None
+
+    def submit(self, job: ImportJob):
+        """ジョブをキューに追加し、ワーカーが止まっていれば起動する"""
+        with self._lock:
+            self._pending.append(job)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def pending_jobs(self) -> List[ImportJob]:
+        with self._lock:
+            return list(self._pending)
+
+    def is_busy(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    def cancel(self):
+        """
+        実行中のジョブを中断し、待機中のジョブを取り消す
+        インポーターは1ファイル分を1トランザクションで書き込むため、中断したファイルの変更はロールバックされる
+        """
+        with self._lock:
+            while self._pending:
+                job = self._pending.popleft()
+                job.status = CANCELLED
+                self.events.put(('end', job, None))
+            process = self._process
+            if self.current is not None:
+                self.current.cancel_requested = True
+        if process is not None and process.poll() is None:
+            process.terminate()
+
+    def _next_job(self) -> Optional[ImportJob]:
+        with self._lock:
+            self.current = self._pending.popleft() if self._pending else None
+            if self.current is None:
+                self._worker = None
+            return self.current
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                self.events.put(('idle', None, None))
+                return
+            self._run_job(job)
+
+    def _run_job(self, job: ImportJob):
+        job.status = RUNNING
+        job.started_at = time.monotonic()
+        self.events.put(('start', job, None))
+
+        startupinfo = None
+        if os.name == 'nt':
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        # 出力を1行ずつ受け取るため、子プロセスのバッファリングを無効にしてUTF-8で出力させる
+        env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+
+        try:
+            process = subprocess.Popen(job.command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                       encoding='utf-8', errors='replace', bufsize=1, env=env,
+                                       startupinfo=startupinfo)
+        except OSError as e:
+            job.status = FAILED
+            job.output_tail.append(f"[ERROR] スクリプトを起動できません: {e}")
+            self.events.put(('line', job, job.output_tail[-1]))
+            self.events.put(('end', job, None))
+            return
+
+        # 標準エラー（構造化イベントとトレースバック）は別スレッドで読む
+        stderr_reader = threading.Thread(target=self._read_stderr, args=(job, process), daemon=True)
+        stderr_reader.start()
+
+        with self._lock:
+            self._process = process
+            if job.cancel_requested:
+                process.terminate()
+        for line in process.stdout:
+            line = line.rstrip("\n")
+            job.add_output(line)
+            self.events.put(('line', job, line))
+        stderr_reader.join()
+        job.returncode = process.wait()
+        with self._lock:
+            self._process = None
+
+        if job.cancel_requested:
+            job.status = CANCELLED
+        elif job.returncode != 0 or job.errors:
+            job.status = FAILED
+        else:
+            job.status = DONE
+        self.events.put(('end', job, None))
+
+    def _read_stderr(self, job: ImportJob, process: subprocess.Popen):
+        for line in process.stderr:
+            line = line.rstrip("\n")
+            record = parse_event_line(line)
+            if record is not None:
+                job.handle_event(record)
+                self.events.put(('progress', job, record))
+            else:
+                job.add_output(line)
+                self.events.put(('line', job, line))
@@ -0,0 +1,129 @@
+"""
+インポート台帳 (_import_registry)
+インポーターが取り込んだテーブルごとに、元ファイル・種別・設定のハッシュ・元ファイルの更新日時・
+行数・処理時間を記録する。GUIは設定ファイルやフォルダを走査する代わりにこの台帳を主キーで引く
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+REGISTRY_TABLE = "_import_registry"
+
+IMPORT_TYPES = {
+    ".xlsx": "excel",
+    ".xls": "excel",
+    ".csv": "csv_txt",
+    ".txt": "csv_txt",
+    ".tsv": "csv_txt",
+}
+
+
+def ensure_import_registry(conn: sqlite3.Connection):
+    """インポート台帳テーブルを作成"""
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS "{REGISTRY_TABLE}" (
+        table_name TEXT PRIMARY KEY COLLATE NOCASE,
+        source_file TEXT NOT NULL,
+        source_path TEXT NOT NULL,
+        import_type TEXT NOT NULL,
+        config_hash TEXT NOT NULL,
+        source_mtime REAL,
+        source_size INTEGER,
+        row_count INTEGER,
+        duration_sec REAL,
+        imported_at TEXT NOT NULL
+    )''')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "{REGISTRY_TABLE}_source_file" '
+                 f'ON "{REGISTRY_TABLE}"(source_file COLLATE NOCASE)')
+
+
+def import_type_of(file_name: str) -> Optional[str]:
+    """拡張子からインポーターの種別 (excel / csv_txt) を判定（対象外ならNone）"""
+    return IMPORT_TYPES.get(Path(file_name).suffix.lower())
+
+
+def config_hash(file_config: Dict) -> str:
+    """ファイル設定のハッシュ（キーの順序に依存しない）"""
+    text = json.dumps(file_config or {}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def record_import(conn: sqlite3.Connection, table_name: str, source_path, import_type: str,
+                  file_config: Dict, row_count: int, duration_sec: float):
+    """
+    インポート結果を台帳に記録する（コミットは呼び出し側のトランザクションに任せる）
+    元ファイルの更新日時・サイズはインポート時点の値を記録し、鮮度判定に使う
+    """
+    path = Path(source_path).resolve()
+    stat = path.stat()
+    ensure_import_registry(conn)
+    conn.execute(
+        f'INSERT OR REPLACE INTO "{REGISTRY_TABLE}" VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (table_name, path.name, str(path), import_type, config_hash(file_config), stat.st_mtime, stat.st_size,
+         row_count, duration_sec, datetime.now().isoformat(timespec="seconds"))
+    )
+
+
+def _registry_exists(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (REGISTRY_TABLE,)
+    ).fetchone() is not None
+
+
+def _row_to_dict(cursor: sqlite3.Cursor, row: tuple) -> Dict:
+    return {desc[0]: value for desc, value in zip(cursor.description, row)}
+
+
+def lookup_import(conn: sqlite3.Connection, table_name: str) -> Optional[Dict]:
+    """テーブル名で台帳を引く（台帳がない・未登録ならNone）"""
+    if not _registry_exists(conn):
+        return None
+    cur = conn.execute(f'SELECT * FROM "{REGISTRY_TABLE}" WHERE table_name = ?', (table_name,))
+    row = cur.fetchone()
+    return _row_to_dict(cur, row) if row else None
+
+
+def load_imports(conn: sqlite3.Connection) -> List[Dict]:
+    """台帳の全件（現存するテーブルのもののみ、テーブル名順）"""
+    if not _registry_exists(conn):
+        return []
+    cur = conn.execute(
+        f'SELECT * FROM "{REGISTRY_TABLE}" r '
+        f"WHERE EXISTS (SELECT 1 FROM sqlite_master m WHERE m.type = 'table' AND m.name = r.table_name) "
+        f'ORDER BY table_name'
+    )
+    return [_row_to_dict(cur, row) for row in cur.fetchall()]
+
+
+def import_status(entry: Dict, current_config_hash: Optional[str] = None) -> str:
+    """
+    台帳1件の鮮度
+    'missing': 元ファイルがない / 'stale': 元ファイルがインポート後に更新された /
+    'config_changed': ファイル設定が変わった / 'ok': 最新
+    """
+    try:
+        stat = os.stat(entry["source_path"])
+    except OSError:
+        return "missing"
+    if entry["source_mtime"] is None or stat.st_mtime > entry["source_mtime"] or stat.st_size != entry["source_size"]:
+        return "stale"
+    if current_config_hash is not None and current_config_hash != entry["config_hash"]:
+        return "config_changed"
+    return "ok"
+
+
+def find_unimported_files(conn: sqlite3.Connection, file_names: Iterable[str], existing_tables: Iterable[str]) -> List[str]:
+    """
+    インポートされていないファイル名の一覧
+    台帳に登録済みの元ファイル、および台帳導入前に取り込まれた（ファイル名と同名の）テーブルを除く
+    """
+    imported_files = {entry["source_file"].lower() for entry in load_imports(conn)}
+    tables = {t.lower() for t in existing_tables}
+    return sorted(
+        name for name in file_names
+        if import_type_of(name) and name.lower() not in imported_files and Path(name).stem.lower() not in tables
+    )
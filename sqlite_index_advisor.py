@@ -0,0 +1,271 @@
+"""
+検索・クエリパターンの記録とインデックス推奨
+GUIの検索とSQL実行で使われた列・条件種別を記録し（QueryLogBufferでまとめて書き込む）、効果の大きいインデックスを提案する
+"""
+
+import math
+import re
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlite_fts import get_fts_columns
+from sqlite_profiler import SLOW_QUERY_LOG_TABLE, ensure_slow_query_log
+
+QUERY_LOG_TABLE = "_query_log"
+# メモリに溜めた記録がこの件数に達したらDBへ書き込む
+QUERY_LOG_FLUSH_ROWS = 200
+
+# 検索タイプ → 条件種別
+SEARCH_TYPE_PREDICATES = {
+    "完全一致": "eq",
+    "前方一致": "prefix",
+    "後方一致": "suffix",
+    "部分一致": "contains",
+}
+
+PREDICATE_LABELS = {
+    "eq": "等価",
+    "prefix": "前方一致",
+    "range": "範囲",
+    "suffix": "後方一致",
+    "contains": "部分一致",
+}
+
+_IDENT = r'(?:\[([^\]]+)\]|"([^"]+)"|`([^`]+)`|([^\s\.\(\),=<>!\[\]"`]+))'
+_PREDICATE_PATTERNS = [
+    ("prefix", re.compile(_IDENT + r"\s+LIKE\s+'([^'%_][^']*)'", re.IGNORECASE)),
+    ("contains", re.compile(_IDENT + r"\s+LIKE\s+'%[^']*'", re.IGNORECASE)),
+    ("eq", re.compile(_IDENT + r"\s*(?:=|==|\bIN\b|\bIS\b(?!\s+NOT))", re.IGNORECASE)),
+    # '<>' は不等号（範囲条件ではない）
+    ("range", re.compile(_IDENT + r"\s*(?:<=|>=|<(?!>)|>|\bBETWEEN\b)", re.IGNORECASE)),
+]
+
+
+def ensure_query_log(conn: sqlite3.Connection):
+    """クエリログテーブルを作成"""
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS "{QUERY_LOG_TABLE}" (
+        logged_at TEXT NOT NULL,
+        source TEXT NOT NULL,
+        table_name TEXT NOT NULL,
+        column_name TEXT NOT NULL,
+        predicate TEXT NOT NULL,
+        full_scan INTEGER NOT NULL DEFAULT 1
+    )''')
+
+
+def search_observations(conn: sqlite3.Connection, table_name: str, column_name: str,
+                        search_type: str) -> List[Tuple[str, str, str, bool]]:
+    """search_dataの検索条件を観測結果 (テーブル, カラム, 条件種別, 全件走査か) にする"""
+    predicate = SEARCH_TYPE_PREDICATES.get(search_type)
+    if not predicate:
+        return []
+    full_scan = not _has_usable_index(conn, table_name, column_name, predicate)
+    return [(table_name, column_name, predicate, full_scan)]
+
+
+class QueryLogBuffer:
+    """
+    検索・クエリパターンとスロークエリの記録をメモリに溜めておき、まとめて書き込む
+    検索のたびにユーザーのDBへ書き込んでコミットすると、閲覧するだけでDBファイルが更新されてしまうため、
+    書き込むのは flush を呼んだ時（インデックス推奨・スロークエリログを開いた時、DBを閉じる時）と
+    溜まった件数が flush_rows を超えた時だけにする
+    """
+
+    def __init__(self, flush_rows: int = QUERY_LOG_FLUSH_ROWS):
+        self.flush_rows = flush_rows
+        self._predicates: List[Tuple] = []
+        self._slow_queries: List[Tuple] = []
+
+    def add_predicates(self, source: str, observations: List[Tuple[str, str, str, bool]]):
+        """(テーブル, カラム, 条件種別, 全件走査か) の観測結果を溜める"""
+        now = datetime.now().isoformat(timespec="seconds")
+        self._predicates += [(now, source, t, c, p, int(scan)) for t, c, p, scan in observations]
+
+    def add_slow_query(self, row: Tuple):
+        """スロークエリログの1行 (sqlite_profiler.slow_query_row) を溜める"""
+        self._slow_queries.append(row)
+
+    def pending(self) -> int:
+        return len(self._predicates) + len(self._slow_queries)
+
+    def is_full(self) -> bool:
+        return self.pending() >= self.flush_rows
+
+    def flush(self, conn: sqlite3.Connection) -> int:
+        """溜めた記録を1トランザクションで書き込む（失敗した場合は記録を残して例外を送出する）。戻り値: 書き込んだ件数"""
+        count = self.pending()
+        if not count:
+            return 0
+        with conn:
+            if self._predicates:
+                ensure_query_log(conn)
+                conn.executemany(f'INSERT INTO "{QUERY_LOG_TABLE}" VALUES (?, ?, ?, ?, ?, ?)', self._predicates)
+            if self._slow_queries:
+                ensure_slow_query_log(conn)
+                conn.executemany(f'INSERT INTO "{SLOW_QUERY_LOG_TABLE}" VALUES (?, ?, ?, ?, ?, ?)', self._slow_queries)
+        self.clear()
+        return count
+
+    def clear(self):
+        """溜めた記録を書き込まずに捨てる"""
+        self._predicates.clear()
+        self._slow_queries.clear()
+
+
+def observe_query(conn: sqlite3.Connection, sql: str) -> List[Tuple[str, str, str, bool]]:
+    """
+    EXPLAIN QUERY PLANでSCAN（全件走査）されるテーブルを特定し、
+    WHERE/JOIN句の中でそのテーブルの列に掛かっている条件を抽出する
+    """
+    try:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    except sqlite3.Error:
+        return []
+
+    scanned = set()
+    for row in plan:
+        detail = row[-1]
+        m = re.match(r"SCAN (?:TABLE )?(\S+)", detail)
+        if m and "USING" not in detail:
+            scanned.add(m.group(1).strip('"[]'))
+    if not scanned:
+        return []
+
+    alias_map = _table_aliases(sql)
+    observations = []
+    for predicate, pattern in _PREDICATE_PATTERNS:
+        for m in pattern.finditer(sql):
+            column = next(g for g in m.groups()[:4] if g)
+            qualifier = _qualifier_before(sql, m.start())
+            for table_name in scanned:
+                real_table = alias_map.get(table_name, table_name)
+                if qualifier and alias_map.get(qualifier, qualifier) != real_table:
+                    continue
+                if column in _table_columns(conn, real_table):
+                    obs = (real_table, column, predicate, True)
+                    if not any(o[:2] == obs[:2] for o in observations):
+                        observations.append(obs)
+    return observations
+
+
+def _qualifier_before(sql: str, pos: int) -> Optional[str]:
+    """alias.column 形式ならaliasを返す"""
+    m = re.search(_IDENT + r"\.$", sql[:pos])
+    return next(g for g in m.groups() if g) if m else None
+
+
+def _table_aliases(sql: str) -> Dict[str, str]:
+    """FROM/JOIN句の 別名 → テーブル名 対応"""
+    aliases = {}
+    pattern = re.compile(r"\b(?:FROM|JOIN)\s+" + _IDENT + r"(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?", re.IGNORECASE)
+    for m in pattern.finditer(sql):
+        table_name = next(g for g in m.groups()[:4] if g)
+        alias = m.group(5)
+        if alias and alias.upper() not in ("WHERE", "JOIN", "LEFT", "INNER", "ON", "GROUP", "ORDER", "LIMIT", "CROSS"):
+            aliases[alias] = table_name
+    return aliases
+
+
+def _table_columns(conn: sqlite3.Connection, table_name: str) -> List[str]:
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+
+
+def _index_leading_columns(conn: sqlite3.Connection, table_name: str) -> List[Tuple[str, str]]:
+    """既存インデックスの先頭列と照合順序"""
+    leading = []
+    for idx in conn.execute(f'PRAGMA index_list("{table_name}")').fetchall():
+        info = conn.execute(f'PRAGMA index_xinfo("{idx[1]}")').fetchall()
+        keys = [r for r in info if r[5]]  # key列のみ
+        if keys and keys[0][2] is not None:
+            leading.append((keys[0][2], (keys[0][4] or "BINARY").upper()))
+    return leading
+
+
+def _has_usable_index(conn: sqlite3.Connection, table_name: str, column_name: str, predicate: str) -> bool:
+    for col, collation in _index_leading_columns(conn, table_name):
+        if col != column_name:
+            continue
+        # LIKEの前方一致はNOCASE照合のインデックスでないと使われない
+        if predicate == "prefix" and collation != "NOCASE":
+            continue
+        return True
+    return False
+
+
+def recommended_index_sql(table_name: str, column_name: str, predicate: str) -> Tuple[str, str]:
+    """推奨インデックス名とCREATE INDEX文"""
+    if predicate == "prefix":
+        index_name = f"idx_{table_name}_{column_name}_nocase"
+        return index_name, f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ("{column_name}" COLLATE NOCASE)'
+    index_name = f"idx_{table_name}_{column_name}"
+    return index_name, f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ("{column_name}")'
+
+
+def _estimate_rows(conn: sqlite3.Connection, table_name: str) -> int:
+    """テーブル行数の概算（COUNT(*)の全件走査を避けてsqlite_stat1/MAX(rowid)を使う）"""
+    try:
+        row = conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl=? AND idx IS NULL", (table_name,)).fetchone()
+        if row:
+            return int(row[0].split()[0])
+    except sqlite3.Error:
+        pass
+    try:
+        return conn.execute(f'SELECT MAX(rowid) FROM "{table_name}"').fetchone()[0] or 0
+    except sqlite3.Error:
+        return 0
+
+
+def recommend_indexes(conn: sqlite3.Connection) -> List[Dict]:
+    """
+    ログを集計してインデックスを推奨する
+    推定効果 = 観測回数 × (全件走査の読取行数 - インデックス検索の読取行数の目安)
+    """
+    ensure_query_log(conn)
+    rows = conn.execute(f'''
+        SELECT table_name, column_name, predicate, COUNT(*), MAX(logged_at)
+        FROM "{QUERY_LOG_TABLE}"
+        WHERE full_scan = 1
+        GROUP BY table_name, column_name, predicate
+    ''').fetchall()
+
+    existing_tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    recommendations = []
+    for table_name, column_name, predicate, hits, last_seen in rows:
+        if table_name not in existing_tables or column_name not in _table_columns(conn, table_name):
+            continue
+        if predicate in ("eq", "prefix", "range") and _has_usable_index(conn, table_name, column_name, predicate):
+            continue
+        if predicate in ("suffix", "contains") and column_name in get_fts_columns(conn, table_name):
+            continue
+        row_count = _estimate_rows(conn, table_name)
+        if predicate in ("eq", "prefix", "range"):
+            index_name, sql = recommended_index_sql(table_name, column_name, predicate)
+            benefit = hits * max(row_count - math.log2(row_count + 1), 0)
+            note = "LIKE前方一致用 (COLLATE NOCASE)" if predicate == "prefix" else "B-treeインデックス"
+        else:
+            # 部分一致/後方一致はB-treeでは速くならないため全文検索インデックスを案内する
+            index_name, sql = "", ""
+            benefit = hits * row_count
+            note = "全文検索インデックス(FTS)を推奨"
+        recommendations.append({
+            "table": table_name,
+            "column": column_name,
+            "predicate": predicate,
+            "hits": hits,
+            "rows": row_count,
+            "benefit": int(benefit),
+            "last_seen": last_seen,
+            "index_name": index_name,
+            "sql": sql,
+            "note": note,
+        })
+    recommendations.sort(key=lambda r: r["benefit"], reverse=True)
+    return recommendations
+
+
+def clear_query_log(conn: sqlite3.Connection):
+    """クエリログを全削除"""
+    ensure_query_log(conn)
+    conn.execute(f'DELETE FROM "{QUERY_LOG_TABLE}"')
+    conn.commit()
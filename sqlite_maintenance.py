@@ -0,0 +1,145 @@
+"""
+DBのメンテナンス（GUIを止めないVACUUM）
+- 増分モード: auto_vacuum=INCREMENTAL のDBで、PRAGMA incremental_vacuum を少しずつ実行して空きページを解放する。
+  1ステップごとにコミットするため、途中でも他の接続の読み書きを待たせない
+- 再構築モード: VACUUM INTO で一時ファイルに詰め直したDBを作り、完成後に元のファイルと入れ替える。
+  作成中も元のDBは読み書きでき、入れ替えは os.replace による一瞬の操作になる
+どちらも実行前に解放できる容量の見込みを示し、進捗通知とキャンセルに対応する
+"""
+
+import os
+import sqlite3
+import time
+from typing import Callable, Dict, Optional
+
+INCREMENTAL_STEP_PAGES = 256  # incremental_vacuumの1ステップで解放するページ数
+STEP_PAUSE_SEC = 0.02  # ステップ間に他の接続へ書き込みの機会を与える
+PROGRESS_OPCODES = 100000  # VACUUM INTO中に進捗・キャンセルを確認する間隔（VM命令数）
+VACUUM_TEMP_SUFFIX = ".vacuum-tmp"
+
+
+class MaintenanceCancelled(Exception):
+    """メンテナンスがキャンセルされた"""
+
+
+def auto_vacuum_mode(conn: sqlite3.Connection) -> str:
+    return {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}.get(conn.execute("PRAGMA auto_vacuum").fetchone()[0], "?")
+
+
+def estimate_reclaim(conn: sqlite3.Connection, db_path: str, unused_bytes: Optional[int] = None) -> Dict:
+    """
+    解放できる容量の見込み
+    incremental: 空きページ分（incremental_vacuumで解放できるのはこれだけ）
+    rebuild: 空きページ + ページ内の未使用領域（DB統計の集計済みの値があれば。再構築で詰め直される分）
+    """
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    free_bytes = conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+    try:
+        file_bytes = os.path.getsize(db_path)
+    except OSError:
+        file_bytes = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+    return {
+        "file_bytes": file_bytes,
+        "incremental": free_bytes,
+        "rebuild": free_bytes + (unused_bytes or 0),
+        "unused_known": unused_bytes is not None,
+    }
+
+
+def run_incremental_vacuum(conn: sqlite3.Connection, progress: Optional[Callable] = None,
+                           cancel_event=None, step_pages: int = INCREMENTAL_STEP_PAGES) -> Dict:
+    """空きページを少しずつ解放する（auto_vacuum=INCREMENTALのDBのみ）。解放したページ数を返す"""
+    if auto_vacuum_mode(conn) != "INCREMENTAL":
+        raise ValueError("auto_vacuum=INCREMENTAL ではないDBでは増分VACUUMを実行できません。")
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    total = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    freed = 0
+    while True:
+        if cancel_event is not None and cancel_event.is_set():
+            raise MaintenanceCancelled()
+        remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if remaining == 0:
+            break
+        # sqlite3モジュールのexecuteは最初の1ステップ（1ページ分）で文を止めてしまうため、
+        # executescriptで最後まで実行する（実行前に未コミットの変更はコミットされる）
+        conn.executescript(f"PRAGMA incremental_vacuum({int(step_pages)});")
+        after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        freed = max(total - after, 0)
+        if progress:
+            progress("空きページを解放", freed, total)
+        if after >= remaining:
+            break  # 他の接続の書き込みで空きページが増え続ける場合に終わらなくなるのを防ぐ
+        time.sleep(STEP_PAUSE_SEC)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return {"freed_pages": freed, "freed_bytes": freed * page_size}
+
+
+def temp_path_for(db_path: str) -> str:
+    return db_path + VACUUM_TEMP_SUFFIX
+
+
+def vacuum_into_temp(conn: sqlite3.Connection, db_path: str, expected_bytes: int,
+                     progress: Optional[Callable] = None, cancel_event=None,
+                     auto_vacuum: Optional[str] = None) -> str:
+    """
+    詰め直したDBを一時ファイルに作成する（元のDBは作成中も読み書きできる）
+    auto_vacuumを指定すると、作成するDBのauto_vacuumをその値にする（NONE→INCREMENTALの切り替えには再構築が必要なため）
+    進捗は一時ファイルのサイズと見込みサイズ (expected_bytes) の比で通知する
+    """
+    temp_path = temp_path_for(db_path)
+    for path in (temp_path, temp_path + "-journal"):
+        if os.path.exists(path):
+            os.remove(path)
+    if auto_vacuum is not None:
+        conn.execute(f"PRAGMA auto_vacuum={auto_vacuum}")
+
+    def handler():
+        if cancel_event is not None and cancel_event.is_set():
+            return 1  # 0以外を返すとSQLiteが処理を中断する
+        if progress:
+            try:
+                written = os.path.getsize(temp_path)
+            except OSError:
+                written = 0
+            progress("再構築", min(written, expected_bytes), expected_bytes)
+        return 0
+
+    conn.set_progress_handler(handler, PROGRESS_OPCODES)
+    try:
+        conn.execute("VACUUM INTO ?", (temp_path,))
+    except sqlite3.OperationalError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        if cancel_event is not None and cancel_event.is_set():
+            raise MaintenanceCancelled()
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+    return temp_path
+
+
+def swap_in_vacuumed(db_path: str, temp_path: str):
+    """
+    再構築したDBを元のファイルと入れ替える
+    呼び出し側は、このDBへの接続をすべて閉じてから呼ぶこと（Windowsでは開いているファイルを置き換えられない）。
+    古いWAL/共有メモリファイルが新しいDBに適用されないよう、入れ替え後に削除する
+    """
+    check = sqlite3.connect(temp_path)
+    try:
+        result = check.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        check.close()
+    if result != "ok":
+        os.remove(temp_path)
+        raise sqlite3.DatabaseError(f"再構築したDBの検査に失敗しました: {result}")
+    os.replace(temp_path, db_path)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
+def discard_temp(db_path: str):
+    """中止した再構築の一時ファイルを削除する"""
+    temp_path = temp_path_for(db_path)
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
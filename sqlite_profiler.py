@@ -0,0 +1,130 @@
+"""
+SQLエディタ用のクエリプロファイラ
+EXPLAIN QUERY PLANの実行計画と、実行時間・取得行数・VMステップ数を計測し、
+遅いクエリを実行計画付きでDBに記録する
+"""
+
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+SLOW_QUERY_LOG_TABLE = "_slow_query_log"
+DEFAULT_SLOW_QUERY_MS = 1000
+PROGRESS_INTERVAL = 100  # progress handlerを呼ぶVM命令数の間隔
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str) -> List[Tuple[int, int, str]]:
+    """EXPLAIN QUERY PLANの (id, parent, detail) 一覧"""
+    return [(row[0], row[1], row[-1]) for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def is_full_scan(detail: str) -> bool:
+    """インデックスを使わないテーブル全件走査のステップかどうか"""
+    return detail.startswith("SCAN") and "USING" not in detail
+
+
+def is_index_scan(detail: str) -> bool:
+    """インデックス全体を走査するステップかどうか（全件走査よりは軽い）"""
+    return detail.startswith("SCAN") and "USING" in detail
+
+
+def format_plan(plan: List[Tuple[int, int, str]]) -> str:
+    """実行計画をインデント付きテキストにする（ログ保存用）"""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, detail in plan:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+
+def profile_query(conn: sqlite3.Connection, sql: str, max_rows: int = 1000) -> Dict:
+    """
+    クエリを実行して計測する
+    全行を読み切って件数と時間を計測し、表示用には先頭max_rows行だけを保持する
+    """
+    plan = explain_query_plan(conn, sql)
+
+    steps = [0]
+
+    def on_progress():
+        steps[0] += 1
+        return 0
+
+    conn.set_progress_handler(on_progress, PROGRESS_INTERVAL)
+    try:
+        start = time.perf_counter()
+        cur = conn.execute(sql)
+        columns = [desc[0] for desc in cur.description] if cur.description else []
+        rows = []
+        row_count = 0
+        while True:
+            chunk = cur.fetchmany(10000)
+            if not chunk:
+                break
+            if len(rows) < max_rows:
+                rows.extend(chunk[:max_rows - len(rows)])
+            row_count += len(chunk)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    finally:
+        conn.set_progress_handler(None, 0)
+
+    return {
+        "sql": sql,
+        "plan": plan,
+        "columns": columns,
+        "rows": rows,
+        "row_count": row_count,
+        "elapsed_ms": elapsed_ms,
+        "vm_steps": steps[0] * PROGRESS_INTERVAL,
+        "full_scans": [d for _, _, d in plan if is_full_scan(d)],
+    }
+
+
+def ensure_slow_query_log(conn: sqlite3.Connection):
+    """スロークエリログテーブルを作成"""
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS "{SLOW_QUERY_LOG_TABLE}" (
+        logged_at TEXT NOT NULL,
+        elapsed_ms REAL NOT NULL,
+        row_count INTEGER,
+        vm_steps INTEGER,
+        sql TEXT NOT NULL,
+        plan TEXT
+    )''')
+
+
+def slow_query_row(conn: sqlite3.Connection, sql: str, elapsed_ms: float, row_count: Optional[int] = None,
+                   vm_steps: Optional[int] = None, plan: Optional[List[Tuple[int, int, str]]] = None) -> Tuple:
+    """スロークエリログの1行（実行計画を文字列にしたもの）を作る"""
+    if plan is None:
+        try:
+            plan = explain_query_plan(conn, sql)
+        except sqlite3.Error:
+            plan = []
+    return (datetime.now().isoformat(timespec="seconds"), elapsed_ms, row_count, vm_steps, sql, format_plan(plan))
+
+
+def log_slow_query(conn: sqlite3.Connection, sql: str, elapsed_ms: float, row_count: Optional[int] = None,
+                   vm_steps: Optional[int] = None, plan: Optional[List[Tuple[int, int, str]]] = None):
+    """遅いクエリを実行計画付きで記録"""
+    row = slow_query_row(conn, sql, elapsed_ms, row_count, vm_steps, plan)
+    ensure_slow_query_log(conn)
+    conn.execute(f'INSERT INTO "{SLOW_QUERY_LOG_TABLE}" VALUES (?, ?, ?, ?, ?, ?)', row)
+    conn.commit()
+
+
+def load_slow_queries(conn: sqlite3.Connection, limit: int = 200) -> List[Tuple]:
+    """スロークエリログを新しい順に取得"""
+    ensure_slow_query_log(conn)
+    return conn.execute(
+        f'SELECT logged_at, elapsed_ms, row_count, vm_steps, sql, plan FROM "{SLOW_QUERY_LOG_TABLE}" '
+        f'ORDER BY logged_at DESC LIMIT ?', (limit,)
+    ).fetchall()
+
+
+def clear_slow_queries(conn: sqlite3.Connection):
+    """スロークエリログを全削除"""
+    ensure_slow_query_log(conn)
+    conn.execute(f'DELETE FROM "{SLOW_QUERY_LOG_TABLE}"')
+    conn.commit()
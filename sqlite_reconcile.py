@@ -0,0 +1,594 @@
+"""
+元ファイルとDBテーブルの突合
+- 格納漏れチェック: 元ファイルをインポーターと同じファイル設定でチャンク読み込みして一時テーブルに格納し、
+  DB側のキーは主キー付きの一時テーブルに集約して、インデックスを使ったアンチジョインで差分を求める
+- 行ハッシュ突合: 元ファイル側にインポーターと同じクリーニングを適用したうえで、両側の全列を正規化した
+  行ハッシュをパーティションごとに件数・合計で比較し、不一致のパーティションだけ行単位まで掘り下げる
+  （設定どおりのクリーニング以外で値が変わった行を検出する）
+（元ファイル・DBテーブルともにメモリに全件を載せないため、1000万行規模でも一定のメモリで動く）
+"""
+
+import csv
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from sqlite_elt_import import PANDAS_NA_VALUES, clean_value, column_plan, load_mode
+from sqlite_search_keys import is_search_key_column
+from universal_csv_txt_to_sqlite import build_read_csv_params, load_csv_txt_config
+from universal_csv_txt_to_sqlite import clean_dataframe_with_config as clean_csv_txt_dataframe
+from universal_excel_to_sqlite import clean_dataframe_with_config as clean_excel_dataframe
+from universal_excel_to_sqlite import load_excel_config
+
+DEFAULT_CHUNK_SIZE = 50000
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+SOURCE_FILETYPES = [
+    ("CSV/TXT/Excel files", "*.csv *.txt *.tsv *.xlsx *.xls"),
+    ("All files", "*.*"),
+]
+
+SRC_TABLE = "temp._reconcile_src"
+DB_KEYS_TABLE = "temp._reconcile_db_keys"
+SRC_HASH_TABLE = "temp._reconcile_src_hash"
+DB_HASH_TABLE = "temp._reconcile_db_hash"
+PARTS_TABLE = "temp._reconcile_parts"
+SURPLUS_TABLE = "temp._reconcile_surplus"
+SRC_SURPLUS_TABLE = "temp._reconcile_src_surplus"
+DB_SURPLUS_TABLE = "temp._reconcile_db_surplus"
+
+HASH_PARTITIONS = 1024
+SOURCE_ONLY = "元ファイルのみ"
+DB_ONLY = "DBのみ"
+
+
+class ReconcileCancelled(Exception):
+    """突合処理がキャンセルされた"""
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def source_file_config(source_file: str) -> Dict:
+    """インポーターの設定ファイルから元ファイルの設定を取得"""
+    file_name = Path(source_file).name
+    if Path(source_file).suffix.lower() in EXCEL_EXTENSIONS:
+        return load_excel_config().get('files', {}).get(file_name, {})
+    return load_csv_txt_config().get('files', {}).get(file_name, {})
+
+
+def _csv_encodings(read_csv_params: Dict) -> List[str]:
+    """インポーターと同様、指定エンコーディングで失敗したらcp932で再試行する"""
+    encodings = [read_csv_params['encoding']]
+    if read_csv_params['encoding'].lower() != 'cp932':
+        encodings.append('cp932')
+    return encodings
+
+
+def _source_encodings(source_file: str) -> List[Optional[str]]:
+    """読み込みを試すエンコーディングの順（Excelはエンコーディング指定なし）"""
+    if Path(source_file).suffix.lower() in EXCEL_EXTENSIONS:
+        return [None]
+    return _csv_encodings(build_read_csv_params(source_file, source_file_config(source_file)))
+
+
+def read_source_header(source_file: str) -> List[str]:
+    """元ファイルの列名一覧（インポーターのファイル設定を使用）"""
+    file_config = source_file_config(source_file)
+    if Path(source_file).suffix.lower() in EXCEL_EXTENSIONS:
+        df = pd.read_excel(source_file, header=file_config.get('header_row', 0), nrows=0)
+        return [str(c) for c in df.columns]
+
+    params = build_read_csv_params(source_file, file_config)
+    params.pop('low_memory', None)
+    encodings = _csv_encodings(params)
+    for i, encoding in enumerate(encodings):
+        try:
+            df = pd.read_csv(source_file, **{**params, 'encoding': encoding}, nrows=0)
+            return [str(c) for c in df.columns]
+        except UnicodeDecodeError:
+            if i == len(encodings) - 1:
+                raise
+
+
+def iter_source_chunks(source_file: str, encoding: Optional[str] = None,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE, usecols: Optional[Sequence[str]] = None
+                       ) -> Iterator[pd.DataFrame]:
+    """
+    元ファイルを全列文字列としてチャンク単位で読み込む
+    Excelはpandasにチャンク読み込みがないため一括で読み、チャンクに分けて返す
+    """
+    file_config = source_file_config(source_file)
+    if Path(source_file).suffix.lower() in EXCEL_EXTENSIONS:
+        header_row = file_config.get('header_row', 0)
+        df = pd.read_excel(source_file, header=header_row, dtype=str, keep_default_na=False)
+        data_start_row = file_config.get('data_start_row', header_row + 1)
+        if data_start_row > header_row + 1:
+            df = df.iloc[data_start_row - header_row - 1:]
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+        return
+
+    params = build_read_csv_params(source_file, file_config)
+    if encoding:
+        params['encoding'] = encoding
+    params.pop('low_memory', None)
+    if usecols is not None:
+        params['usecols'] = list(usecols)
+    yield from pd.read_csv(source_file, **params, dtype=str, keep_default_na=False, chunksize=chunk_size)
+
+
+def source_numeric_dtypes(source_file: str, encoding: Optional[str], columns: Sequence[str],
+                          chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, str]:
+    """
+    インポーター（pandasの経路）が pd.read_csv で数値として読む列 -> 'int' / 'float'
+    全行が数値なら数値の列になり、欠損がなく全て整数なら int64、それ以外は float64 になる
+    （'0012' は 12 になり、comma_cleanup_fields などのクリーニングはその値に対して行われる）。
+    Excel・ELTモードの元ファイルは文字列のまま比べるため空
+    """
+    if Path(source_file).suffix.lower() in EXCEL_EXTENSIONS:
+        return {}
+    if load_mode(load_csv_txt_config(), source_file_config(source_file)) == "elt":
+        return {}
+    numeric = {c: True for c in columns}
+    integer = {c: True for c in columns}
+    for chunk in iter_source_chunks(source_file, encoding, chunk_size, usecols=columns):
+        for col in columns:
+            if not numeric[col]:
+                continue
+            values = chunk[col]
+            missing = values.isin(PANDAS_NA_VALUES)
+            present = values[~missing]
+            if pd.to_numeric(present, errors='coerce').isna().any():
+                numeric[col] = False
+                continue
+            if missing.any() or not present.str.strip().str.fullmatch(r"[+-]?\d+").all():
+                integer[col] = False
+    return {c: ('int' if integer[c] else 'float') for c in columns if numeric[c]}
+
+
+def clean_source_chunk(chunk: pd.DataFrame, source_file: str,
+                       numeric_dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    全列文字列で読んだ元ファイルのチャンクに、インポーターと同じ欠損値の扱いとファイル設定のクリーニング
+    （comma_cleanup_fields のカンマ・'.0' 除去、integer_fields・date_fields・real_to_text_fields の変換）を適用する。
+    突合ではDBに格納された値と比べるため、クリーニングで値が変わっただけの行を差分にしない
+    numeric_dtypes: source_numeric_dtypes の結果（pandasが数値として読む列を同じ型にしてからクリーニングする）
+    """
+    file_config = source_file_config(source_file)
+    columns = list(chunk.columns)
+    if Path(source_file).suffix.lower() in EXCEL_EXTENSIONS:
+        cleaned = clean_excel_dataframe(chunk.copy(), file_config, load_excel_config().get('data_cleanup', {}))
+        return cleaned.reindex(columns=columns, fill_value='')
+
+    # pandas.read_csv の既定と同じく欠損値の文字列はNaNとして扱う（インポーターは keep_default_na のまま読む）
+    chunk = chunk.mask(chunk.isin(PANDAS_NA_VALUES))
+    for col, dtype in (numeric_dtypes or {}).items():
+        if col in chunk.columns:
+            chunk[col] = pd.to_numeric(chunk[col]).astype('int64' if dtype == 'int' else 'float64')
+    if load_mode(load_csv_txt_config(), file_config) == "elt":
+        plan = column_plan(columns, file_config)
+        return pd.DataFrame({
+            col: [clean_value(None if pd.isna(v) else v, plan[col][1]) for v in chunk[col]] for col in columns
+        }, index=chunk.index, columns=columns).astype(object)
+    return clean_csv_txt_dataframe(chunk, file_config)
+
+
+def _key_text(value) -> str:
+    """クリーニング後のキー値をDB側キーの正規化 (db_key_sql) と同じ表記の文字列にする"""
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _check_cancel(cancel_event: Optional[threading.Event]):
+    if cancel_event is not None and cancel_event.is_set():
+        raise ReconcileCancelled()
+
+
+def load_source_rows(conn: sqlite3.Connection, source_file: str, source_keys: Sequence[str],
+                     chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     progress: Optional[Callable[[str, int], None]] = None,
+                     cancel_event: Optional[threading.Event] = None) -> List[str]:
+    """
+    元ファイルを一時テーブルにチャンク単位で格納する
+    キー列は __key0, __key1, ... としてインポーターと同じクリーニングを通し、前後の空白を除いて格納する
+    戻り値は元ファイルの列名一覧
+    """
+    columns = read_source_header(source_file)
+    missing_keys = [k for k in source_keys if k not in columns]
+    if missing_keys:
+        raise ValueError(f"元ファイルにキー列がありません: {', '.join(missing_keys)}")
+
+    encodings = _source_encodings(source_file)
+    key_defs = ", ".join(f"__key{i} TEXT" for i in range(len(source_keys)))
+    col_defs = ", ".join(f"{_quote(c)} TEXT" for c in columns)
+    placeholders = ", ".join("?" for _ in range(len(source_keys) + len(columns)))
+
+    for i, encoding in enumerate(encodings):
+        conn.execute(f"DROP TABLE IF EXISTS {SRC_TABLE}")
+        conn.execute(f"CREATE TABLE {SRC_TABLE} ({key_defs}, {col_defs})")
+        loaded = 0
+        try:
+            numeric_dtypes = source_numeric_dtypes(source_file, encoding, list(dict.fromkeys(source_keys)), chunk_size)
+            for chunk in iter_source_chunks(source_file, encoding, chunk_size):
+                _check_cancel(cancel_event)
+                chunk = chunk.reindex(columns=columns, fill_value='')
+                # キー列はインポーターと同じクリーニングを通した値で照合する（出力する列は元の値のまま）
+                cleaned = clean_source_chunk(chunk[list(dict.fromkeys(source_keys))].copy(), source_file, numeric_dtypes)
+                keys = [[_key_text(v) for v in cleaned[k]] for k in source_keys]
+                rows = zip(*keys, *[chunk[c].astype(str) for c in columns])
+                conn.executemany(f"INSERT INTO {SRC_TABLE} VALUES ({placeholders})", rows)
+                loaded += len(chunk)
+                if progress:
+                    progress("元ファイル読込", loaded)
+            return columns
+        except UnicodeDecodeError:
+            if i == len(encodings) - 1:
+                raise
+            print(f"[WARNING] {Path(source_file).name}: {encoding}での読み込みに失敗。{encodings[i + 1]}で再試行します。")
+    return columns
+
+
+def db_key_sql(column: str) -> str:
+    """
+    DB側キーの正規化式
+    インポーターがREALで格納した整数値(123.0)は元ファイルの表記(123)に合わせる
+    """
+    c = _quote(column)
+    return (f"COALESCE(CASE WHEN typeof({c}) = 'real' AND {c} = CAST({c} AS INTEGER) "
+            f"THEN CAST(CAST({c} AS INTEGER) AS TEXT) ELSE trim(CAST({c} AS TEXT)) END, '')")
+
+
+def load_db_keys(conn: sqlite3.Connection, table_name: str, db_keys: Sequence[str]):
+    """DB側のキーを主キー付き一時テーブルに集約する（テーブルを1回走査するだけ）"""
+    key_defs = ", ".join(f"k{i} TEXT NOT NULL" for i in range(len(db_keys)))
+    pk = ", ".join(f"k{i}" for i in range(len(db_keys)))
+    conn.execute(f"DROP TABLE IF EXISTS {DB_KEYS_TABLE}")
+    conn.execute(f"CREATE TABLE {DB_KEYS_TABLE} ({key_defs}, PRIMARY KEY ({pk})) WITHOUT ROWID")
+    conn.execute(f"INSERT OR IGNORE INTO {DB_KEYS_TABLE} "
+                 f"SELECT {', '.join(db_key_sql(k) for k in db_keys)} FROM {_quote(table_name)}")
+
+
+def find_missing_rows(conn: sqlite3.Connection, columns: Sequence[str], key_count: int) -> sqlite3.Cursor:
+    """元ファイルにあってDBにない行（元ファイルの行順）を返すカーソル"""
+    join = " AND ".join(f"d.k{i} = COALESCE(s.__key{i}, '')" for i in range(key_count))
+    return conn.execute(
+        f"SELECT {', '.join('s.' + _quote(c) for c in columns)} FROM {SRC_TABLE} s "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {DB_KEYS_TABLE} d WHERE {join}) ORDER BY s.rowid"
+    )
+
+
+def run_missing_data_check(conn: sqlite3.Connection, source_file: str, table_name: str,
+                           key_pairs: Sequence[Tuple[str, str]], output_path: str,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           progress: Optional[Callable[[str, int], None]] = None,
+                           cancel_event: Optional[threading.Event] = None) -> Dict:
+    """
+    格納漏れチェック本体（ワーカースレッドから専用の接続で呼び出す）
+    key_pairsは (元ファイルのキー列, DBのキー列) の組で、複合キーに対応する
+    格納漏れが0件の場合は出力ファイルを作成しない
+    """
+    source_keys = [src for src, _ in key_pairs]
+    db_keys = [db for _, db in key_pairs]
+
+    columns = load_source_rows(conn, source_file, source_keys, chunk_size, progress, cancel_event)
+    source_rows = conn.execute(f"SELECT COUNT(*) FROM {SRC_TABLE}").fetchone()[0]
+    _check_cancel(cancel_event)
+
+    if progress:
+        progress("DBキー集約", source_rows)
+    load_db_keys(conn, table_name, db_keys)
+    _check_cancel(cancel_event)
+
+    temp_path = f"{output_path}.part"
+    missing = 0
+    try:
+        with open(temp_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            cur = find_missing_rows(conn, columns, len(key_pairs))
+            while True:
+                _check_cancel(cancel_event)
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                missing += len(rows)
+                if progress:
+                    progress("差分出力", missing)
+        if missing:
+            os.replace(temp_path, output_path)
+        else:
+            os.remove(temp_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        conn.execute(f"DROP TABLE IF EXISTS {SRC_TABLE}")
+        conn.execute(f"DROP TABLE IF EXISTS {DB_KEYS_TABLE}")
+
+    return {"source_rows": source_rows, "missing": missing, "path": output_path if missing else None}
+
+
+# ---------------------------------------------------------------------------
+# 行ハッシュ突合
+# ---------------------------------------------------------------------------
+
+_DATE_RE = re.compile(r"^(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?$")
+_COMPACT_DATE_RE = re.compile(r"^(\d{4})(\d{2})(\d{2})$")
+
+
+def column_kind(declared_type: str) -> str:
+    """DBの宣言型から比較方法 (number/date/text) を決める"""
+    declared = (declared_type or "").upper()
+    if "INT" in declared or "REAL" in declared or "FLOA" in declared or "DOUB" in declared or "NUM" in declared:
+        return "number"
+    if "DATE" in declared or "TIME" in declared:
+        return "date"
+    return "text"
+
+
+def normalize_value(value, kind: str) -> str:
+    """
+    突合用に値を正規化する
+    格納形式の違い（123 と 123.0、2024/1/5 と 2024-01-05）は同一とみなし、
+    値そのものの変化（桁落ち・時刻の切り捨てなど）は差分として残す。欠損値 (NaN) はNULLと同じ
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    if isinstance(value, bytes):
+        return value.hex()
+    text = repr(float(value)) if isinstance(value, float) else str(value)
+    text = text.strip()
+    if text == "":
+        return ""
+    if kind == "number":
+        try:
+            number = Decimal(text.replace(",", ""))
+            if number.is_finite():
+                return format(number.normalize(), "f")
+        except InvalidOperation:
+            pass
+    elif kind == "date":
+        match = _DATE_RE.match(text) or _COMPACT_DATE_RE.match(text)
+        if match:
+            y, m, d, hh, mm, ss = match.groups() + (None,) * (6 - len(match.groups()))
+            date = f"{y}-{int(m):02d}-{int(d):02d}"
+            if hh is not None and (int(hh), int(mm), int(ss or 0)) != (0, 0, 0):
+                date += f" {int(hh):02d}:{mm}:{int(ss or 0):02d}"
+            return date
+    return text
+
+
+def row_hash(values: Sequence) -> int:
+    """正規化済みの値の並びから64bitの行ハッシュ（SQLiteのINTEGERに収まる符号付き整数）"""
+    digest = hashlib.blake2b("\x1f".join(values).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class _PartitionStats:
+    """パーティションごとの件数とハッシュ合計（行順に依存しない多重集合の要約）"""
+
+    def __init__(self, partitions: int):
+        self.partitions = partitions
+        self.counts = [0] * partitions
+        self.sums = [0] * partitions
+
+    def add(self, h: int) -> int:
+        part = h % self.partitions
+        self.counts[part] += 1
+        self.sums[part] = (self.sums[part] + h) & 0xFFFFFFFFFFFFFFFF
+        return part
+
+    def mismatched(self, other: "_PartitionStats") -> List[int]:
+        return [p for p in range(self.partitions)
+                if self.counts[p] != other.counts[p] or self.sums[p] != other.sums[p]]
+
+
+def _create_hash_table(conn: sqlite3.Connection, table: str):
+    conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.execute(f"CREATE TABLE {table} (part INTEGER NOT NULL, h INTEGER NOT NULL, rowno INTEGER NOT NULL)")
+
+
+def _hash_source(conn: sqlite3.Connection, source_file: str, columns: Sequence[str], kinds: Sequence[str],
+                 partitions: int, chunk_size: int, progress, cancel_event) -> Tuple[_PartitionStats, Optional[str]]:
+    """
+    元ファイルを1回だけ順に読み、行ハッシュとパーティション集計を作る
+    戻り値は集計と、読み込みに成功したエンコーディング
+    """
+    encodings = _source_encodings(source_file)
+    for i, encoding in enumerate(encodings):
+        _create_hash_table(conn, SRC_HASH_TABLE)
+        stats = _PartitionStats(partitions)
+        rowno = 0
+        try:
+            numeric_dtypes = source_numeric_dtypes(source_file, encoding, columns, chunk_size)
+            for chunk in iter_source_chunks(source_file, encoding, chunk_size):
+                _check_cancel(cancel_event)
+                # DBに格納された値と同じになるよう、インポーターのクリーニングを通してからハッシュを取る
+                cleaned = clean_source_chunk(chunk[list(columns)].copy(), source_file, numeric_dtypes).astype(object)
+                records = []
+                for values in cleaned.itertuples(index=False, name=None):
+                    rowno += 1
+                    h = row_hash([normalize_value(v, k) for v, k in zip(values, kinds)])
+                    records.append((stats.add(h), h, rowno))
+                conn.executemany(f"INSERT INTO {SRC_HASH_TABLE} VALUES (?, ?, ?)", records)
+                if progress:
+                    progress("元ファイルのハッシュ計算", rowno)
+            return stats, encoding
+        except UnicodeDecodeError:
+            if i == len(encodings) - 1:
+                raise
+            print(f"[WARNING] {Path(source_file).name}: {encoding}での読み込みに失敗。{encodings[i + 1]}で再試行します。")
+    return stats, encoding
+
+
+def _hash_table(conn: sqlite3.Connection, table_name: str, columns: Sequence[str], kinds: Sequence[str],
+                partitions: int, chunk_size: int, progress, cancel_event) -> _PartitionStats:
+    """DBテーブルを1回だけ順に読み、行ハッシュとパーティション集計を作る"""
+    _create_hash_table(conn, DB_HASH_TABLE)
+    stats = _PartitionStats(partitions)
+    read_cur = conn.cursor()
+    read_cur.execute(f"SELECT rowid, {', '.join(_quote(c) for c in columns)} FROM {_quote(table_name)}")
+    count = 0
+    while True:
+        _check_cancel(cancel_event)
+        rows = read_cur.fetchmany(chunk_size)
+        if not rows:
+            break
+        records = []
+        for rowid, *values in rows:
+            h = row_hash([normalize_value(v, k) for v, k in zip(values, kinds)])
+            records.append((stats.add(h), h, rowid))
+        conn.executemany(f"INSERT INTO {DB_HASH_TABLE} VALUES (?, ?, ?)", records)
+        count += len(rows)
+        if progress:
+            progress("DBテーブルのハッシュ計算", count)
+    return stats
+
+
+def _surplus_rows(conn: sqlite3.Connection, parts: Sequence[int]) -> Tuple[int, int]:
+    """
+    不一致パーティション内で、ハッシュの多重集合の差分にあたる行番号を一時テーブル
+    (SRC_SURPLUS_TABLE / DB_SURPLUS_TABLE) に求め、それぞれの件数を返す。
+    同じ内容の行が重複している場合も、多い側の余剰分（行番号の大きい方から）だけを差分とする。
+    全パーティションが不一致でもPythonに行を読み込まず、SQLの集計だけで求める
+    """
+    conn.execute(f"DROP TABLE IF EXISTS {PARTS_TABLE}")
+    conn.execute(f"CREATE TABLE {PARTS_TABLE} (part INTEGER PRIMARY KEY)")
+    conn.executemany(f"INSERT INTO {PARTS_TABLE} VALUES (?)", ((p,) for p in parts))
+    # ハッシュごとの件数の差（正: 元ファイル側が多い / 負: DB側が多い）
+    conn.execute(f"DROP TABLE IF EXISTS {SURPLUS_TABLE}")
+    conn.execute(
+        f"CREATE TABLE {SURPLUS_TABLE} AS SELECT h, SUM(side) AS diff FROM ("
+        f" SELECT h, 1 AS side FROM {SRC_HASH_TABLE} WHERE part IN (SELECT part FROM {PARTS_TABLE})"
+        f" UNION ALL"
+        f" SELECT h, -1 AS side FROM {DB_HASH_TABLE} WHERE part IN (SELECT part FROM {PARTS_TABLE})"
+        f") GROUP BY h HAVING SUM(side) <> 0")
+    conn.execute(f"CREATE INDEX {SURPLUS_TABLE}_h ON {SURPLUS_TABLE.split('.')[1]}(h)")
+
+    counts = []
+    for hash_table, surplus_table, sign in ((SRC_HASH_TABLE, SRC_SURPLUS_TABLE, 1),
+                                            (DB_HASH_TABLE, DB_SURPLUS_TABLE, -1)):
+        conn.execute(f"DROP TABLE IF EXISTS {surplus_table}")
+        conn.execute(f"CREATE TABLE {surplus_table} (rowno INTEGER PRIMARY KEY)")
+        conn.execute(
+            f"INSERT INTO {surplus_table} SELECT rowno FROM ("
+            f" SELECT x.rowno, s.diff * {sign} AS surplus,"
+            f" ROW_NUMBER() OVER (PARTITION BY x.h ORDER BY x.rowno DESC) AS n"
+            f" FROM {hash_table} x JOIN {SURPLUS_TABLE} s ON s.h = x.h"
+            f" WHERE s.diff * {sign} > 0 AND x.part IN (SELECT part FROM {PARTS_TABLE})"
+            f") WHERE n <= surplus")
+        counts.append(conn.execute(f"SELECT COUNT(*) FROM {surplus_table}").fetchone()[0])
+    return counts[0], counts[1]
+
+
+def run_row_hash_check(conn: sqlite3.Connection, source_file: str, table_name: str, output_path: str,
+                       partitions: int = HASH_PARTITIONS, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       progress: Optional[Callable[[str, int], None]] = None,
+                       cancel_event: Optional[threading.Event] = None) -> Dict:
+    """
+    行ハッシュ突合本体（ワーカースレッドから専用の接続で呼び出す）
+    両側に共通する列を正規化して行ハッシュを作り、元ファイル・DBテーブルをそれぞれ1回ずつ順に読んで
+    パーティション（ハッシュ値で分割）ごとの件数・ハッシュ合計を比較する。
+    不一致のパーティションだけ行単位で差分を求め、差分行を元の値のままCSVに出力する（差分0件なら出力しない）
+    """
+    source_columns = read_source_header(source_file)
+    table_info = conn.execute(f"PRAGMA table_info({_quote(table_name)})").fetchall()
+    declared = {row[1]: row[2] for row in table_info}
+    columns = [c for c in source_columns if c in declared]
+    if not columns:
+        raise ValueError(f"元ファイルとテーブル '{table_name}' に共通する列がありません。")
+    kinds = [column_kind(declared[c]) for c in columns]
+
+    try:
+        src_stats, encoding = _hash_source(conn, source_file, columns, kinds, partitions, chunk_size, progress, cancel_event)
+        db_stats = _hash_table(conn, table_name, columns, kinds, partitions, chunk_size, progress, cancel_event)
+        mismatched = src_stats.mismatched(db_stats)
+        _check_cancel(cancel_event)
+
+        source_only = db_only = 0
+        if mismatched:
+            if progress:
+                progress("不一致パーティションの照合", len(mismatched))
+            conn.execute("CREATE INDEX temp._reconcile_src_hash_part ON _reconcile_src_hash(part)")
+            conn.execute("CREATE INDEX temp._reconcile_db_hash_part ON _reconcile_db_hash(part)")
+            source_only, db_only = _surplus_rows(conn, mismatched)
+
+        if source_only or db_only:
+            _write_row_differences(conn, source_file, encoding, table_name, columns, output_path, chunk_size,
+                                   cancel_event)
+    finally:
+        for table in (SRC_HASH_TABLE, DB_HASH_TABLE, PARTS_TABLE, SURPLUS_TABLE, SRC_SURPLUS_TABLE, DB_SURPLUS_TABLE):
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+    return {
+        "source_rows": sum(src_stats.counts),
+        "db_rows": sum(db_stats.counts),
+        "partitions": partitions,
+        "mismatched_partitions": len(mismatched),
+        "source_only": source_only,
+        "db_only": db_only,
+        "columns": columns,
+        "source_only_columns": [c for c in source_columns if c not in declared],
+        "db_only_columns": [c for c in declared if c not in source_columns and not is_search_key_column(c)],
+        "path": output_path if source_only or db_only else None,
+    }
+
+
+def _write_row_differences(conn: sqlite3.Connection, source_file: str, encoding: Optional[str],
+                           table_name: str, columns: Sequence[str], output_path: str,
+                           chunk_size: int, cancel_event):
+    """
+    差分行をCSVに出力する（区分, 行番号 = 元ファイルのデータ行番号またはDBのrowid, 共通列の値）
+    差分の行番号は _surplus_rows の一時テーブルから行番号順に少しずつ読む。
+    元ファイル側の行は、差分がある場合に限り元ファイルをもう一度順に読み、行番号順の差分と突き合わせて取り出す
+    """
+    temp_path = f"{output_path}.part"
+    try:
+        with open(temp_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(["区分", "行番号", *columns])
+
+            wanted_cur = conn.cursor()
+            wanted_cur.execute(f"SELECT rowno FROM {SRC_SURPLUS_TABLE} ORDER BY rowno")
+            wanted = wanted_cur.fetchone()
+            rowno = 0
+            if wanted is not None:
+                for chunk in iter_source_chunks(source_file, encoding, chunk_size):
+                    _check_cancel(cancel_event)
+                    for values in chunk[list(columns)].itertuples(index=False, name=None):
+                        rowno += 1
+                        if wanted is not None and rowno == wanted[0]:
+                            writer.writerow([SOURCE_ONLY, rowno, *values])
+                            wanted = wanted_cur.fetchone()
+                    if wanted is None:
+                        break
+
+            db_cur = conn.cursor()
+            db_cur.execute(f"SELECT t.rowid, {', '.join('t.' + _quote(c) for c in columns)} "
+                           f"FROM {DB_SURPLUS_TABLE} d JOIN {_quote(table_name)} t ON t.rowid = d.rowno "
+                           f"ORDER BY d.rowno")
+            while True:
+                _check_cancel(cancel_event)
+                rows = db_cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for rowid, *values in rows:
+                    writer.writerow([DB_ONLY, rowid, *values])
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,255 @@
+"""
+データ表示の並べ替え・絞り込みとページ読み込み
+表示中データの元クエリに ORDER BY / WHERE を付けてDB側で並べ替え・絞り込みを行う（表示中の1000件だけを
+並べ替えるのではなく、全件に対して正しい結果になる）。
+- 元がテーブル（全件表示・検索・定型クエリのキャッシュ）の場合は、(並べ替え列, rowid) をキーにした
+  キーセットページングで次のページを読む。OFFSETと違い、何ページ目でも読み飛ばしが発生しない
+- SQLエディタの任意のクエリはサブクエリとして包んで並べ替え、次のページはOFFSETで読む
+"""
+
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+from sqlite_schema_cache import SchemaCache
+from sqlite_search_builder import compile_search, indexed_columns
+
+PAGE_SIZE = 1000
+SORT_INDEX_MIN_ROWS = 10000  # この行数以上のテーブルは、並べ替え列にインデックスがなければ作成する
+
+
+def filter_condition(column: str, text: str) -> Optional[Dict]:
+    """
+    列見出しの絞り込み入力を条件にする（空欄ならNone）
+    '=値' は完全一致、'値*' は前方一致、'(空)' は空値、それ以外は部分一致
+    """
+    text = text.strip()
+    if not text:
+        return None
+    if text == "(空)":
+        return {"column": column, "op": "empty"}
+    if text.startswith("="):
+        return {"column": column, "op": "eq", "value": text[1:]}
+    if text.endswith("*") and len(text) > 1:
+        return {"column": column, "op": "prefix", "value": text[:-1]}
+    return {"column": column, "op": "contains", "value": text}
+
+
+def describe_filter(condition: Dict) -> str:
+    """列見出しに表示する絞り込み条件"""
+    if condition["op"] == "empty":
+        return "(空)"
+    if condition["op"] == "eq":
+        return f"={condition['value']}"
+    if condition["op"] == "prefix":
+        return f"{condition['value']}*"
+    return condition["value"]
+
+
+def _simple_filter_sql(condition: Dict) -> Tuple[str, list]:
+    """サブクエリの結果に対する絞り込み（テーブル情報がないため単純なLIKE/等価比較）"""
+    column = f"[{condition['column']}]"
+    if condition["op"] == "empty":
+        return f"({column} IS NULL OR {column} = '')", []
+    if condition["op"] == "eq":
+        return f"{column} = ?", [condition["value"]]
+    if condition["op"] == "prefix":
+        return f"{column} LIKE ?", [f"{condition['value']}%"]
+    return f"{column} LIKE ?", [f"%{condition['value']}%"]
+
+
+class ResultView:
+    """
+    表示中データの元クエリ・並べ替え・絞り込みとページ読み込み位置
+    prepare() はメインスレッドでスキーマ情報を使ってSQLを組み立て、fetch_page() はワーカースレッドでも呼べる
+    """
+
+    def __init__(self, table: Optional[str] = None, where: Optional[str] = None, params: tuple = (),
+                 sql: Optional[str] = None):
+        self.table = table
+        self.base_where = where
+        self.base_sql = sql
+        self.base_params = tuple(params)
+        self.sort: Optional[Tuple[str, bool]] = None  # (カラム, 降順か)
+        self.filters: Dict[str, Dict] = {}  # カラム -> 条件
+        # prepare() で組み立てる絞り込みを含めたWHERE句とパラメータ（絞り込みがなければ元の条件のみ）
+        self._where: Optional[str] = f"({where})" if where else None
+        self._params: tuple = self.base_params if table is not None else ()
+        self.reset()
+
+    @classmethod
+    def for_table(cls, table: str, where: Optional[str] = None, params: tuple = ()) -> "ResultView":
+        return cls(table=table, where=where, params=params)
+
+    @classmethod
+    def for_sql(cls, sql: str, params: tuple = ()) -> "ResultView":
+        return cls(sql=sql, params=params)
+
+    @property
+    def keyset(self) -> bool:
+        return self.table is not None
+
+    def reset(self):
+        """先頭のページから読み直す"""
+        self.loaded = 0
+        self.exhausted = False
+        self._phase = None  # キーセットの読み込み段階 ('null': 並べ替え列がNULLの行 / 'value': それ以外)
+        self._last: Optional[Tuple] = None  # 最後に読んだ行の (並べ替え列の値, rowid)
+
+    def mark_loaded(self, count: int, exhausted: bool):
+        """呼び出し側で先頭のcount行を読み込み済みの場合（SQLエディタの実行結果など）"""
+        self.loaded = count
+        self.exhausted = exhausted
+
+    def toggle_sort(self, column: str):
+        """列見出しのクリック: 昇順 → 降順 → 並べ替えなし"""
+        if not self.sort or self.sort[0] != column:
+            self.sort = (column, False)
+        elif not self.sort[1]:
+            self.sort = (column, True)
+        else:
+            self.sort = None
+        self.reset()
+
+    def set_sort(self, column: Optional[str], descending: bool = False):
+        self.sort = (column, descending) if column else None
+        self.reset()
+
+    def set_filter(self, column: str, condition: Optional[Dict]):
+        if condition is None:
+            self.filters.pop(column, None)
+        else:
+            self.filters[column] = condition
+        self.reset()
+
+    def clear(self):
+        """並べ替え・絞り込みを解除する"""
+        self.sort = None
+        self.filters.clear()
+        self.reset()
+
+    def prepare(self, conn: sqlite3.Connection, schema: Optional[SchemaCache]):
+        """絞り込み条件をSQLにする（メインスレッドで呼ぶ。テーブルの場合はインデックス・FTSを考慮する）"""
+        where = [self.base_where] if self.base_where else []
+        if self.keyset:
+            params = list(self.base_params)
+            if self.filters:
+                compiled = compile_search(conn, schema, self.table, list(self.filters.values()))
+                where.append(compiled["where"])
+                params += compiled["params"]
+        else:
+            # 元のクエリのパラメータはサブクエリ側で渡す
+            params = []
+            for condition in self.filters.values():
+                sql, condition_params = _simple_filter_sql(condition)
+                where.append(sql)
+                params += condition_params
+        self._where = " AND ".join(f"({w})" for w in where) if where else None
+        self._params = tuple(params)
+
+    def sort_needs_index(self, conn: sqlite3.Connection, schema: SchemaCache) -> Optional[str]:
+        """並べ替え列に使えるインデックスがなく、行数が多い場合はその列名（インデックスの作成対象）"""
+        if not self.keyset or not self.sort:
+            return None
+        if self.sort[0].lower() in indexed_columns(conn, schema, self.table):
+            return None
+        rows = conn.execute(f"SELECT MAX(rowid) FROM [{self.table}]").fetchone()[0] or 0
+        return self.sort[0] if rows >= SORT_INDEX_MIN_ROWS else None
+
+    def _order_by(self) -> str:
+        if not self.sort:
+            return ""
+        column, descending = self.sort
+        direction = " DESC" if descending else ""
+        return f" ORDER BY [{column}]{direction}" + (f", rowid{direction}" if self.keyset else "")
+
+    def query(self) -> Tuple[str, tuple]:
+        """LIMITなしの全件クエリ（エクスポート・定型クエリ保存用）"""
+        if self.keyset:
+            sql = f"SELECT * FROM [{self.table}]"
+            base_params = ()
+        else:
+            sql = f"SELECT * FROM ({self.base_sql})" if (self.sort or self.filters) else self.base_sql
+            base_params = self.base_params
+        if self._where:
+            sql += f" WHERE {self._where}"
+        return sql + self._order_by(), base_params + self._params
+
+    def fetch_page(self, conn: sqlite3.Connection, limit: int = PAGE_SIZE) -> Tuple[List[str], List[tuple]]:
+        """次のページを読む（読み終えたら exhausted=True）"""
+        if self.keyset:
+            columns, rows = self._fetch_keyset(conn, limit)
+        else:
+            sql, params = self.query()
+            cur = conn.execute(f"SELECT * FROM ({sql}) LIMIT ? OFFSET ?", params + (limit + 1, self.loaded))
+            columns = [desc[0] for desc in cur.description]
+            rows = cur.fetchall()
+            self.exhausted = len(rows) <= limit
+            rows = rows[:limit]
+        self.loaded += len(rows)
+        return columns, rows
+
+    def _keyset_query(self, phase: Optional[str], limit: int) -> Tuple[str, list]:
+        conditions = [self._where] if self._where else []
+        params = list(self._params)
+        descending = bool(self.sort and self.sort[1])
+        cmp = "<" if descending else ">"
+        direction = " DESC" if descending else ""
+        if phase is None:  # 並べ替えなし: rowid順
+            if self._last is not None:
+                conditions.append(f"rowid {cmp} ?")
+                params.append(self._last[1])
+            order = f"rowid{direction}"
+        else:
+            column = f"[{self.sort[0]}]"
+            if phase == "null":
+                conditions.append(f"{column} IS NULL")
+                if self._last is not None:
+                    conditions.append(f"rowid {cmp} ?")
+                    params.append(self._last[1])
+                order = f"rowid{direction}"
+            else:
+                conditions.append(f"{column} IS NOT NULL")
+                if self._last is not None:
+                    conditions.append(f"({column}, rowid) {cmp} (?, ?)")
+                    params += list(self._last)
+                order = f"{column}{direction}, rowid{direction}"
+        where = f" WHERE {' AND '.join(f'({c})' for c in conditions)}" if conditions else ""
+        # rowidは表示しないが、キーセットの位置として末尾の列で受け取る
+        return f"SELECT *, rowid FROM [{self.table}]{where} ORDER BY {order} LIMIT ?", params + [limit + 1]
+
+    def _phases(self) -> List[Optional[str]]:
+        if not self.sort:
+            return [None]
+        # SQLiteではNULLが最小値として扱われる（昇順では先頭、降順では末尾）
+        return ["value", "null"] if self.sort[1] else ["null", "value"]
+
+    def _fetch_keyset(self, conn: sqlite3.Connection, limit: int) -> Tuple[List[str], List[tuple]]:
+        phases = self._phases()
+        if self._phase is None:
+            self._phase = phases[0]
+        columns: List[str] = []
+        rows: List[tuple] = []
+        sort_index = None
+        while len(rows) < limit:
+            sql, params = self._keyset_query(self._phase, limit - len(rows))
+            cur = conn.execute(sql, params)
+            columns = [desc[0] for desc in cur.description][:-1]
+            if self.sort and sort_index is None:
+                sort_index = [c.lower() for c in columns].index(self.sort[0].lower())
+            page = cur.fetchall()
+            more = len(page) > limit - len(rows)
+            page = page[:limit - len(rows)]
+            if page:
+                last = page[-1]
+                self._last = (last[sort_index] if sort_index is not None else None, last[-1])
+                rows.extend(row[:-1] for row in page)
+            if more:
+                return columns, rows
+            # この段階を読み終えたので次の段階へ（キーセットの位置は段階ごとに先頭から）
+            next_index = phases.index(self._phase) + 1
+            if next_index >= len(phases):
+                self.exhausted = True
+                return columns, rows
+            self._phase = phases[next_index]
+            self._last = None
+        return columns, rows
@@ -0,0 +1,230 @@
+"""
+定型クエリ（保存クエリ）のライブラリと結果のキャッシュテーブル
+毎朝実行するような重い結合・集計クエリを名前付きで保存し、必要なものは結果をキャッシュテーブルに実体化する。
+クエリが参照するテーブルは、SQLiteの authorizer とEXPLAINの OpenRead 命令から、クエリのコンパイル時に
+読み取られるテーブルとして求める（ビュー経由の参照も元テーブルまで解決される）。
+参照テーブルのいずれかがキャッシュ作成後に再インポートされたら（インポート台帳で判定）キャッシュを作り直す
+"""
+
+import json
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlite_import_registry import lookup_import
+
+SAVED_QUERIES_TABLE = "_saved_queries"
+CACHE_TABLE_PREFIX = "_qcache_"
+BUILDING_SUFFIX = "__building"
+
+# 依存テーブルに含めない（SQLiteの内部テーブル）
+_SYSTEM_TABLES = {"sqlite_master", "sqlite_schema", "sqlite_temp_master", "sqlite_temp_schema", "sqlite_sequence"}
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def ensure_saved_queries(conn: sqlite3.Connection):
+    """保存クエリテーブルを作成"""
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS "{SAVED_QUERIES_TABLE}" (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        sql TEXT NOT NULL,
+        description TEXT,
+        materialize INTEGER NOT NULL DEFAULT 0,
+        depends_on TEXT NOT NULL,
+        source_versions TEXT,
+        refreshed_at TEXT,
+        refresh_sec REAL,
+        row_count INTEGER,
+        created_at TEXT NOT NULL
+    )''')
+
+
+def cache_table_name(query_id: int) -> str:
+    return f"{CACHE_TABLE_PREFIX}{query_id}"
+
+
+def is_cache_table(table_name: str) -> bool:
+    return table_name.startswith(CACHE_TABLE_PREFIX)
+
+
+def query_dependencies(conn: sqlite3.Connection, sql: str) -> List[str]:
+    """
+    クエリが読み取るテーブルの一覧
+    EXPLAINでコンパイルして、その間に authorizer に通知される読み取り (SQLITE_READ) と、
+    プログラム中の OpenRead 命令が開くテーブル・インデックス（ルートページから sqlite_master で引く）を集める。
+    列を読まない SELECT COUNT(*) FROM t のようなクエリは SQLITE_READ が通知されないため、OpenRead でも拾う
+    """
+    tables = set()
+
+    def authorizer(action, arg1, arg2, db_name, trigger):
+        if action == sqlite3.SQLITE_READ and arg1 and db_name == "main" and arg1 not in _SYSTEM_TABLES:
+            tables.add(arg1)
+        return sqlite3.SQLITE_OK
+
+    conn.set_authorizer(authorizer)
+    try:
+        program = conn.execute(f"EXPLAIN {sql}").fetchall()
+    finally:
+        conn.set_authorizer(None)
+    # EXPLAINの列: addr, opcode, p1, p2(ルートページ), p3(データベース番号: 0がmain), p4, p5, comment
+    root_pages = {row[3] for row in program if row[1] == "OpenRead" and row[4] == 0}
+    if root_pages:
+        for (table,) in conn.execute(
+                "SELECT tbl_name FROM sqlite_master WHERE type IN ('table', 'index') AND rootpage IN "
+                f"({', '.join('?' for _ in root_pages)})", sorted(root_pages)):
+            if table not in _SYSTEM_TABLES:
+                tables.add(table)
+    return sorted(tables, key=str.lower)
+
+
+def validate_select(sql: str) -> str:
+    """保存できるのは単一のSELECT/WITH文のみ（末尾のセミコロンは除く）"""
+    statement = sql.strip().rstrip(";").strip()
+    if not statement.upper().startswith(("SELECT", "WITH")) or not sqlite3.complete_statement(statement + ";"):
+        raise ValueError("保存できるのは単一のSELECT文のみです。")
+    # 文字列リテラル中のセミコロンは区切りではないため、そこまでで文が完結するかで判定する
+    for i, char in enumerate(statement):
+        if char == ";" and sqlite3.complete_statement(statement[:i + 1]):
+            raise ValueError("保存できるのは単一のSELECT文のみです。")
+    return statement
+
+
+def save_query(conn: sqlite3.Connection, name: str, sql: str, materialize: bool = False,
+               description: str = "") -> int:
+    """クエリを保存する（同名があれば上書きし、キャッシュは作り直しが必要な状態にする）。idを返す"""
+    statement = validate_select(sql)
+    depends_on = query_dependencies(conn, statement)
+    ensure_saved_queries(conn)
+    row = conn.execute(f'SELECT id FROM "{SAVED_QUERIES_TABLE}" WHERE name = ?', (name,)).fetchone()
+    if row:
+        conn.execute(
+            f'UPDATE "{SAVED_QUERIES_TABLE}" SET sql = ?, description = ?, materialize = ?, depends_on = ?, '
+            f'source_versions = NULL, refreshed_at = NULL, refresh_sec = NULL, row_count = NULL WHERE id = ?',
+            (statement, description, int(materialize), json.dumps(depends_on, ensure_ascii=False), row[0]))
+        query_id = row[0]
+        if not materialize:
+            conn.execute(f"DROP TABLE IF EXISTS {_quote(cache_table_name(query_id))}")
+    else:
+        cur = conn.execute(
+            f'INSERT INTO "{SAVED_QUERIES_TABLE}" (name, sql, description, materialize, depends_on, created_at) '
+            f'VALUES (?, ?, ?, ?, ?, ?)',
+            (name, statement, description, int(materialize), json.dumps(depends_on, ensure_ascii=False),
+             datetime.now().isoformat(timespec="seconds")))
+        query_id = cur.lastrowid
+    conn.commit()
+    return query_id
+
+
+def delete_query(conn: sqlite3.Connection, query_id: int):
+    """保存クエリとキャッシュテーブルを削除"""
+    conn.execute(f"DROP TABLE IF EXISTS {_quote(cache_table_name(query_id))}")
+    conn.execute(f'DELETE FROM "{SAVED_QUERIES_TABLE}" WHERE id = ?', (query_id,))
+    conn.commit()
+
+
+def _table_exists(conn: sqlite3.Connection, table_name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table_name,)).fetchone() is not None
+
+
+def _row_to_dict(cursor: sqlite3.Cursor, row: tuple) -> Dict:
+    entry = {desc[0]: value for desc, value in zip(cursor.description, row)}
+    entry["depends_on"] = json.loads(entry["depends_on"])
+    entry["source_versions"] = json.loads(entry["source_versions"]) if entry["source_versions"] else None
+    return entry
+
+
+def load_queries(conn: sqlite3.Connection) -> List[Dict]:
+    """保存クエリの全件（名前順）"""
+    if not _table_exists(conn, SAVED_QUERIES_TABLE):
+        return []
+    cur = conn.execute(f'SELECT * FROM "{SAVED_QUERIES_TABLE}" ORDER BY name')
+    return [_row_to_dict(cur, row) for row in cur.fetchall()]
+
+
+def get_query(conn: sqlite3.Connection, query_id: int) -> Optional[Dict]:
+    cur = conn.execute(f'SELECT * FROM "{SAVED_QUERIES_TABLE}" WHERE id = ?', (query_id,))
+    row = cur.fetchone()
+    return _row_to_dict(cur, row) if row else None
+
+
+def source_versions(conn: sqlite3.Connection, tables: List[str]) -> Dict[str, Optional[str]]:
+    """
+    依存テーブルごとのインポート時点を表す値（インポート台帳にないテーブルはNone）
+    imported_atは秒単位のため、同じ秒に再インポートされても区別できるよう元ファイルの更新日時と行数も含める
+    """
+    versions = {}
+    for table in tables:
+        entry = lookup_import(conn, table)
+        versions[table] = f"{entry['imported_at']}|{entry['source_mtime']}|{entry['row_count']}" if entry else None
+    return versions
+
+
+def cache_status(conn: sqlite3.Connection, entry: Dict) -> str:
+    """
+    キャッシュの状態
+    'none': 実体化しない / 'missing': 未作成 / 'stale': 依存テーブルがキャッシュ作成後に再インポートされた / 'ok': 最新
+    """
+    if not entry["materialize"]:
+        return "none"
+    if not entry["source_versions"] or not _table_exists(conn, cache_table_name(entry["id"])):
+        return "missing"
+    if source_versions(conn, entry["depends_on"]) != entry["source_versions"]:
+        return "stale"
+    return "ok"
+
+
+def refresh_cache(conn: sqlite3.Connection, query_id: int) -> Dict:
+    """
+    クエリを実行して結果をキャッシュテーブルに作り直す
+    作成中の一時テーブルに書き込んでから1トランザクションで入れ替えるため、作成中も古いキャッシュを読める
+    """
+    entry = get_query(conn, query_id)
+    if entry is None:
+        raise ValueError(f"保存クエリが見つかりません: {query_id}")
+    cache_table = cache_table_name(query_id)
+    building = cache_table + BUILDING_SUFFIX
+    # 依存関係はテーブル構成の変更（ビューの定義変更など）で変わりうるため、作り直しのたびに求め直す
+    depends_on = query_dependencies(conn, entry["sql"])
+    versions = source_versions(conn, depends_on)
+
+    started = time.perf_counter()
+    conn.execute(f"DROP TABLE IF EXISTS {_quote(building)}")
+    conn.execute(f"CREATE TABLE {_quote(building)} AS {entry['sql']}")
+    row_count = conn.execute(f"SELECT COUNT(*) FROM {_quote(building)}").fetchone()[0]
+    conn.commit()
+    elapsed = time.perf_counter() - started
+
+    conn.execute("BEGIN")
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {_quote(cache_table)}")
+        conn.execute(f"ALTER TABLE {_quote(building)} RENAME TO {_quote(cache_table)}")
+        conn.execute(
+            f'UPDATE "{SAVED_QUERIES_TABLE}" SET depends_on = ?, source_versions = ?, refreshed_at = ?, '
+            f'refresh_sec = ?, row_count = ? WHERE id = ?',
+            (json.dumps(depends_on, ensure_ascii=False), json.dumps(versions, ensure_ascii=False),
+             datetime.now().isoformat(timespec="seconds"), round(elapsed, 3), row_count, query_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {"id": query_id, "name": entry["name"], "rows": row_count, "elapsed_sec": elapsed}
+
+
+def refresh_stale_caches(conn: sqlite3.Connection, tables: Optional[List[str]] = None) -> List[Dict]:
+    """
+    作り直しが必要なキャッシュをすべて作り直す
+    tablesを指定した場合は、そのいずれかに依存するクエリのみを対象にする（再インポートしたテーブルなど）
+    """
+    targets = {t.lower() for t in tables} if tables is not None else None
+    refreshed = []
+    for entry in load_queries(conn):
+        if cache_status(conn, entry) not in ("missing", "stale"):
+            continue
+        if targets is not None and not targets & {t.lower() for t in entry["depends_on"]}:
+            continue
+        refreshed.append(refresh_cache(conn, entry["id"]))
+    return refreshed
@@ -0,0 +1,111 @@
+"""
+スキーマ情報のキャッシュ
+全テーブルのカラム（宣言型・NOT NULL・デフォルト値・主キー）とインデックスを、sqlite_schema と
+テーブル値PRAGMA関数 (pragma_table_xinfo / pragma_index_list / pragma_index_info) の2クエリでまとめて読み込む。
+以降はテーブルを切り替えるたびに PRAGMA table_info を実行せず、PRAGMA schema_version が変わった時だけ読み直す
+カラムには SELECT * に現れる生成列（date_keys の <列>__date など）も含める（仮想テーブルの隠し列は除く）
+"""
+
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+_COLUMNS_SQL = """
+    SELECT m.name, p.cid, p.name, p.type, p."notnull", p.dflt_value, p.pk, p.hidden
+    FROM sqlite_master m JOIN pragma_table_xinfo(m.name) p
+    WHERE m.type = 'table' AND p.hidden <> 1
+    ORDER BY m.name, p.cid
+"""
+
+_INDEXES_SQL = """
+    SELECT m.name, il.name, il."unique", il.origin, ii.name
+    FROM sqlite_master m
+    JOIN pragma_index_list(m.name) il
+    JOIN pragma_index_info(il.name) ii
+    WHERE m.type = 'table'
+    ORDER BY m.name, il.name, ii.seqno
+"""
+
+
+class SchemaCache:
+    """接続1本分のスキーマ情報（テーブル名の大文字小文字は区別しない）"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._version: Optional[int] = None
+        self._tables: List[str] = []
+        self._columns: Dict[str, List[Tuple]] = {}
+        self._indexes: Dict[str, List[Dict]] = {}
+        self._generated: Dict[str, set] = {}
+
+    def _load(self):
+        columns: Dict[str, List[Tuple]] = {}
+        names: Dict[str, str] = {}
+        generated: Dict[str, set] = {}
+        for table, *info, hidden in self.conn.execute(_COLUMNS_SQL):
+            names.setdefault(table.lower(), table)
+            columns.setdefault(table.lower(), []).append(tuple(info))
+            if hidden:  # 2: VIRTUAL / 3: STORED の生成列
+                generated.setdefault(table.lower(), set()).add(info[1])
+        # カラムのないテーブルは存在しないため、テーブル一覧は sqlite_master から別に取る
+        for (table,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'"):
+            names.setdefault(table.lower(), table)
+            columns.setdefault(table.lower(), [])
+
+        indexes: Dict[str, List[Dict]] = {}
+        by_name: Dict[Tuple[str, str], Dict] = {}
+        for table, index, unique, origin, column in self.conn.execute(_INDEXES_SQL):
+            key = (table.lower(), index)
+            if key not in by_name:
+                by_name[key] = {"name": index, "unique": bool(unique), "origin": origin, "columns": []}
+                indexes.setdefault(table.lower(), []).append(by_name[key])
+            by_name[key]["columns"].append(column)
+
+        self._tables = sorted(names.values())
+        self._columns = columns
+        self._indexes = indexes
+        self._generated = generated
+
+    def refresh(self) -> bool:
+        """スキーマが変わっていれば読み直す（読み直した場合True）"""
+        version = self.conn.execute("PRAGMA schema_version").fetchone()[0]
+        if version == self._version:
+            return False
+        self._load()
+        self._version = version
+        return True
+
+    def invalidate(self):
+        """次回参照時に読み直させる"""
+        self._version = None
+
+    def tables(self) -> List[str]:
+        """テーブル名の一覧（名前順）"""
+        self.refresh()
+        return list(self._tables)
+
+    def has_table(self, table_name: str) -> bool:
+        self.refresh()
+        return table_name.lower() in self._columns
+
+    def table_info(self, table_name: str) -> List[Tuple]:
+        """PRAGMA table_info と同じ形式 (cid, name, type, notnull, dflt_value, pk) のカラム情報（生成列を含む）"""
+        self.refresh()
+        return list(self._columns.get(table_name.lower(), []))
+
+    def columns(self, table_name: str) -> List[str]:
+        """カラム名の一覧（定義順）"""
+        return [row[1] for row in self.table_info(table_name)]
+
+    def declared_types(self, table_name: str) -> Dict[str, str]:
+        """カラム名 -> 宣言型"""
+        return {row[1]: row[2] for row in self.table_info(table_name)}
+
+    def generated_columns(self, table_name: str) -> set:
+        """生成列の名前（値は他の列から計算されるため、型変換・全文検索・全体検索の対象にしない）"""
+        self.refresh()
+        return set(self._generated.get(table_name.lower(), ()))
+
+    def indexes(self, table_name: str) -> List[Dict]:
+        """インデックスの一覧 ({name, unique, origin(c:CREATE INDEX / u:UNIQUE制約 / pk:主キー), columns})"""
+        self.refresh()
+        return [dict(index, columns=list(index["columns"])) for index in self._indexes.get(table_name.lower(), [])]
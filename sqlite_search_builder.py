@@ -0,0 +1,290 @@
+"""
+複数条件検索（詳細検索）のSQL組み立て
+カラム・条件種別・値の組をAND/ORで結合し、値はすべてパラメータで渡すSQLにする。
+- 数値範囲・日付範囲は、宣言型が数値/日付のカラムならカラムを直接比較する（インデックスが使える）
+  日付列に正規化キーの生成列 (sqlite_date_keys) があれば、形式が混在していてもそのインデックスで比較する
+- Excelから貼り付けた値のリストは、件数が多ければ json_each() 経由の1パラメータで渡す
+  （SQLiteはIN (SELECT ...) の結果を一時インデックスに入れてから照合する）
+- 既存インデックス・FTSで絞り込める条件を先に、LIKE '%...%' のような重い条件を後に並べる
+"""
+
+import json
+import re
+import sqlite3
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlite_date_keys import find_date_key
+from sqlite_fts import fts_predicate
+from sqlite_schema_cache import SchemaCache
+
+OPERATOR_LABELS = {
+    "eq": "等しい",
+    "ne": "等しくない",
+    "contains": "部分一致",
+    "prefix": "前方一致",
+    "suffix": "後方一致",
+    "num_range": "数値範囲",
+    "date_range": "日付範囲",
+    "in": "リストのいずれかに一致",
+    "not_in": "リストのいずれにも一致しない",
+    "empty": "空 (NULL/空文字)",
+    "not_empty": "空でない",
+}
+RANGE_OPERATORS = ("num_range", "date_range")
+LIST_OPERATORS = ("in", "not_in")
+NO_VALUE_OPERATORS = ("empty", "not_empty")
+
+INLINE_IN_LIMIT = 50  # これを超える件数のリストはjson_eachで渡す
+
+# インデックス推奨のクエリログに記録する条件種別（sqlite_index_advisor.PREDICATE_LABELS）
+_ADVISOR_PREDICATES = {"eq": "eq", "in": "eq", "num_range": "range", "date_range": "range",
+                       "prefix": "prefix", "contains": "contains", "suffix": "suffix"}
+_LIKE_SEARCH_TYPES = {"contains": "部分一致", "prefix": "前方一致", "suffix": "後方一致"}
+
+_DATE_RE = re.compile(r"^(\d{4})[-/.]?(\d{1,2})[-/.]?(\d{1,2})$")
+
+
+def column_kind(declared_type: str) -> str:
+    """宣言型から比較方法 (number/date/text) を決める（インポーターはINTEGER/REAL/TIMESTAMP/TEXTで作成する）"""
+    declared = (declared_type or "").upper()
+    if any(t in declared for t in ("INT", "REAL", "FLOA", "DOUB", "NUM", "DEC")):
+        return "number"
+    if "DATE" in declared or "TIME" in declared:
+        return "date"
+    return "text"
+
+
+def parse_list_values(text: str) -> List[str]:
+    """
+    貼り付けられた値のリストを分解する（重複と空欄は除く）
+    Excelからのコピーは改行・タブ区切り。1行だけの場合はカンマ区切りも受け付ける
+    """
+    text = text.strip()
+    if "\n" not in text and "\t" not in text:
+        parts = text.split(",")
+    else:
+        parts = re.split(r"[\r\n\t]+", text)
+    values = []
+    seen = set()
+    for part in parts:
+        value = part.strip().strip('"')
+        if value and value not in seen:
+            seen.add(value)
+            values.append(value)
+    return values
+
+
+def parse_number(text: str):
+    """数値の入力値を解釈する（桁区切りのカンマ・全角数字も可）"""
+    normalized = text.strip().translate(str.maketrans("０１２３４５６７８９．－", "0123456789.-")).replace(",", "")
+    try:
+        return int(normalized)
+    except ValueError:
+        try:
+            return float(normalized)
+        except ValueError:
+            raise ValueError(f"数値として解釈できません: {text}")
+
+
+def parse_date(text: str) -> date:
+    """日付の入力値 (2024-01-05 / 2024/1/5 / 20240105) を解釈する"""
+    match = _DATE_RE.match(text.strip())
+    if match:
+        try:
+            return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        except ValueError:
+            pass
+    raise ValueError(f"日付として解釈できません: {text}")
+
+
+def json_each_available(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("SELECT value FROM json_each('[]')").fetchall()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def indexed_columns(conn: sqlite3.Connection, schema: SchemaCache, table_name: str) -> Dict[str, Set[str]]:
+    """インデックスの先頭列 -> 照合順序の集合（INTEGER PRIMARY KEYはrowidそのものなのでBINARY扱い）"""
+    indexed: Dict[str, Set[str]] = {}
+    for index in schema.indexes(table_name):
+        keys = [row for row in conn.execute(f'PRAGMA index_xinfo("{index["name"]}")') if row[5]]
+        if keys and keys[0][2] is not None:
+            indexed.setdefault(keys[0][2].lower(), set()).add((keys[0][4] or "BINARY").upper())
+    for cid, name, declared, notnull, default, pk in schema.table_info(table_name):
+        if pk == 1 and (declared or "").upper() == "INTEGER":
+            indexed.setdefault(name.lower(), set()).add("BINARY")
+    return indexed
+
+
+def _list_values(values: List[str], kind: str) -> List:
+    """数値カラムとの比較では数値に変換できる値を数値にする（できない値は文字列のまま）"""
+    if kind != "number":
+        return values
+    converted = []
+    for value in values:
+        try:
+            converted.append(parse_number(value))
+        except ValueError:
+            converted.append(value)
+    return converted
+
+
+def _in_clause(column: str, values: List, use_json: bool) -> Tuple[str, list]:
+    if len(values) > INLINE_IN_LIMIT and use_json:
+        return f"{column} IN (SELECT value FROM json_each(?))", [json.dumps(values, ensure_ascii=False)]
+    return f"{column} IN ({', '.join('?' for _ in values)})", list(values)
+
+
+def _compile_condition(conn: sqlite3.Connection, table_name: str, condition: Dict, declared_type: str,
+                       collations: Set[str], use_json: bool, date_key: Optional[Tuple[str, str]] = None) -> Dict:
+    """
+    1条件をSQLにする
+    date_key: 日付列の正規化キー (生成列名, 'iso' / 'julian')。あれば日付範囲はこの列で比較する
+    rank: 評価順（小さいほど先）。0-1はインデックス/FTSで絞り込める条件、2以降は行ごとに評価する条件で軽い順
+    """
+    column_name = condition["column"]
+    op = condition["op"]
+    value = (condition.get("value") or "").strip()
+    value2 = (condition.get("value2") or "").strip()
+    column = f"[{column_name}]"
+    kind = column_kind(declared_type)
+    indexed = bool(collations)
+    notes = []
+
+    if op in ("eq", "ne") and not value:
+        raise ValueError(f"{column_name}: 値を入力してください。")
+    if op == "eq":
+        sql, params = f"{column} = ?", [value]
+        rank = 0 if indexed else 3
+    elif op == "ne":
+        sql, params = f"({column} IS NULL OR {column} <> ?)", [value]
+        indexed, rank = False, 3
+    elif op in _LIKE_SEARCH_TYPES:
+        if not value:
+            raise ValueError(f"{column_name}: 値を入力してください。")
+        fts = fts_predicate(conn, table_name, column_name, value, _LIKE_SEARCH_TYPES[op])
+        if fts:
+            (sql, params), indexed, rank = (fts[0], list(fts[1])), True, 1
+        elif op == "prefix":
+            sql, params = f"{column} LIKE ?", [f"{value}%"]
+            # LIKEの前方一致はNOCASE照合のインデックスでないと使われない
+            indexed = "NOCASE" in collations
+            rank = 1 if indexed else 6
+            if collations and not indexed:
+                notes.append(f"{column_name}: 前方一致にはCOLLATE NOCASEのインデックスが必要です")
+        else:
+            sql, params = f"{column} LIKE ?", [f"%{value}%" if op == "contains" else f"%{value}"]
+            indexed, rank = False, 7
+    elif op in RANGE_OPERATORS:
+        if not value and not value2:
+            raise ValueError(f"{column_name}: 下限・上限の少なくとも一方を入力してください。")
+        if op == "num_range":
+            low, high = (parse_number(v) if v else None for v in (value, value2))
+            target = column
+            if kind != "number":
+                # 数値型でないカラムは文字列として比較されるためCASTする（インデックスは使えない）
+                target, indexed = f"CAST({column} AS REAL)", False
+                notes.append(f"{column_name}: 数値型のカラムではないため、CASTして比較します（インデックス不使用）")
+            bounds = ([f"{target} >= ?"] if low is not None else []) + ([f"{target} <= ?"] if high is not None else [])
+            params = [v for v in (low, high) if v is not None]
+        else:
+            low, high = (parse_date(v) if v else None for v in (value, value2))
+            if date_key:
+                # 正規化キーは日付だけの値なので、上限も含めて比較できる
+                key, mode = date_key
+                target, placeholder = f"[{key}]", "?" if mode == "iso" else "julianday(?)"
+                bounds = ([f"{target} >= {placeholder}"] if low is not None else []) + \
+                         ([f"{target} <= {placeholder}"] if high is not None else [])
+                params = [v.isoformat() for v in (low, high) if v is not None]
+                indexed = True
+            else:
+                if kind != "date":
+                    notes.append(f"{column_name}: 日付型のカラムではありません（YYYY-MM-DD形式の値のみ一致します）")
+                # 時刻付きの値 (YYYY-MM-DD HH:MM:SS) も含めるため、上限は翌日未満で比較する
+                bounds = ([f"{column} >= ?"] if low is not None else []) + \
+                         ([f"{column} < ?"] if high is not None else [])
+                params = ([low.isoformat()] if low is not None else []) + \
+                         ([(high + timedelta(days=1)).isoformat()] if high is not None else [])
+        sql = " AND ".join(bounds)
+        rank = 1 if indexed else 4
+    elif op in LIST_OPERATORS:
+        values = _list_values(parse_list_values(condition.get("values") or value), kind)
+        if not values:
+            raise ValueError(f"{column_name}: リストの値を入力してください。")
+        sql, params = _in_clause(column, values, use_json)
+        if op == "in":
+            rank = 0 if indexed else 3
+        else:
+            sql, indexed, rank = f"({column} IS NULL OR {sql.replace(' IN (', ' NOT IN (', 1)})", False, 3
+    elif op == "empty":
+        sql, params, rank = f"({column} IS NULL OR {column} = '')", [], 2 if indexed else 5
+    elif op == "not_empty":
+        sql, params, indexed, rank = f"({column} IS NOT NULL AND {column} <> '')", [], False, 5
+    else:
+        raise ValueError(f"未対応の条件です: {op}")
+
+    return {"column": column_name, "op": op, "sql": sql, "params": params, "indexed": indexed,
+            "rank": rank, "notes": notes}
+
+
+def compile_search(conn: sqlite3.Connection, schema: SchemaCache, table_name: str,
+                   conditions: List[Dict], combinator: str = "AND") -> Dict:
+    """
+    条件の一覧から検索SQLを組み立てる（LIMITは付けない）
+    conditions: {column, op, value, value2, values(リスト用の貼り付けテキスト)} の一覧
+    戻り値: {sql, where, params, terms(評価順), notes, observations(インデックス推奨用のクエリログ)}
+    """
+    if not conditions:
+        raise ValueError("検索条件を1つ以上指定してください。")
+    if combinator not in ("AND", "OR"):
+        raise ValueError(f"未対応の結合方法です: {combinator}")
+    declared = {name.lower(): declared_type for name, declared_type in schema.declared_types(table_name).items()}
+    indexed = indexed_columns(conn, schema, table_name)
+    use_json = json_each_available(conn)
+
+    terms = []
+    for condition in conditions:
+        if condition["column"].lower() not in declared:
+            raise ValueError(f"カラムが見つかりません: {condition['column']}")
+        terms.append(_compile_condition(conn, table_name, condition, declared[condition["column"].lower()],
+                                        indexed.get(condition["column"].lower(), set()), use_json,
+                                        find_date_key(indexed, condition["column"])))
+    # 同じrankの中では入力順を保つ
+    terms.sort(key=lambda term: term["rank"])
+
+    notes = [note for term in terms for note in term["notes"]]
+    if combinator == "OR" and len(terms) > 1 and not all(term["indexed"] for term in terms):
+        notes.append("OR条件にインデックスで絞り込めない条件が含まれるため、全件走査になります")
+
+    where = f" {combinator} ".join(f"({term['sql']})" if len(terms) > 1 else term["sql"] for term in terms)
+    params = [param for term in terms for param in term["params"]]
+    observations = [(table_name, term["column"], _ADVISOR_PREDICATES[term["op"]], not term["indexed"])
+                    for term in terms if term["op"] in _ADVISOR_PREDICATES]
+    return {
+        "sql": f"SELECT * FROM [{table_name}] WHERE {where}",
+        "where": where,
+        "params": tuple(params),
+        "terms": terms,
+        "notes": notes,
+        "observations": observations,
+    }
+
+
+def describe_value(condition: Dict) -> str:
+    """条件の値部分の表示（範囲は 下限～上限、リストは件数）"""
+    if condition["op"] in NO_VALUE_OPERATORS:
+        return ""
+    if condition["op"] in RANGE_OPERATORS:
+        return f"{condition.get('value') or ''}～{condition.get('value2') or ''}"
+    if condition["op"] in LIST_OPERATORS:
+        return f"({len(parse_list_values(condition.get('values') or condition.get('value') or ''))}件)"
+    return f"'{condition.get('value') or ''}'"
+
+
+def describe_conditions(conditions: List[Dict], combinator: str) -> str:
+    """ステータス表示用の条件の要約"""
+    parts = [f"{c['column']} {OPERATOR_LABELS.get(c['op'], c['op'])} {describe_value(c)}".rstrip() for c in conditions]
+    return f" {combinator} ".join(parts)
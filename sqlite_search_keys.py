@@ -0,0 +1,94 @@
+"""
+表記ゆれを吸収する検索用の正規化列（NFKC + 小文字化）
+SAPの出力は全角/半角のカナ・英数字が混在し、保存されている通りの表記で入力しないと検索に一致しない。
+検索のたびに列を関数で包むとインデックスが使えないため、設定ファイルのファイルごとの "search_key_fields" に
+書いた列について、インポート時に正規化した値を <列>__norm 列に格納してインデックスを作成する。
+GUIの検索 (search_data) は正規化列があれば、入力値も同じ規則で正規化してその列で検索する。
+正規化には Python の関数 (sqlite_functions.search_key) が必要なため、仮想生成列ではなく通常の列に値を格納する
+（関数を登録していない接続・他のツールからもテーブルを読める）。
+インポート後に SQLエディタなどで行を追加・更新しても正規化列が古くならないよう、元の列の INSERT / UPDATE で
+正規化列を書き直すトリガーも作成する。トリガーは search_key を呼ぶため、このテーブルに書き込む接続には
+sqlite_functions.register_functions で関数を登録しておく必要がある（GUI・インポーターの接続は登録済み）
+
+設定の書き方:
+    "search_key_fields": ["品目テキスト", "得意先名"]
+"""
+
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+from sqlite_functions import register_functions, search_key
+
+SEARCH_KEY_SUFFIX = "__norm"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def search_key_column(column: str) -> str:
+    return f"{column}{SEARCH_KEY_SUFFIX}"
+
+
+def is_search_key_column(column: str) -> bool:
+    """インポーターが追加した正規化列か（元ファイルにない列として扱う）"""
+    return column.endswith(SEARCH_KEY_SUFFIX)
+
+
+def _create_sync_triggers(conn: sqlite3.Connection, table_name: str, column: str, key: str):
+    """元の列の INSERT / UPDATE で正規化列を書き直すトリガー"""
+    table, update = _quote(table_name), f"SET {_quote(key)} = search_key(NEW.{_quote(column)}) WHERE rowid = NEW.rowid"
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {_quote(f'{table_name}_{key}_ai')} AFTER INSERT ON {table} "
+                 f"BEGIN UPDATE {table} {update}; END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {_quote(f'{table_name}_{key}_au')} AFTER UPDATE OF {_quote(column)} "
+                 f"ON {table} BEGIN UPDATE {table} {update}; END")
+
+
+def add_search_key_columns(conn: sqlite3.Connection, table_name: str, file_config: Dict) -> Tuple[List[str], List[str]]:
+    """
+    search_key_fields の列に正規化列を追加して値を格納し、インデックスと値を保つトリガーを作成する
+    （呼び出し側のトランザクション内で実行する）
+    正規化列は COLLATE NOCASE で作成し、完全一致と前方一致 (LIKE 'abc%') の両方でインデックスが使えるようにする
+    戻り値: (作成したインデックス名, 警告メッセージ)
+    """
+    fields = file_config.get("search_key_fields", [])
+    if not fields:
+        return [], []
+    register_functions(conn)
+    existing = {row[1].lower() for row in conn.execute(f"PRAGMA table_xinfo({_quote(table_name)})")}
+    created, warnings = [], []
+    for column in fields:
+        if column.lower() not in existing:
+            warnings.append(f"search_key_fields の対象の列がテーブルにありません: {column}")
+            continue
+        key = search_key_column(column)
+        if key.lower() not in existing:
+            conn.execute(f"ALTER TABLE {_quote(table_name)} ADD COLUMN {_quote(key)} TEXT COLLATE NOCASE")
+        conn.execute(f"UPDATE {_quote(table_name)} SET {_quote(key)} = search_key({_quote(column)})")
+        _create_sync_triggers(conn, table_name, column, key)
+        name = f"idx_{table_name}_{key}"
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(name)} ON {_quote(table_name)} ({_quote(key)})")
+        created.append(name)
+    return created, warnings
+
+
+def find_search_key(columns: List[str], column: str) -> Optional[str]:
+    """列に正規化列があればその列名（columns: テーブルの列名の一覧）"""
+    key = search_key_column(column)
+    lowered = key.lower()
+    return next((c for c in columns if c.lower() == lowered), None)
+
+
+def normalized_search(key: str, value: str, search_type: str) -> Tuple[str, tuple]:
+    """
+    検索タイプ（完全一致/部分一致/前方一致/後方一致）の条件を正規化列に対するWHERE句にする
+    入力値も search_key で正規化するため、全角/半角・大文字/小文字の違いを問わず一致する
+    """
+    normalized = search_key(value)
+    if search_type == "完全一致":
+        return f"[{key}] = ?", (normalized,)
+    if search_type == "前方一致":
+        return f"[{key}] LIKE ?", (f"{normalized}%",)
+    if search_type == "後方一致":
+        return f"[{key}] LIKE ?", (f"%{normalized}",)
+    return f"[{key}] LIKE ?", (f"%{normalized}%",)
@@ -0,0 +1,236 @@
+"""
+列の型変換（テーブルの作り直し）
+SQLiteは ALTER TABLE で列の型を変えられないため、型だけを変えたテーブルを作成し、
+INSERT ... SELECT の1回のSQLで正規化しながら全行を移してから元のテーブルと入れ替える。
+- 値の変換はインポーターと同じ正規化ルールのSQL関数（sqlite_functions）で行う
+- rowidを保ったまま移すため、FTSの外部コンテンツや保存済みの参照もそのまま使える
+- インデックス・トリガーは元の定義で作り直す
+- 全体を1トランザクションで行うため、途中で失敗しても元のテーブルは変わらない
+"""
+
+import re
+import sqlite3
+import time
+from typing import Dict, List, Tuple
+
+from sqlite_fts import fts_table_name, get_fts_columns
+from sqlite_functions import register_functions
+
+TARGET_TYPES = ("INTEGER", "REAL", "TIMESTAMP", "TEXT")
+CONVERT_SUFFIX = "__typeconv"
+FAILURE_SAMPLE_LIMIT = 20
+
+# 変換先の型 -> 値の変換に使うSQL関数
+_CONVERTERS = {
+    "INTEGER": "clean_integer",
+    "REAL": "clean_real",
+    "TIMESTAMP": "to_iso_date",
+    "TEXT": "clean_text",
+}
+
+# カラム定義で型名の後に続く制約のキーワード
+_CONSTRAINT_KEYWORDS = {"CONSTRAINT", "PRIMARY", "NOT", "NULL", "UNIQUE", "CHECK", "DEFAULT", "COLLATE",
+                        "REFERENCES", "GENERATED", "AS"}
+# テーブル制約の書き出し
+_TABLE_CONSTRAINTS = {"CONSTRAINT", "PRIMARY", "UNIQUE", "CHECK", "FOREIGN"}
+
+_TOKEN = re.compile(r'\s*("(?:[^"]|"")*"|\[[^\]]*\]|`(?:[^`]|``)*`|\'(?:[^\']|\'\')*\'|[A-Za-z_][\w$]*|\S)')
+
+
+def suggest_target_type(counts: Dict[str, int]) -> str:
+    """データ型プロファイルの型分布 (sqlite_column_profiler.TYPE_LABELS -> 件数) から変換先の型を選ぶ"""
+    numeric = counts.get("整数", 0) + counts.get("浮動小数点数", 0)
+    dates = counts.get("日付", 0)
+    if counts.get("文字列", 0) >= max(numeric, dates):
+        return "TEXT"
+    if dates > numeric:
+        return "TIMESTAMP"
+    return "REAL" if counts.get("浮動小数点数", 0) else "INTEGER"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _unquote(token: str) -> str:
+    if token[:1] == '"':
+        return token[1:-1].replace('""', '"')
+    if token[:1] == '`':
+        return token[1:-1].replace('``', '`')
+    if token[:1] == '[':
+        return token[1:-1]
+    return token
+
+
+def _split_definitions(body: str) -> List[str]:
+    """CREATE TABLE の括弧内をカンマで分ける（引用符・括弧の中のカンマは区切りにしない）"""
+    parts, depth, start = [], 0, 0
+    for match in _TOKEN.finditer(body):
+        token = match.group(1)
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif token == "," and depth == 0:
+            parts.append(body[start:match.start(1)])
+            start = match.end(1)
+    parts.append(body[start:])
+    return parts
+
+
+def _table_body(create_sql: str) -> Tuple[int, int]:
+    """CREATE TABLE 文のカラム定義部分（最初の '(' から対応する ')' まで）の位置"""
+    depth = 0
+    open_pos = None
+    for match in _TOKEN.finditer(create_sql):
+        token = match.group(1)
+        if token == "(":
+            if open_pos is None:
+                open_pos = match.end(1)
+            depth += 1
+        elif token == ")":
+            depth -= 1
+            if depth == 0 and open_pos is not None:
+                return open_pos, match.start(1)
+    raise ValueError("CREATE TABLE 文を解析できません。")
+
+
+def _retype_definition(definition: str, new_type: str) -> str:
+    """カラム定義の型名だけを置き換える（制約・生成列の式などはそのまま残す）"""
+    tokens = list(_TOKEN.finditer(definition))
+    type_start = tokens[0].end(1)
+    type_end = type_start
+    i = 1
+    while i < len(tokens) and tokens[i].group(1).upper() not in _CONSTRAINT_KEYWORDS:
+        token = tokens[i].group(1)
+        if token == "(":  # VARCHAR(10) などの桁指定
+            while i < len(tokens) and tokens[i].group(1) != ")":
+                i += 1
+            if i < len(tokens):
+                type_end = tokens[i].end(1)
+            i += 1
+            break
+        if not re.match(r'[A-Za-z_]', token):
+            break
+        type_end = tokens[i].end(1)
+        i += 1
+    rest = definition[type_end:]
+    return f"{definition[:type_start]} {new_type}{rest}"
+
+
+def retype_create_sql(create_sql: str, table: str, new_table: str, column: str, new_type: str) -> str:
+    """元のCREATE TABLE文から、テーブル名と指定列の型だけを変えたCREATE TABLE文を作る"""
+    start, end = _table_body(create_sql)
+    definitions = _split_definitions(create_sql[start:end])
+    found = False
+    for i, definition in enumerate(definitions):
+        first = _TOKEN.match(definition)
+        if not first:
+            continue
+        name = first.group(1)
+        if name.upper() in _TABLE_CONSTRAINTS and name[:1] not in '"[`':
+            continue
+        if _unquote(name).lower() == column.lower():
+            definitions[i] = _retype_definition(definition, new_type)
+            found = True
+    if not found:
+        raise ValueError(f"列 '{column}' がテーブル '{table}' の定義にありません。")
+    return f"CREATE TABLE {_quote(new_table)} ({','.join(definitions)}){create_sql[end + 1:]}"
+
+
+def _stored_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    """値を格納する列（生成列を除く）"""
+    return [row[1] for row in conn.execute(f"PRAGMA table_xinfo({_quote(table)})") if row[6] == 0]
+
+
+def _has_rowid_alias(conn: sqlite3.Connection, table: str) -> bool:
+    """INTEGER PRIMARY KEY の列（rowidの別名）があるか"""
+    pk = [row for row in conn.execute(f"PRAGMA table_info({_quote(table)})") if row[5]]
+    return len(pk) == 1 and (pk[0][2] or "").upper() == "INTEGER"
+
+
+def _failure_condition(column: str, target: str) -> str:
+    """変換できない値（空値ではないのに変換結果がNULLになる値）の条件"""
+    quoted = _quote(column)
+    return f"NOT is_blank({quoted}) AND {_CONVERTERS[target]}({quoted}) IS NULL"
+
+
+def preview_conversion(conn: sqlite3.Connection, table: str, column: str, target: str) -> Dict:
+    """変換できない値の件数とサンプル（変換するとNULLになる）"""
+    if target not in _CONVERTERS:
+        raise ValueError(f"変換先の型が不正です: {target}")
+    register_functions(conn)
+    condition = _failure_condition(column, target)
+    total = conn.execute(f"SELECT COUNT(*) FROM {_quote(table)}").fetchone()[0]
+    failures = conn.execute(f"SELECT COUNT(*) FROM {_quote(table)} WHERE {condition}").fetchone()[0]
+    samples = conn.execute(
+        f"SELECT {_quote(column)}, COUNT(*), MIN(rowid) FROM {_quote(table)} WHERE {condition} "
+        f"GROUP BY 1 ORDER BY 2 DESC LIMIT ?", (FAILURE_SAMPLE_LIMIT,)).fetchall()
+    return {"total": total, "failures": failures, "samples": samples}
+
+
+def convert_column_type(conn: sqlite3.Connection, table: str, column: str, target: str) -> Dict:
+    """
+    列の型を変換する（テーブルを作り直して入れ替える）
+    変換できない値はNULLになる。件数とサンプル（値, 件数, 最初のrowid）を結果に含める
+    """
+    if target not in _CONVERTERS:
+        raise ValueError(f"変換先の型が不正です: {target}")
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+    if row is None:
+        raise ValueError(f"テーブル '{table}' がありません。")
+    register_functions(conn)
+    new_table = table + CONVERT_SUFFIX
+    create_sql = retype_create_sql(row[0], table, new_table, column, target)
+    # テーブルをDROPすると消えるため、作り直すインデックス・トリガーの定義を先に控える
+    dependents = conn.execute(
+        "SELECT type, sql FROM sqlite_master WHERE tbl_name=? AND type IN ('index', 'trigger') AND sql IS NOT NULL "
+        "ORDER BY type='trigger'", (table,)).fetchall()
+    preview = preview_conversion(conn, table, column, target)
+
+    columns = _stored_columns(conn, table)
+    select_list = [f"{_CONVERTERS[target]}({_quote(c)})" if c.lower() == column.lower() else _quote(c) for c in columns]
+    insert_columns = [_quote(c) for c in columns]
+    if not _has_rowid_alias(conn, table):
+        insert_columns.insert(0, "rowid")
+        select_list.insert(0, "rowid")
+    rebuild_fts = column.lower() in (c.lower() for c in get_fts_columns(conn, table))
+    has_stats = conn.execute("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1'").fetchone() is not None
+
+    started = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(create_sql)
+        conn.execute(f"INSERT INTO {_quote(new_table)} ({', '.join(insert_columns)}) "
+                     f"SELECT {', '.join(select_list)} FROM {_quote(table)}")
+        conn.execute(f"DROP TABLE {_quote(table)}")
+        # 元のテーブルを参照するビューがあっても名前の変更で書き換えられないようにする
+        conn.execute("PRAGMA legacy_alter_table=ON")
+        try:
+            conn.execute(f"ALTER TABLE {_quote(new_table)} RENAME TO {_quote(table)}")
+        finally:
+            conn.execute("PRAGMA legacy_alter_table=OFF")
+        for _, sql in dependents:
+            conn.execute(sql)
+        if rebuild_fts:
+            fts_name = _quote(fts_table_name(table))
+            conn.execute(f"INSERT INTO {fts_name}({fts_name}) VALUES('rebuild')")
+        if has_stats:
+            conn.execute(f"ANALYZE {_quote(table)}")
+        conn.commit()
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        raise ValueError(f"変換後の値が列の制約に違反するため変換できません（変換できない値・空値はNULLになります）: {e}")
+    except Exception:
+        conn.rollback()
+        raise
+    return {
+        "table": table,
+        "column": column,
+        "target": target,
+        "rows": preview["total"],
+        "failures": preview["failures"],
+        "samples": preview["samples"],
+        "recreated": len(dependents),
+        "elapsed_sec": time.perf_counter() - started,
+    }
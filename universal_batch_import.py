@@ -0,0 +1,221 @@
+"""
+Excel・CSV/TXT/TSVの一括インポート
+フォルダを1回だけ走査して対象ファイルを集め、読み込み・クリーニング・型推定（DBに触れない処理）を
+ワーカープロセスで並列に行い、DBへの書き込みはこのプロセスの1接続で1ファイルずつ直列に行う。
+大きいファイルから順に着手するため、最後に大きなファイルだけが残って待たされることがない。
+最後にExcel・CSV/TXTをまとめた1つの処理結果を表示する
+"""
+
+import multiprocessing
+import os
+import queue
+import sqlite3
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from sqlite_import_events import (add_events_argument, capture_warnings, default_stream, open_events_output,
+                                  ImportEventStream)
+from sqlite_import_registry import import_type_of
+from universal_csv_txt_to_sqlite import (csv_txt_table_name, load_csv_txt_config, prepare_csv_txt_data,
+                                         write_csv_txt_table)
+from universal_excel_to_sqlite import prepare_excel_data, write_excel_table
+
+# 準備済みデータをメモリに抱えすぎないよう、同時に投入するファイル数はワーカー数のこの倍数までにする
+IN_FLIGHT_PER_WORKER = 2
+
+# ワーカープロセス側のイベントストリーム（イベントは親プロセスへのキューに流す）
+_worker_events = None
+
+
+def discover_import_files(input_dir):
+    """インポート対象のファイル一覧（Excelの一時ファイル ~$ を除く、サイズの大きい順）"""
+    files = [path for path in Path(input_dir).iterdir()
+             if path.is_file() and import_type_of(path.name) and not path.name.startswith('~$')]
+    return sorted(files, key=lambda path: path.stat().st_size, reverse=True)
+
+
+def default_worker_count():
+    """ワーカー数の既定値（書き込み用に1コアを残す）"""
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def _init_worker(event_queue):
+    global _worker_events
+    _worker_events = ImportEventStream()
+    _worker_events.subscribe(event_queue.put)
+
+
+def _prepare_in_worker(file_path, import_type):
+    """
+    ワーカープロセスで1ファイル分の書き込み用データを準備する
+    戻り値は (準備済みデータ または None, 計測のスナップショット, ワーカーが発行したイベント数)
+    """
+    emitted = []
+    _worker_events.subscribe(emitted.append)
+    try:
+        if import_type == 'excel':
+            metrics = _worker_events.start_file(file_path, file_path.stem.lower())
+        else:
+            config = load_csv_txt_config()
+            metrics = _worker_events.start_file(file_path, csv_txt_table_name(file_path, config))
+        prepared = None
+        try:
+            with capture_warnings(metrics):
+                if import_type == 'excel':
+                    print(f"[FOLDER] 処理中: {file_path}")
+                    prepared = prepare_excel_data(str(file_path), metrics, file_path.stem.lower())
+                else:
+                    print(f"--- 処理開始: {file_path.name} ---")
+                    prepared = prepare_csv_txt_data(file_path, config, metrics)
+        except Exception as e:
+            print(f"[ERROR] エラー: {file_path} - {str(e)}")
+            print(f"[SEARCH] エラー詳細: {traceback.format_exc()}")
+            metrics.fail(str(e))
+            prepared = None
+        return prepared, metrics.snapshot(), len(emitted)
+    finally:
+        _worker_events.unsubscribe(emitted.append)
+
+
+class _EventForwarder:
+    """ワーカーのイベントを親プロセスのストリームに中継する（ファイルごとに中継済みの件数を数える）"""
+
+    def __init__(self, event_queue, events):
+        self.event_queue = event_queue
+        self.events = events
+        self.forwarded = {}
+
+    def drain(self, timeout=None):
+        """キューにあるイベントを中継する（timeout指定時は最初の1件をその時間だけ待つ）"""
+        block = timeout is not None
+        while True:
+            try:
+                record = self.event_queue.get(block, timeout)
+            except queue.Empty:
+                return
+            block = False
+            self.forwarded[record.get('file')] = self.forwarded.get(record.get('file'), 0) + 1
+            self.events.forward(record)
+
+    def wait_for(self, file_name, count, timeout=5.0):
+        """指定ファイルのイベントがcount件中継されるまで待つ（file_endより後に届かないようにする）"""
+        deadline = time.monotonic() + timeout
+        while self.forwarded.get(file_name, 0) < count and time.monotonic() < deadline:
+            self.drain(timeout=0.05)
+
+
+def _write_prepared(conn, file_path, import_type, prepared, metrics):
+    """準備済みのデータを書き込む（この接続・このプロセスだけがDBに書き込む）"""
+    if import_type == 'excel':
+        try:
+            write_excel_table(conn, str(file_path), prepared, metrics)
+        except Exception as e:
+            print(f"[ERROR] エラー: {file_path} - {str(e)}")
+            metrics.fail(str(e))
+    else:
+        write_csv_txt_table(conn, file_path, prepared, metrics)
+
+
+def print_summary(results, wall_time, db_path):
+    """Excel・CSV/TXTをまとめた処理結果"""
+    succeeded = [r for r in results if r['status'] == 'ok']
+    failed = [r for r in results if r['status'] != 'ok']
+    total_rows = sum(r['rows'] or 0 for r in succeeded)
+    file_time = sum(r['elapsed'] for r in results)
+
+    print("\n[CHART] 処理結果:")
+    for r in results:
+        mark = "[OK]" if r['status'] == 'ok' else "[ERROR]"
+        rows = f"{r['rows']}行" if r['rows'] is not None else "-"
+        print(f"  {mark} {r['file']} -> {r['table']} ({r['type']}, {rows}, {r['elapsed']:.1f}秒)")
+    print(f"  成功: {len(succeeded)}ファイル / 失敗: {len(failed)}ファイル / 合計 {total_rows}行")
+    if failed:
+        print(f"  失敗ファイル: {', '.join(r['file'] for r in failed)}")
+    print(f"  所要時間: {wall_time:.1f}秒 (ファイルごとの処理時間の合計: {file_time:.1f}秒)")
+    print(f"  データベース: {db_path}")
+
+
+def batch_import(input_dir, db_path, workers=None, events=default_stream):
+    """フォルダ内のExcel・CSV/TXT/TSVファイルを並列に準備し、1つの接続で順に書き込む"""
+    files = discover_import_files(input_dir)
+    if not files:
+        print("[INFO] 処理対象のファイルが見つかりません。")
+        return []
+
+    workers = workers or default_worker_count()
+    print(f"[STATS] 処理対象: {len(files)}ファイル (ワーカー {workers}プロセス)")
+    events.batch_start("batch", files)
+    started = time.perf_counter()
+
+    event_queue = multiprocessing.Queue()
+    forwarder = _EventForwarder(event_queue, events)
+    waiting = [(path, import_type_of(path.name)) for path in files]  # 大きい順
+    running = {}
+    results = []
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(event_queue,)) as pool:
+            while waiting or running:
+                while waiting and len(running) < workers * IN_FLIGHT_PER_WORKER:
+                    path, import_type = waiting.pop(0)
+                    running[pool.submit(_prepare_in_worker, path, import_type)] = (path, import_type)
+
+                done, _ = wait(running, timeout=0.2, return_when=FIRST_COMPLETED)
+                forwarder.drain()
+                for future in done:
+                    path, import_type = running.pop(future)
+                    try:
+                        prepared, snapshot, emitted = future.result()
+                    except Exception as e:  # ワーカープロセスの異常終了など
+                        print(f"[ERROR] 致命的エラー: {path.name} - {str(e)}")
+                        prepared, snapshot, emitted = None, None, 0
+                        worker_error = str(e)
+
+                    if snapshot is None:
+                        metrics = events.start_file(path, path.stem.lower())
+                        metrics.fail(f"ワーカープロセスでエラー: {worker_error}")
+                    else:
+                        forwarder.wait_for(path.name, emitted)
+                        metrics = events.resume_file(snapshot)
+                        if prepared is not None:
+                            with capture_warnings(metrics):
+                                _write_prepared(conn, path, import_type, prepared, metrics)
+                    events.finish_file(metrics)
+                    results.append({'file': path.name, 'table': metrics.table, 'type': import_type,
+                                    'status': 'error' if metrics.error else 'ok', 'rows': metrics.rows,
+                                    'elapsed': metrics.elapsed})
+        forwarder.drain()
+    except sqlite3.Error as e:
+        print(f"[FATAL] SQLiteデータベースエラーが発生しました: {e}")
+    finally:
+        if conn:
+            conn.close()
+        events.batch_end()
+
+    print_summary(results, time.perf_counter() - started, db_path)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="フォルダ内のExcel・CSV/TXT/TSVファイルを一括でSQLiteに変換します。")
+    parser.add_argument("input", help="入力ディレクトリのパス")
+    parser.add_argument("db", help="出力SQLite DBファイル")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="読み込み・クリーニングを並列に行うプロセス数（省略時はCPU数から決定）")
+    add_events_argument(parser)
+    args = parser.parse_args()
+    events_output = open_events_output(args.events)
+
+    if not os.path.isdir(args.input):
+        print(f"[ERROR] 入力ディレクトリが見つかりません: {args.input}")
+        sys.exit(1)
+    results = batch_import(args.input, args.db, args.workers)
+    if events_output:
+        events_output.close()
+    if any(r['status'] != 'ok' for r in results):
+        sys.exit(1)
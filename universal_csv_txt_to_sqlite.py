@@ -7,6 +7,14 @@ import re
 import csv
 from pathlib import Path
 
+from sqlite_import_events import add_events_argument, default_stream, open_events_output
+from sqlite_elt_import import elt_load, load_mode
+from sqlite_import_indexes import analyze_table, create_configured_indexes
+from sqlite_import_registry import record_import
+
+# 書き込み中の一時テーブル名の接尾辞（書き込み完了後に本来のテーブルと入れ替える）
+STAGING_SUFFIX = "__importing"
+
 def load_csv_txt_config():
     """独自config読込"""
     config_path = Path(__file__).parent / "csv_txt_config.json"
@@ -110,12 +118,9 @@ def clean_dataframe_with_config(df, file_config):
 
     return df
 
-def process_and_insert_data(conn, file_path, config):
-    """DataFrameを処理し、SQLiteに挿入する共通関数"""
-    file_name = file_path.name
-    file_config = config.get('files', {}).get(file_name, {})
-    
-    ext = file_path.suffix.lower()
+def build_read_csv_params(file_path, file_config):
+    """ファイル設定からpd.read_csvの引数を組み立てる"""
+    ext = Path(file_path).suffix.lower()
     default_delimiter = ',' if ext == '.csv' else '\t'
     
     engine = file_config.get('engine', 'c')
@@ -135,33 +140,124 @@ def process_and_insert_data(conn, file_path, config):
         read_csv_params['quoting'] = file_config['quoting'] 
     if 'escapechar' in file_config:
         read_csv_params['escapechar'] = file_config['escapechar']
+    return read_csv_params
 
-    table_name = file_config.get('table_name', file_path.stem.lower())
+def drop_staging_table(conn, staging_table):
+    """書き込み中の一時テーブルを削除する（インポートに失敗した時に残さない）"""
+    conn.execute(f'DROP TABLE IF EXISTS "{staging_table}"')
+    conn.commit()
 
+def replace_table(conn, staging_table, table_name):
+    """
+    一時テーブルを本来のテーブルと1トランザクションで入れ替える
+    途中で中断・失敗しても、既存のテーブルは元のまま残る（一時テーブルは削除する）
+    """
+    conn.execute("BEGIN")
     try:
-        df = pd.read_csv(file_path, **read_csv_params)
-    except UnicodeDecodeError:
-        print(f"[WARNING] {file_name}: {read_csv_params['encoding']}での読み込みに失敗。cp932で再試行します。")
-        read_csv_params['encoding'] = 'cp932'
+        conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        # 元のテーブルを参照するビューがあると、削除後の名前の変更がビューの検証で失敗するため旧来の動作にする
+        conn.execute("PRAGMA legacy_alter_table=ON")
+        try:
+            conn.execute(f'ALTER TABLE "{staging_table}" RENAME TO "{table_name}"')
+        finally:
+            conn.execute("PRAGMA legacy_alter_table=OFF")
+    except sqlite3.Error:
+        conn.rollback()
+        drop_staging_table(conn, staging_table)
+        raise
+
+def csv_txt_table_name(file_path, config):
+    """ファイル設定のtable_name、なければファイル名（拡張子なし・小文字）"""
+    file_config = config.get('files', {}).get(Path(file_path).name, {})
+    return file_config.get('table_name', Path(file_path).stem.lower())
+
+def prepare_csv_txt_data(file_path, config, metrics):
+    """
+    読み込み・クリーニング・型推定を行い、書き込み用のデータを返す（読み込みに失敗した場合はNone）
+    DBに触れないため、一括インポートでは複数ファイルを並列に準備できる
+    """
+    file_path = Path(file_path)
+    file_name = file_path.name
+    file_config = config.get('files', {}).get(file_name, {})
+    if load_mode(config, file_config) == 'elt':
+        # ELTモードは読み込みからDB上で行うため、ここでは何もしない（write_csv_txt_tableで処理する）
+        return {'table_name': csv_txt_table_name(file_path, config), 'file_config': file_config, 'load_mode': 'elt'}
+    read_csv_params = build_read_csv_params(file_path, file_config)
+
+    with metrics.phase("read"):
         try:
             df = pd.read_csv(file_path, **read_csv_params)
+        except UnicodeDecodeError:
+            metrics.warning(f"{read_csv_params['encoding']}での読み込みに失敗。cp932で再試行します。")
+            read_csv_params['encoding'] = 'cp932'
+            try:
+                df = pd.read_csv(file_path, **read_csv_params)
+            except Exception as e:
+                print(f"[ERROR] {file_name}: cp932でも読み込みに失敗しました: {e}")
+                metrics.fail(f"cp932でも読み込みに失敗しました: {e}")
+                return None
         except Exception as e:
-            print(f"[ERROR] {file_name}: cp932でも読み込みに失敗しました: {e}")
-            return
-    except Exception as e:
-        print(f"[ERROR] {file_name}: 読み込み中に予期せぬエラー: {e}")
-        return
+            print(f"[ERROR] {file_name}: 読み込み中に予期せぬエラー: {e}")
+            metrics.fail(f"読み込み中に予期せぬエラー: {e}")
+            return None
+        metrics.rows = len(df)
 
-    df = clean_dataframe_with_config(df.copy(), file_config)
-    sqlite_types, _, _, _ = detect_data_types(df, file_config)
+    with metrics.phase("clean"):
+        df = clean_dataframe_with_config(df.copy(), file_config)
+    with metrics.phase("infer"):
+        sqlite_types, _, _, _ = detect_data_types(df, file_config)
 
+    return {
+        'table_name': csv_txt_table_name(file_path, config),
+        'file_config': file_config,
+        'df': df,
+        'sqlite_types': sqlite_types,
+    }
+
+def write_csv_txt_table(conn, file_path, prepared, metrics):
+    """準備済みのデータを一時テーブルに書き込んでから本来のテーブルと入れ替え、インポート台帳に記録する"""
+    table_name = prepared['table_name']
+    staging_table = f"{table_name}{STAGING_SUFFIX}"
     try:
-        df.to_sql(table_name, conn, if_exists='replace', index=False, dtype=sqlite_types)
-        print(f"[OK] 成功: {table_name} ({len(df)}行)")
+        if prepared.get('load_mode') == 'elt':
+            row_count = elt_load(conn, file_path, staging_table, prepared['file_config'], metrics)
+            with metrics.phase("write"):
+                replace_table(conn, staging_table, table_name)
+        else:
+            with metrics.phase("write"):
+                prepared['df'].to_sql(staging_table, conn, if_exists='replace', index=False,
+                                      dtype=prepared['sqlite_types'])
+                replace_table(conn, staging_table, table_name)
+            row_count = len(prepared['df'])
+        # インデックスは全行の書き込み後にまとめて作成する（入れ替えと同じトランザクションでコミット）
+        with metrics.phase("index"):
+            _, warnings = create_configured_indexes(conn, table_name, prepared['file_config'])
+            for warning in warnings:
+                metrics.warning(warning)
+            record_import(conn, table_name, file_path, 'csv_txt', prepared['file_config'], row_count, metrics.elapsed)
+            conn.commit()
+            analyze_table(conn, table_name)
+            conn.commit()
+        print(f"[OK] 成功: {table_name} ({row_count}行)")
     except Exception as e:
-        print(f"[ERROR] {file_name} -> {table_name} のDB書き込み中にエラー: {e}")
+        if conn.in_transaction:
+            conn.rollback()
+        # 入れ替え前の状態に戻っても、コミット済みの一時テーブルは残るため削除する
+        try:
+            drop_staging_table(conn, staging_table)
+        except sqlite3.Error as drop_error:
+            print(f"[WARNING] 一時テーブル {staging_table} を削除できませんでした: {drop_error}")
+        print(f"[ERROR] {Path(file_path).name} -> {table_name} のDB書き込み中にエラー: {e}")
+        metrics.fail(f"DB書き込み中にエラー: {e}")
+
+def process_and_insert_data(conn, file_path, config, events=default_stream):
+    """DataFrameを処理し、SQLiteに挿入する共通関数（フェーズごとの進捗・計測をeventsに通知）"""
+    with events.file(file_path, csv_txt_table_name(file_path, config)) as metrics:
+        prepared = prepare_csv_txt_data(file_path, config, metrics)
+        if prepared is not None:
+            write_csv_txt_table(conn, file_path, prepared, metrics)
 
-def batch_convert_csv_txt_files(target_dir, db_path):
+def batch_convert_csv_txt_files(target_dir, db_path, events=default_stream):
     """指定されたディレクトリ内のCSV/TXT/TSVファイルを一括でSQLiteに変換する"""
     target_path = Path(target_dir)
     files_to_process = list(target_path.glob("*.csv")) + list(target_path.glob("*.txt")) + list(target_path.glob("*.tsv"))
@@ -171,6 +267,7 @@ def batch_convert_csv_txt_files(target_dir, db_path):
         return
         
     print(f"[INFO] {len(files_to_process)}個のファイルが一括処理の対象です。")
+    events.batch_start("csv_txt", files_to_process)
     
     config = load_csv_txt_config()
     conn = None
@@ -178,7 +275,7 @@ def batch_convert_csv_txt_files(target_dir, db_path):
         conn = sqlite3.connect(db_path)
         for file_path in files_to_process:
             print(f"--- 処理開始: {file_path.name} ---")
-            process_and_insert_data(conn, file_path, config)
+            process_and_insert_data(conn, file_path, config, events)
         
         print("\n[INFO] 全ての処理が完了しました。データベース接続をコミット・クローズします。")
         conn.commit()
@@ -189,13 +286,16 @@ def batch_convert_csv_txt_files(target_dir, db_path):
         if conn:
             conn.close()
             print("[INFO] データベース接続をクローズしました。")
+        events.batch_end()
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="CSV/TXT/TSVファイルまたはディレクトリをSQLiteに変換します。")
     parser.add_argument("input", help="入力ファイルまたはディレクトリのパス")
     parser.add_argument("db", help="出力SQLite DBファイル")
+    add_events_argument(parser)
     args = parser.parse_args()
+    events_output = open_events_output(args.events)
 
     input_path = Path(args.input)
     if not input_path.exists():
@@ -207,6 +307,7 @@ if __name__ == "__main__":
         else:
             config = load_csv_txt_config()
             conn = None
+            default_stream.batch_start("csv_txt", [input_path])
             try:
                 conn = sqlite3.connect(db_path)
                 print(f"--- 処理開始: {input_path.name} ---")
@@ -218,3 +319,6 @@ if __name__ == "__main__":
             finally:
                 if conn:
                     conn.close()
+                default_stream.batch_end()
+    if events_output:
+        events_output.close()
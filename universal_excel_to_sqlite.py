@@ -6,9 +6,13 @@ import json
 import re
 from pathlib import Path
 
+from sqlite_import_events import add_events_argument, default_stream, open_events_output
+from sqlite_import_indexes import analyze_table, create_configured_indexes
+from sqlite_import_registry import record_import
+
 def load_excel_config():
     """Excel設定ファイルを読み込み"""
-    config_path = Path("excel_config.json")
+    config_path = Path(__file__).parent / "excel_config.json"
     if config_path.exists():
         with open(config_path, 'r', encoding='utf-8') as f:
             return json.load(f)
@@ -275,162 +279,212 @@ def detect_header_row(excel_path):
         print(f"[WARNING] ヘッダー行自動判定エラー: {str(e)}")
         return 2
 
-def convert_excel_to_sqlite(excel_path, db_path, table_name=None, header_row=None, data_start_row=None):
-    """ExcelファイルをSQLiteに変換（設定ファイル対応）"""
-    try:
-        print(f"[FOLDER] 処理中: {excel_path}")
-        
-        # 設定ファイル読み込み
-        config = load_excel_config()
-        file_name = Path(excel_path).name
-        file_config = config.get('files', {}).get(file_name, {})
-        
-        # ファイル名から工程ファイルかどうか判定
-        file_stem = Path(excel_path).stem.lower()
-        is_koutei_file = "工程" in file_stem or "koutei" in file_stem
-        
-        # ヘッダー行の決定（設定ファイル優先）
-        if header_row is None:
-            if 'header_row' in file_config:
-                header_row = file_config['header_row']
-                print(f"[SEARCH] 設定ファイル指定ヘッダー行: {header_row + 1}行目")
-            else:
-                # 自動判定
-                detected_header = detect_header_row(excel_path)
-                print(f"[SEARCH] 自動判定ヘッダー行: {detected_header + 1}行目")
-                header_row = detected_header
-        else:
-            print(f"[SEARCH] 指定ヘッダー行: {header_row + 1}行目")
-        
-        # データ開始行の設定
-        if data_start_row is None:
-            data_start_row = file_config.get('data_start_row', header_row + 1)
-        
-        # Excel読み込み
-        df = pd.read_excel(excel_path, header=header_row)
-        
-        # データ開始行の調整
-        if data_start_row > header_row + 1:
-            df = df.iloc[data_start_row - header_row - 1:]
-            df = df.copy()  # SettingWithCopyWarning回避
-        
-        # データクリーニング（設定ファイル対応）
-        df = clean_dataframe_with_config(df, file_config, config.get('data_cleanup', {}))
-        
-        # 工程ファイルの場合は特別処理
-        if is_koutei_file:
-            print("[TOOLS] 工程ファイル検出 - 特別処理を適用")
-            df, sqlite_types = process_koutei_file(df)
-            # 工程ファイル用の変数を設定
-            force_text_fields = []
-            integer_fields = []
-            date_fields = []
+def prepare_excel_data(excel_path, metrics, table_name=None, header_row=None, data_start_row=None):
+    """
+    Excelの読み込み・クリーニング・型推定・挿入値への変換を行い、書き込み用のデータを返す
+    DBに触れないため、一括インポートでは複数ファイルを並列に準備できる
+    """
+    # 設定ファイル読み込み
+    config = load_excel_config()
+    file_name = Path(excel_path).name
+    file_config = config.get('files', {}).get(file_name, {})
+
+    # ファイル名から工程ファイルかどうか判定
+    file_stem = Path(excel_path).stem.lower()
+    is_koutei_file = "工程" in file_stem or "koutei" in file_stem
+
+    metrics.begin("read")
+    # ヘッダー行の決定（設定ファイル優先）
+    if header_row is None:
+        if 'header_row' in file_config:
+            header_row = file_config['header_row']
+            print(f"[SEARCH] 設定ファイル指定ヘッダー行: {header_row + 1}行目")
         else:
-            # データ型判定（設定ファイル対応）
-            sqlite_types, force_text_fields, integer_fields, date_fields = detect_data_types(df, file_config)
-        
-        # データ型の前処理（設定ファイル対応強化）
-        real_to_text_fields = file_config.get('real_to_text_fields', [])
-        
-        def to_float_or_none(val):
-            try:
-                # クリーニング: カンマ・全角スペース・％等除去
-                s = str(val).replace(',', '').replace(' ', '').replace('　', '').replace('%', '').replace('％', '')
-                # 空欄や記号のみはNone
-                if s == '' or s in ['-', '--', '―', '－', '–', '—', '−', 'null', 'None']:
-                    return None
-                return float(s)
-            except:
+            # 自動判定
+            detected_header = detect_header_row(excel_path)
+            print(f"[SEARCH] 自動判定ヘッダー行: {detected_header + 1}行目")
+            header_row = detected_header
+    else:
+        print(f"[SEARCH] 指定ヘッダー行: {header_row + 1}行目")
+
+    # データ開始行の設定
+    if data_start_row is None:
+        data_start_row = file_config.get('data_start_row', header_row + 1)
+
+    # Excel読み込み
+    df = pd.read_excel(excel_path, header=header_row)
+
+    # データ開始行の調整
+    if data_start_row > header_row + 1:
+        df = df.iloc[data_start_row - header_row - 1:]
+        df = df.copy()  # SettingWithCopyWarning回避
+    metrics.rows = len(df)
+
+    # データクリーニング（設定ファイル対応）
+    metrics.begin("clean")
+    df = clean_dataframe_with_config(df, file_config, config.get('data_cleanup', {}))
+
+    # 工程ファイルの場合は特別処理
+    metrics.begin("infer")
+    if is_koutei_file:
+        print("[TOOLS] 工程ファイル検出 - 特別処理を適用")
+        df, sqlite_types = process_koutei_file(df)
+        # 工程ファイル用の変数を設定
+        force_text_fields = []
+        integer_fields = []
+        date_fields = []
+    else:
+        # データ型判定（設定ファイル対応）
+        sqlite_types, force_text_fields, integer_fields, date_fields = detect_data_types(df, file_config)
+
+    # データ型の前処理（設定ファイル対応強化）
+    metrics.begin("clean")
+    real_to_text_fields = file_config.get('real_to_text_fields', [])
+
+    def to_float_or_none(val):
+        try:
+            # クリーニング: カンマ・全角スペース・％等除去
+            s = str(val).replace(',', '').replace(' ', '').replace('　', '').replace('%', '').replace('％', '')
+            # 空欄や記号のみはNone
+            if s == '' or s in ['-', '--', '―', '－', '–', '—', '−', 'null', 'None']:
                 return None
+            return float(s)
+        except:
+            return None
 
-        def to_int_or_none(val):
-            try:
-                s = str(val).replace('.', '').replace('-', '')
-                if s == '' or not s.isdigit():
-                    return None
-                return int(float(val))
-            except:
+    def to_int_or_none(val):
+        try:
+            s = str(val).replace('.', '').replace('-', '')
+            if s == '' or not s.isdigit():
                 return None
+            return int(float(val))
+        except:
+            return None
 
-        for col in df.columns:
-            if col in integer_fields:
-                df[col] = df[col].apply(to_int_or_none)
-            elif col in date_fields:
-                df[col] = df[col].apply(lambda x: str(x) if pd.notna(x) and x != '' else '')
-            elif col in real_to_text_fields:
-                df[col] = df[col].apply(to_float_or_none)
-                sqlite_types[col] = "REAL"
-            elif col in force_text_fields:
-                df[col] = df[col].apply(lambda x: str(x) if x != '' else '')
-                sqlite_types[col] = "TEXT"
+    for col in df.columns:
+        if col in integer_fields:
+            df[col] = df[col].apply(to_int_or_none)
+        elif col in date_fields:
+            df[col] = df[col].apply(lambda x: str(x) if pd.notna(x) and x != '' else '')
+        elif col in real_to_text_fields:
+            df[col] = df[col].apply(to_float_or_none)
+            sqlite_types[col] = "REAL"
+        elif col in force_text_fields:
+            df[col] = df[col].apply(lambda x: str(x) if x != '' else '')
+            sqlite_types[col] = "TEXT"
+        else:
+            df[col] = df[col].apply(lambda x: str(x) if x != '' else '')
+
+    # 挿入値への変換（型変換強化）
+    columns = list(df.columns)
+    rows = []
+    for index, row in df.iterrows():
+        values = []
+        for col in columns:
+            value = row[col]
+            if col in real_to_text_fields:
+                if value is None:
+                    values.append(None)
+                else:
+                    try:
+                        values.append(float(value))
+                    except:
+                        values.append(None)
+            elif col in integer_fields:
+                if value is None:
+                    values.append(None)
+                else:
+                    try:
+                        values.append(int(float(value)))
+                    except:
+                        values.append(None)
             else:
-                df[col] = df[col].apply(lambda x: str(x) if x != '' else '')
-        
-        # SQLiteに接続
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # テーブル名の決定
-        if table_name is None:
-            table_name = Path(excel_path).stem.lower()
-        
-        # テーブル作成
+                values.append(str(value))
+        rows.append(tuple(values))
+    metrics.end()
+
+    # テーブル名の決定
+    if table_name is None:
+        table_name = Path(excel_path).stem.lower()
+    metrics.table = table_name
+
+    return {
+        'table_name': table_name,
+        'file_config': file_config,
+        'sqlite_types': sqlite_types,
+        'columns': columns,
+        'rows': rows,
+    }
+
+def write_excel_table(conn, excel_path, prepared, metrics):
+    """準備済みのデータでテーブルを作り直し、インポート台帳に記録してコミットする"""
+    table_name = prepared['table_name']
+    columns = prepared['columns']
+    rows = prepared['rows']
+    metrics.begin("write")
+    cursor = conn.cursor()
+
+    # テーブル作成（作成からデータ挿入・台帳記録までを1トランザクションにし、中断時は既存テーブルを残す）
+    cursor.execute("BEGIN")
+    try:
         cursor.execute(f'DROP TABLE IF EXISTS "{table_name}";')
-        column_defs = ", ".join([f'"{col}" {dtype}' for col, dtype in sqlite_types.items()])
+        column_defs = ", ".join([f'"{col}" {dtype}' for col, dtype in prepared['sqlite_types'].items()])
         create_sql = f'CREATE TABLE "{table_name}" ({column_defs});'
         print(f"[TOOLS] テーブル作成SQL: {create_sql}")
         cursor.execute(create_sql)
-        
-        # データ挿入（型変換強化）
-        columns = list(df.columns)
+
+        # データ挿入
         placeholders = ", ".join(["?" for _ in columns])
         column_names = ", ".join([f'"{col}"' for col in columns])
         insert_sql = f'INSERT INTO "{table_name}" ({column_names}) VALUES ({placeholders})'
-        
-        for index, row in df.iterrows():
-            values = []
-            for col in columns:
-                value = row[col]
-                if col in real_to_text_fields:
-                    if value is None:
-                        values.append(None)
-                    else:
-                        try:
-                            values.append(float(value))
-                        except:
-                            values.append(None)
-                elif col in integer_fields:
-                    if value is None:
-                        values.append(None)
-                    else:
-                        try:
-                            values.append(int(float(value)))
-                        except:
-                            values.append(None)
-                else:
-                    values.append(str(value))
-            cursor.execute(insert_sql, values)
-        
-        # 接続終了
+        cursor.executemany(insert_sql, rows)
+
+        # インデックスは全行の挿入後にまとめて作成する
+        metrics.begin("index")
+        _, warnings = create_configured_indexes(conn, table_name, prepared['file_config'])
+        for warning in warnings:
+            metrics.warning(warning)
+
+        # インポート台帳に記録（テーブル作成と同じトランザクションでコミット）
+        record_import(conn, table_name, excel_path, 'excel', prepared['file_config'], len(rows), metrics.elapsed)
         conn.commit()
-        
-        # テーブル作成確認
-        cursor.execute(f"PRAGMA table_info('{table_name}')")
-        table_info = cursor.fetchall()
-        print(f"[DATA] テーブル構造確認: {len(table_info)}カラム")
-        
-        conn.close()
-        
-        print(f"[OK] 成功: {table_name} ({len(df)}行)")
-        return True
-        
+    except Exception:
+        conn.rollback()
+        raise
+    analyze_table(conn, table_name)
+    conn.commit()
+    metrics.end()
+
+    # テーブル作成確認
+    cursor.execute(f"PRAGMA table_info('{table_name}')")
+    table_info = cursor.fetchall()
+    print(f"[DATA] テーブル構造確認: {len(table_info)}カラム")
+
+    print(f"[OK] 成功: {table_name} ({len(rows)}行)")
+
+def convert_excel_to_sqlite(excel_path, db_path, table_name=None, header_row=None, data_start_row=None,
+                            events=default_stream):
+    """ExcelファイルをSQLiteに変換（設定ファイル対応、フェーズごとの進捗・計測をeventsに通知）"""
+    try:
+        with events.file(excel_path, table_name or Path(excel_path).stem.lower()) as metrics:
+            print(f"[FOLDER] 処理中: {excel_path}")
+            prepared = prepare_excel_data(excel_path, metrics, table_name, header_row, data_start_row)
+
+            # SQLiteに接続
+            conn = sqlite3.connect(db_path)
+            try:
+                write_excel_table(conn, excel_path, prepared, metrics)
+            finally:
+                conn.close()
+            return True
+
     except Exception as e:
         print(f"[ERROR] エラー: {excel_path} - {str(e)}")
         import traceback
         print(f"[SEARCH] エラー詳細: {traceback.format_exc()}")
         return False
 
-def batch_convert_excel_files(excel_dir, db_path):
+def batch_convert_excel_files(excel_dir, db_path, events=default_stream):
     """複数のExcelファイルを一括変換"""
     excel_dir = Path(excel_dir)
     excel_files = list(excel_dir.glob("*.xlsx")) + list(excel_dir.glob("*.xls"))
@@ -439,6 +493,7 @@ def batch_convert_excel_files(excel_dir, db_path):
     excel_files = [f for f in excel_files if not f.name.startswith('~$')]
     
     print(f"[STATS] 処理対象: {len(excel_files)}ファイル")
+    events.batch_start("excel", excel_files)
     
     success_count = 0
     error_count = 0
@@ -453,7 +508,7 @@ def batch_convert_excel_files(excel_dir, db_path):
             print(f"\n[SEARCH] 処理中: {excel_file.name}")
             
             # 変換実行
-            if convert_excel_to_sqlite(str(excel_file), db_path, table_name):
+            if convert_excel_to_sqlite(str(excel_file), db_path, table_name, events=events):
                 success_count += 1
                 success_files.append(excel_file.name)
                 print(f"[OK] 成功: {excel_file.name}")
@@ -475,6 +530,7 @@ def batch_convert_excel_files(excel_dir, db_path):
     if error_files:
         print(f"  失敗ファイル: {', '.join(error_files)}")
     print(f"  データベース: {db_path}")
+    events.batch_end()
 
 if __name__ == "__main__":
     import argparse
@@ -483,10 +539,19 @@ if __name__ == "__main__":
     parser.add_argument("db", help="出力SQLite DBファイル")
     parser.add_argument("--sheet", help="処理対象のシート名（省略時は全シート）", default=None)
     parser.add_argument("--header", type=int, help="ヘッダー行番号（デフォルトは自動判定）", default=None)
+    add_events_argument(parser)
     args = parser.parse_args()
+    events_output = open_events_output(args.events)
 
     if not os.path.exists(args.input):
         print(f"[ERROR] 入力ファイルが見つかりません: {args.input}")
+    elif os.path.isdir(args.input):
+        # フォルダ内の一括変換
+        batch_convert_excel_files(args.input, args.db)
     else:
         # 単一ファイル変換
-        convert_excel_to_sqlite(args.input, args.db, header_row=args.header)
\ No newline at end of file
+        default_stream.batch_start("excel", [args.input])
+        convert_excel_to_sqlite(args.input, args.db, header_row=args.header)
+        default_stream.batch_end()
+    if events_output:
+        events_output.close()
\ No newline at end of file